@@ -0,0 +1,33 @@
+"""Add full-text search indexes over ship, course and collection names and descriptions
+
+Revision ID: 7d17fc69d402
+Revises: fcae1bc33a2a
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from alembic import op
+
+from database.search import SEARCHABLE_TABLES, create_statements, drop_statements
+
+
+# revision identifiers, used by Alembic.
+revision = '7d17fc69d402'
+down_revision = 'fcae1bc33a2a'
+branch_labels = None
+depends_on = None
+
+
+# A GIN index over the tsvector of each table on Postgres, an FTS5 table kept up to date by triggers on SQLite. The
+# FTS5 tables are filled with the rows the tables already hold. See database/search.py
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCHABLE_TABLES:
+        for statement in create_statements(dialect, table):
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCHABLE_TABLES:
+        for statement in drop_statements(dialect, table):
+            op.execute(statement)
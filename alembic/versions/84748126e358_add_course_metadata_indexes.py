@@ -0,0 +1,30 @@
+"""Add composite indexes over the course metadata filtered on by the course list
+
+Revision ID: 84748126e358
+Revises: 7d17fc69d402
+Create Date: 2026-10-18 11:02:17.540913
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '84748126e358'
+down_revision = '7d17fc69d402'
+branch_labels = None
+depends_on = None
+
+
+# Serve the game_type, difficulty and length filters of /courses/ used together, difficulty and length, and length
+# alone. id ends each so that a filtered page is read in id order. See the indexes of Course for the other combinations
+def upgrade():
+    op.create_index('ix_course_game_type_difficulty_length', 'course', ['game_type', 'difficulty', 'length', 'id'],
+                    unique=False)
+    op.create_index('ix_course_difficulty_length', 'course', ['difficulty', 'length', 'id'], unique=False)
+    op.create_index('ix_course_length', 'course', ['length', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_course_length', table_name='course')
+    op.drop_index('ix_course_difficulty_length', table_name='course')
+    op.drop_index('ix_course_game_type_difficulty_length', table_name='course')
@@ -0,0 +1,33 @@
+"""Add trigram indexes over ship, course and collection names
+
+Revision ID: d76be1a213f2
+Revises: 84748126e358
+Create Date: 2026-10-18 12:14:06.387493
+
+"""
+from alembic import op
+
+from database.search import SEARCHABLE_TABLES, trigram_create_statements, trigram_drop_statements
+
+
+# revision identifiers, used by Alembic.
+revision = 'd76be1a213f2'
+down_revision = '84748126e358'
+branch_labels = None
+depends_on = None
+
+
+# A pg_trgm GIN index over the names of each table on Postgres, nothing on SQLite whose names are matched in
+# process. See database/search.py
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCHABLE_TABLES:
+        for statement in trigram_create_statements(dialect, table):
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SEARCHABLE_TABLES:
+        for statement in trigram_drop_statements(dialect, table):
+            op.execute(statement)
@@ -0,0 +1,87 @@
+"""
+Measures the latency of completing name prefixes of increasing length from the in-memory PrefixIndex used by
+/autocomplete/, on a miss of its result cache and on a hit, against the case-insensitive LIKE query it replaces on
+SQLite. Run from the project root with: python -m benchmarks.autocomplete
+"""
+import asyncio
+import random
+import string
+import time
+
+from sqlalchemy import func, insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.future import select
+
+# Imported before the models, which can't be imported first because of their circular import with it
+from database.database import Base
+from database.models.models import Course
+from utilities.autocomplete import PrefixIndex
+
+NAMES = 100_000
+LIMIT = 10
+PREFIXES = ("s", "sl", "sli", "slip")
+ROUNDS = 20
+
+
+def random_name(generator: random.Random) -> str:
+    return "".join(generator.choice(string.ascii_letters) for _ in range(generator.randint(4, 18)))
+
+
+def best_of(rounds: int, run) -> float:
+    """
+    Lowest latency of run in milliseconds
+    """
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return min(latencies)
+
+
+async def main():
+    generator = random.Random(0)
+    # Suffixed with the id since names are unique
+    names = [(entity_id, {"name": f"{random_name(generator)} {entity_id}", "popularity": generator.randint(0, 500)})
+             for entity_id in range(1, NAMES + 1)]
+
+    async def load():
+        return names
+
+    index = PrefixIndex("benchmark", load)
+    await index.refresh()
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(insert(Course), [
+            {"id": entity_id, "name": values["name"], "game_type": "Time Trial", "difficulty": "Hard",
+             "length": "Short", "description": "Benchmark course", "course_json": {}}
+            for entity_id, values in names
+        ])
+
+    print(f"{'prefix':>8} {'matches':>8} {'miss (ms)':>10} {'hit (ms)':>9} {'LIKE (ms)':>10}")
+    for prefix in PREFIXES:
+        def miss():
+            index._results.clear()
+            index.complete(prefix, LIMIT)
+
+        cold = best_of(ROUNDS, miss)
+        warm = best_of(ROUNDS, lambda: index.complete(prefix, LIMIT))
+
+        latencies = []
+        async with engine.connect() as connection:
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                await connection.execute(select(Course.id, Course.name)
+                                         .where(func.lower(Course.name).like(f"{prefix.lower()}%"))
+                                         .limit(LIMIT))
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        matches = sum(1 for _, values in names if values["name"].casefold().startswith(prefix))
+        print(f"{prefix:>8} {matches:>8} {cold:>10.3f} {warm:>9.4f} {min(latencies):>10.3f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Compares loading a page of collections along with their courses through joined eager loading (which Collection.courses
+used to default to) and through selectinload, across collection sizes. Reports the number of queries and the latency
+of each strategy. Run from the project root with: python -m benchmarks.collection_loading
+"""
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload, selectinload, sessionmaker
+
+# Imported before the models, which can't be imported first because of their circular import with it
+from database.database import Base
+from database.models.models import Collection, Course, collection_has_course
+
+PAGE_SIZE = 20
+COURSES_PER_COLLECTION = (10, 100, 500)
+ROUNDS = 5
+
+COURSE_JSON = {
+    "version": 1, "name": "Benchmark", "location": "Space", "environment": "Sunrise Clear", "terrainSeed": "",
+    "gravity": {"x": 0, "y": 0, "z": 0}, "startPosition": {"x": 0, "y": 0, "z": 0},
+    "startRotation": {"x": 0, "y": 0, "z": 0}, "gameType": "Time Trial", "musicTrack": "Juno", "authorTimeTarget": 0,
+    "checkpoints": [{"position": {"x": i, "y": i, "z": i}, "rotation": {"x": 0, "y": 0, "z": 0}, "type": 1}
+                    for i in range(20)],
+}
+
+
+async def populate(engine, courses_per_collection: int):
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+
+        author_id = uuid.uuid4()
+        await connection.execute(insert(Course), [
+            {"id": course_id, "name": f"Course {course_id}", "author_id": author_id, "game_type": "Time Trial",
+             "difficulty": "Hard", "length": "Short", "description": "Benchmark course", "course_json": COURSE_JSON}
+            for course_id in range(1, courses_per_collection * PAGE_SIZE + 1)
+        ])
+        await connection.execute(insert(Collection), [
+            {"id": collection_id, "name": f"Collection {collection_id}", "author_id": author_id,
+             "description": "Benchmark collection"}
+            for collection_id in range(1, PAGE_SIZE + 1)
+        ])
+        await connection.execute(insert(collection_has_course), [
+            {"collection_id": collection_id, "course_id": (collection_id - 1) * courses_per_collection + offset + 1}
+            for collection_id in range(1, PAGE_SIZE + 1) for offset in range(courses_per_collection)
+        ])
+
+
+async def load_page(session_maker, option, statements: list) -> float:
+    """
+    Loads a page of collections with their courses and returns the latency in milliseconds
+    """
+    async with session_maker() as session:
+        statements.clear()
+        start = time.perf_counter()
+        result = await session.execute(select(Collection).options(option).offset(0).limit(PAGE_SIZE))
+        # Joined loading returns a row per course, which have to be de-duplicated into their collections
+        collections = result.unique().scalars().all()
+        assert all(collection.courses for collection in collections)
+        return (time.perf_counter() - start) * 1000
+
+
+async def main():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+
+    print(f"{'courses':>8} {'joined queries':>15} {'joined (ms)':>12} {'selectin queries':>17} {'selectin (ms)':>14}")
+    for courses_per_collection in COURSES_PER_COLLECTION:
+        await populate(engine, courses_per_collection)
+
+        results = []
+        for option in (joinedload(Collection.courses), selectinload(Collection.courses)):
+            latency = min([await load_page(session_maker, option, statements) for _ in range(ROUNDS)])
+            results.append((len(statements), latency))
+
+        (joined_queries, joined), (selectin_queries, selectin) = results
+        print(f"{courses_per_collection:>8} {joined_queries:>15} {joined:>12.2f} {selectin_queries:>17} "
+              f"{selectin:>14.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+Compares the latency of loading a page of course ids at increasing depths of a large catalog through offset pagination
+and through the keyset (cursor) pagination of utilities.pagination. Offset pages have to skip every row before them,
+keyset pages seek straight to theirs through the primary key index. Run from the project root with:
+python -m benchmarks.pagination
+"""
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.future import select
+
+# Imported before the models, which can't be imported first because of their circular import with it
+from database.database import Base
+from database.models.models import Course
+from utilities.pagination import encode_cursor, paginate
+
+ROWS = 200_000
+PAGE_SIZE = 20
+DEPTHS = (0, 1_000, 10_000, 50_000, 100_000, 199_000)
+ROUNDS = 5
+BATCH = 10_000
+
+
+async def populate(engine):
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+        author_id = uuid.uuid4()
+        for start in range(1, ROWS + 1, BATCH):
+            await connection.execute(insert(Course), [
+                {"id": course_id, "name": f"Course {course_id}", "author_id": author_id, "game_type": "Time Trial",
+                 "difficulty": "Hard", "length": "Short", "description": "Benchmark course", "course_json": {}}
+                for course_id in range(start, min(start + BATCH, ROWS + 1))
+            ])
+
+
+async def load_page(engine, depth: int, cursor) -> float:
+    """
+    Loads the page of ids starting after depth rows and returns the latency in milliseconds
+    """
+    async with engine.connect() as connection:
+        start = time.perf_counter()
+        result = await connection.execute(paginate(select(Course.id), Course.id, depth, PAGE_SIZE, cursor))
+        ids = result.scalars().all()
+        latency = (time.perf_counter() - start) * 1000
+    assert ids[0] == depth + 1
+    return latency
+
+
+async def main():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    await populate(engine)
+
+    print(f"{'depth':>8} {'offset (ms)':>12} {'cursor (ms)':>12}")
+    for depth in DEPTHS:
+        # Ids are contiguous from 1, so the cursor of the page starting after depth rows points at id depth
+        cursor = encode_cursor(depth) if depth else None
+        offset = min([await load_page(engine, depth, None) for _ in range(ROUNDS)])
+        keyset = min([await load_page(engine, depth, cursor) for _ in range(ROUNDS)])
+        print(f"{depth:>8} {offset:>12.2f} {keyset:>12.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+Compares the per request cost of encoding a page of courses the way read routes used to (from_orm, .dict(), then
+FastAPI validating the dicts against the response_model and encoding them with the stdlib json) with the single
+orjson pass of utilities.serialization. Run from the project root with: python -m benchmarks.serialization
+"""
+import asyncio
+import random
+import timeit
+import uuid
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from starlette.responses import JSONResponse
+
+# Imported before the models, which can't be imported first because of their circular import with it
+import database.database  # noqa: F401
+from database.models.models import Course
+from schemas.course import CourseRead
+from utilities.serialization import dumps, row_dict
+
+PAGE_SIZE = 30
+CHECKPOINTS = (10, 100, 1000)
+ROUNDS = 5
+
+
+def make_course(course_id: int, checkpoints: int) -> Course:
+    def vector() -> dict:
+        return {"x": random.uniform(0, 1e5), "y": random.uniform(0, 1e5), "z": random.uniform(0, 1e5)}
+
+    course_json = {
+        "version": 1, "name": f"Course {course_id}", "location": "Space", "environment": "Sunrise Clear",
+        "terrainSeed": "", "gravity": vector(), "startPosition": vector(), "startRotation": vector(),
+        "gameType": "Time Trial", "musicTrack": "Juno", "authorTimeTarget": 0.0,
+        "checkpoints": [{"position": vector(), "rotation": vector(), "type": 1} for _ in range(checkpoints)],
+    }
+    return Course(id=course_id, name=f"Course {course_id}", author_id=uuid.uuid4(), game_type="Time Trial",
+                  difficulty="Hard", length="Short", description="Benchmark course", link=None,
+                  course_json=course_json)
+
+
+def main():
+    field = create_response_field(name="benchmark", type_=list[CourseRead])
+    loop = asyncio.new_event_loop()
+
+    def validated() -> bytes:
+        content = [CourseRead.from_orm(course).dict() for course in courses]
+        return JSONResponse(loop.run_until_complete(serialize_response(field=field, response_content=content))).body
+
+    def single_pass() -> bytes:
+        return dumps([row_dict(course, CourseRead) for course in courses]).encode()
+
+    print(f"{'checkpoints':>12} {'validated (ms)':>15} {'single pass (ms)':>17} {'speedup':>8}")
+    for checkpoints in CHECKPOINTS:
+        courses = [make_course(course_id, checkpoints) for course_id in range(PAGE_SIZE)]
+        before = min(timeit.repeat(validated, number=1, repeat=ROUNDS)) * 1000
+        after = min(timeit.repeat(single_pass, number=1, repeat=ROUNDS)) * 1000
+        print(f"{checkpoints:>12} {before:>15.2f} {after:>17.2f} {before / after:>7.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,39 @@ class Config:
         self.DEV_MODE: bool = parse_bool("DEV_MODE")
         self.LIMITER_ENABLED: bool = parse_bool("LIMITER_ENABLED")
         self.DEFAULT_LIMIT: str = os.getenv("DEFAULT_LIMIT", "10/minute")
+        # Ships, courses and collections are evicted by tag when they change so their entries can live much longer
+        self.CACHE_EXPIRE: int = int(os.getenv("CACHE_EXPIRE", 3600))
+        # Memory budget of the in-process cache used when REDIS_URL isn't set
+        self.CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+        self.CACHE_EVICTION_POLICY: str = os.getenv("CACHE_EVICTION_POLICY", "tinylfu")
+        # Per-worker cache in front of Redis, only used when REDIS_URL is set
+        self.CACHE_L1_MAX_ENTRIES: int = int(os.getenv("CACHE_L1_MAX_ENTRIES", 1024))
+        self.CACHE_L1_EXPIRE: int = int(os.getenv("CACHE_L1_EXPIRE", 5))
+        # Seconds a worker may hold the Redis lock while recomputing a missed entry, 0 disables the lock
+        self.CACHE_LOCK_TIMEOUT: float = float(os.getenv("CACHE_LOCK_TIMEOUT", 0))
+        # The cache and the rate limiter stop using Redis after this many failed or slower than timeout calls in a row,
+        # and probe it every probe interval seconds until it's back
+        self.REDIS_BREAKER_FAILURES: int = int(os.getenv("REDIS_BREAKER_FAILURES", 3))
+        self.REDIS_BREAKER_TIMEOUT: float = float(os.getenv("REDIS_BREAKER_TIMEOUT", 0.25))
+        self.REDIS_BREAKER_PROBE_INTERVAL: float = float(os.getenv("REDIS_BREAKER_PROBE_INTERVAL", 5))
+        # Codec (zlib, or zstd when zstandard is installed) of the entries stored in Redis, none disables compression
+        self.CACHE_COMPRESSION: str | None = os.getenv("CACHE_COMPRESSION", "zlib")
+        if self.CACHE_COMPRESSION == "none":
+            self.CACHE_COMPRESSION = None
+        self.CACHE_COMPRESSION_MIN_BYTES: int = int(os.getenv("CACHE_COMPRESSION_MIN_BYTES", 1024))
+        # Seconds a proxy or CDN in front of the API may serve ship and course content without revalidating
+        self.CACHE_S_MAXAGE: int = int(os.getenv("CACHE_S_MAXAGE", 60))
+        # 404s of lookups by name are cached briefly, creating an entity with that name evicts them
+        self.CACHE_NOT_FOUND_EXPIRE: int = int(os.getenv("CACHE_NOT_FOUND_EXPIRE", 30))
+        # Requests to cached routes are counted in this file so that the most requested ones are cached again at startup
+        self.CACHE_HIT_LOG: str = os.getenv("CACHE_HIT_LOG", "cache_hits.json")
+        self.CACHE_WARMUP_TOP: int = int(os.getenv("CACHE_WARMUP_TOP", 100))
+        self.CACHE_WARMUP_CONCURRENCY: int = int(os.getenv("CACHE_WARMUP_CONCURRENCY", 4))
+        # Seconds the startup hook may spend warming the cache before the application starts serving, 0 disables it
+        self.CACHE_WARMUP_DEADLINE: float = float(os.getenv("CACHE_WARMUP_DEADLINE", 10))
+        # Seconds between rebuilds of the per-worker in-memory indexes (course facets, name autocomplete) from the
+        # database, 0 disables them
+        self.INDEX_REFRESH: float = float(os.getenv("INDEX_REFRESH", 60))
         self.TITLE: str = "FlyAPI"
         self.DESCRIPTION: str = """
         FlyAPI is a REST-style service created to faciliate the sharing of custom content for Fly Dangerous
@@ -35,6 +68,11 @@ class Config:
         ## Collections
         
         You can define custom collections and add courses by any user (even deleted ones!) to a collection
+        
+        ## Search
+        
+        You can search ships, courses and collections by the words in their names and descriptions, complete their names
+        as they're typed, and look names up despite typos
         """
 
 
@@ -1,8 +1,9 @@
 from fastapi_users_db_sqlalchemy import SQLAlchemyBaseUserTableUUID
-from sqlalchemy import Column, ForeignKey, Integer, String, Enum, JSON, Table, DateTime, BigInteger
+from sqlalchemy import Column, ForeignKey, Integer, String, Enum, JSON, Table, DateTime, BigInteger, Index
 from sqlalchemy.orm import relationship
 
 from database.database import Base
+from database.search import register_search_index
 
 
 # Consider breaking these out into their own files
@@ -70,6 +71,17 @@ class Course(Base):
     # The actual JSON that is serialized into a track by Fly Dangerous
     course_json = Column(JSON, nullable=False)
 
+    # Serve these metadata filters of the course list, reading a page in id order without sorting since id ends each
+    # (see routers.courses.get_courses): all three, difficulty and length, and length alone. Game type and length read
+    # the length index in id order and filter out the other game types. Game type or difficulty alone scan the table
+    # in id order until the page is full, which is short as they each have a few common values. Game type and
+    # difficulty read their prefix of the first index but sort the matches by id
+    __table_args__ = (
+        Index("ix_course_game_type_difficulty_length", "game_type", "difficulty", "length", "id"),
+        Index("ix_course_difficulty_length", "difficulty", "length", "id"),
+        Index("ix_course_length", "length", "id"),
+    )
+
 
 class Collection(Base):
     """
@@ -81,9 +93,11 @@ class Collection(Base):
     author_id = Column(ForeignKey("user.id"), nullable=True)
     author = relationship("User", back_populates="collections", lazy="select")
     description = Column(String, nullable=False)
-    # joined is the strategy we have to use for courses as it pre-fetches the data so that we don't run into async
-    # errors relating to lazy select
-    courses = relationship("Course", secondary=collection_has_course, back_populates="collections", lazy="joined")
+    # Queries pick how courses are loaded: selectinload where they're returned, raiseload or noload where they aren't
+    # (see utilities.fieldsets.column_options and the collection routes). selectin is only the default so that a query
+    # that doesn't pick never lazy loads them, which fails on an async session. Unlike joined loading it doesn't
+    # multiply the collection rows by their courses, which forced paginated queries into a subquery and a unique()
+    courses = relationship("Course", secondary=collection_has_course, back_populates="collections", lazy="selectin")
 
 
 class TopScore(Base):
@@ -128,3 +142,8 @@ class CollectionHasRating(Base):
     collection_id = Column("collection_id", ForeignKey("collection.id"), primary_key=True)
     user_id = Column("user_id", ForeignKey("user.id"), primary_key=True)
     rating = Column("rating", Integer, nullable=True)
+
+
+# Full-text search indexes over names and descriptions, created and dropped along with their tables
+for searchable in (Ship, Course, Collection):
+    register_search_index(searchable.__table__)
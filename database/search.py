@@ -0,0 +1,128 @@
+import re
+
+from sqlalchemy import DDL, Table, event, text
+from sqlalchemy.sql.elements import TextClause
+
+# Full-text search over the name and description of ships, courses and collections. Names weigh more than
+# descriptions in the ranking.
+# On Postgres each table gets a GIN index on the tsvector of its name and description. The index is over an expression
+# of the row's own columns, so Postgres keeps it up to date on insert, update and delete.
+# On SQLite each table gets an FTS5 table ({table}_search) indexing the table's rows (an external content table), kept
+# up to date by triggers on insert, update and delete.
+# The statements are attached to the tables so that create_all and drop_all create and drop them with the tables, and
+# the same statements are run by the Alembic revision adding search to existing databases.
+# Names are also matched approximately, by the trigrams they share with the query. On Postgres each table gets a pg_trgm
+# GIN index on its name. Other databases are served by the in-process trigram index of utilities.trigrams
+
+SEARCHABLE_TABLES = ("ship", "course", "collection")
+
+# Written exactly like this in the index and in the search query so that Postgres matches the query to the index
+POSTGRES_VECTOR = "setweight(to_tsvector('english', coalesce(name, '')), 'A') || " \
+                  "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+# bm25 weights of the name and description columns of the FTS5 tables
+SQLITE_WEIGHTS = "10.0, 1.0"
+
+
+def create_statements(dialect: str, table: str) -> list[str]:
+    """
+    Statements creating the search index of table on dialect, none for dialects without full-text search
+    """
+    if dialect == "postgresql":
+        return [f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING gin (({POSTGRES_VECTOR}))"]
+    elif dialect == "sqlite":
+        index = f"{table}_search"
+        delete = f"INSERT INTO {index}({index}, rowid, name, description) " \
+                 f"VALUES ('delete', old.id, old.name, old.description);"
+        insert = f"INSERT INTO {index}(rowid, name, description) VALUES (new.id, new.name, new.description);"
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(name, description, content='{table}', "
+            f"content_rowid='id')",
+            # Indexes the rows the table already holds
+            f"INSERT INTO {index}({index}) VALUES ('rebuild')",
+            f"CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table} BEGIN {delete} END",
+            f"CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF name, description ON {table} "
+            f"BEGIN {delete} {insert} END",
+        ]
+    return []
+
+
+def drop_statements(dialect: str, table: str) -> list[str]:
+    if dialect == "postgresql":
+        return [f"DROP INDEX IF EXISTS ix_{table}_search"]
+    elif dialect == "sqlite":
+        # The triggers are dropped along with the table
+        return [f"DROP TABLE IF EXISTS {table}_search"]
+    return []
+
+
+def trigram_create_statements(dialect: str, table: str) -> list[str]:
+    """
+    Statements creating the trigram index over the names of table on dialect, none for dialects without pg_trgm
+    """
+    if dialect == "postgresql":
+        return ["CREATE EXTENSION IF NOT EXISTS pg_trgm",
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_name_trgm ON {table} USING gin (name gin_trgm_ops)"]
+    return []
+
+
+def trigram_drop_statements(dialect: str, table: str) -> list[str]:
+    # The extension is left installed, other objects of the database may use it
+    if dialect == "postgresql":
+        return [f"DROP INDEX IF EXISTS ix_{table}_name_trgm"]
+    return []
+
+
+def register_search_index(table: Table):
+    """
+    Creates and drops the search and trigram indexes of table along with it
+    """
+    for dialect in ("postgresql", "sqlite"):
+        for statement in create_statements(dialect, table.name) + trigram_create_statements(dialect, table.name):
+            event.listen(table, "after_create", DDL(statement).execute_if(dialect=dialect))
+        for statement in drop_statements(dialect, table.name) + trigram_drop_statements(dialect, table.name):
+            event.listen(table, "before_drop", DDL(statement).execute_if(dialect=dialect))
+
+
+def match_query(query: str) -> str:
+    """
+    FTS5 query matching rows containing every word of query. Words are quoted so that FTS5 operators typed by users are
+    searched for rather than interpreted. Empty when query has no words
+    """
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", query))
+
+
+def search_statement(dialect: str, tables: tuple[str, ...]) -> TextClause:
+    """
+    Query returning the type, id, name, description and rank of the rows of tables matching :query, best first, paged
+    with :offset and :limit. :query has to be passed through match_query on SQLite
+    """
+    if dialect == "postgresql":
+        selects = [f"SELECT '{table}' AS type, id, name, description, ts_rank({POSTGRES_VECTOR}, query) AS rank "
+                   f"FROM {table}, websearch_to_tsquery('english', :query) query WHERE {POSTGRES_VECTOR} @@ query"
+                   for table in tables]
+    elif dialect == "sqlite":
+        selects = [f"SELECT '{table}' AS type, {table}.id, {table}.name, {table}.description, "
+                   f"-bm25({table}_search, {SQLITE_WEIGHTS}) AS rank "
+                   f"FROM {table}_search JOIN {table} ON {table}.id = {table}_search.rowid "
+                   f"WHERE {table}_search MATCH :query"
+                   for table in tables]
+    else:
+        raise NotImplementedError(f"Full-text search isn't supported on {dialect}")
+
+    return text(" UNION ALL ".join(selects) + " ORDER BY rank DESC, type, id LIMIT :limit OFFSET :offset")
+
+
+def fuzzy_statement(dialect: str, tables: tuple[str, ...]) -> TextClause:
+    """
+    Query returning the type, id, name and similarity score of the :limit rows of tables whose name is most similar to
+    :query, among those at least as similar as pg_trgm.similarity_threshold. The % operator is the one the trigram
+    indexes serve
+    """
+    if dialect != "postgresql":
+        raise NotImplementedError(f"Trigram indexes aren't supported on {dialect}")
+
+    selects = [f"SELECT '{table}' AS type, id, name, similarity(name, :query) AS score FROM {table} "
+               f"WHERE name % :query"
+               for table in tables]
+    return text(" UNION ALL ".join(selects) + " ORDER BY score DESC, type, id LIMIT :limit")
@@ -1,8 +1,7 @@
 import aioredis
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
-from fastapi_cache.backends.redis import RedisBackend
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
@@ -10,19 +9,49 @@ from slowapi.util import get_remote_address
 
 from config import config
 from routers.collections import collection_router
-from routers.courses import course_router
+from routers.courses import course_facets, course_router
 from routers.leaderboards import leaderboard_router
+from routers.metrics import metrics_router
+from routers.search import name_indexes, search_router
 from routers.ships import ship_router
 from schemas.user import UserCreate, UserRead, UserUpdate
+from utilities.circuit_breaker import CircuitBreaker
+from utilities.fastapi_cache.backends.fallback import FallbackBackend
+from utilities.fastapi_cache.backends.inmemory import TaggedInMemoryBackend
+from utilities.fastapi_cache.backends.layered import LayeredBackend
+from utilities.fastapi_cache.backends.metered import MeteredBackend
 from utilities.fastapi_cache.custom_builder import custom_key_builder
+from utilities.fastapi_cache.middleware import ResponseCacheMiddleware
+from utilities.fastapi_cache.warmup import HitLog, warm_up
 from utilities.fastapi_users.users import auth_backend, fastapi_users
+from utilities.limiter import FallbackLimiter
 
-limiter = Limiter(
-    storage_uri=config.REDIS_URL,
-    key_func=get_remote_address,
-    default_limits=[config.DEFAULT_LIMIT],
-    enabled=config.LIMITER_ENABLED
-)
+if config.REDIS_URL is not None:
+    # Compressed entries are stored as bytes, the backend decodes the others itself
+    redis = aioredis.from_url(config.REDIS_URL, decode_responses=False)
+
+    # Shared by the cache and the rate limiter, which both fall back to in-process storage while Redis is unreachable
+    redis_breaker = CircuitBreaker("redis", probe=redis.ping,
+                                   failure_threshold=config.REDIS_BREAKER_FAILURES,
+                                   timeout=config.REDIS_BREAKER_TIMEOUT,
+                                   probe_interval=config.REDIS_BREAKER_PROBE_INTERVAL)
+
+    limiter = FallbackLimiter(
+        storage_uri=config.REDIS_URL,
+        # The limiter's Redis client is synchronous, bounding how long a check can block the event loop
+        storage_options={"socket_timeout": config.REDIS_BREAKER_TIMEOUT,
+                         "socket_connect_timeout": config.REDIS_BREAKER_TIMEOUT},
+        key_func=get_remote_address,
+        default_limits=[config.DEFAULT_LIMIT],
+        enabled=config.LIMITER_ENABLED,
+        breaker=redis_breaker
+    )
+elif config.REDIS_URL is None:
+    limiter = Limiter(
+        key_func=get_remote_address,
+        default_limits=[config.DEFAULT_LIMIT],
+        enabled=config.LIMITER_ENABLED
+    )
 
 app = FastAPI(
     title=config.TITLE,
@@ -31,7 +60,8 @@ app = FastAPI(
     license_info={
         "name": "AGPLv3",
         "url": "https://www.gnu.org/licenses/agpl-3.0.en.html"
-    }
+    },
+    default_response_class=ORJSONResponse
 )
 
 app.state.limiter = limiter
@@ -82,12 +112,70 @@ app.include_router(
     leaderboard_router
 )
 
+app.include_router(
+    metrics_router
+)
+
+app.include_router(
+    search_router
+)
+
+# Per-worker in-memory indexes, loaded at startup and kept in sync with the database
+indexes = [course_facets, *name_indexes.values()]
+
+# Added last so that it wraps every other middleware and can answer cached routes before they run
+hit_log = HitLog(config.CACHE_HIT_LOG)
+app.add_middleware(ResponseCacheMiddleware, routes=app.routes, hit_log=hit_log)
+
 if config.REDIS_URL is not None:
     @app.on_event("startup")
     async def startup():
-        redis = aioredis.from_url(config.REDIS_URL, encoding="utf8", decode_responses=True)
-        FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache", key_builder=custom_key_builder)
+        backend = LayeredBackend(redis,
+                                 l1_max_entries=config.CACHE_L1_MAX_ENTRIES,
+                                 l1_expire=config.CACHE_L1_EXPIRE,
+                                 lock_timeout=config.CACHE_LOCK_TIMEOUT,
+                                 compression=config.CACHE_COMPRESSION,
+                                 compression_min_bytes=config.CACHE_COMPRESSION_MIN_BYTES)
+        fallback = TaggedInMemoryBackend(max_bytes=config.CACHE_MAX_BYTES,
+                                         eviction_policy=config.CACHE_EVICTION_POLICY)
+        FastAPICache.init(MeteredBackend(FallbackBackend(backend, fallback, redis_breaker,
+                                                         lock_timeout=config.CACHE_LOCK_TIMEOUT)),
+                          prefix="fastapi-cache", key_builder=custom_key_builder)
+        await backend.start()
+        for index in indexes:
+            await index.start(redis, redis_breaker)
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        await FastAPICache.get_backend().stop()
+        for index in indexes:
+            await index.stop()
+        await redis_breaker.stop()
 elif config.REDIS_URL is None:
     @app.on_event("startup")
     async def startup():
-        FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache", key_builder=custom_key_builder)
+        backend = TaggedInMemoryBackend(max_bytes=config.CACHE_MAX_BYTES, eviction_policy=config.CACHE_EVICTION_POLICY)
+        FastAPICache.init(MeteredBackend(backend), prefix="fastapi-cache", key_builder=custom_key_builder)
+        for index in indexes:
+            await index.start()
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        for index in indexes:
+            await index.stop()
+
+
+# Registered after the startup hooks above so that the cache backend is initialized when it runs
+@app.on_event("startup")
+async def warm_cache():
+    if config.CACHE_WARMUP_DEADLINE <= 0:
+        return
+    paths = ["/courses/", "/ships/", "/collections/", "/leaderboards/",
+             *hit_log.most_requested(config.CACHE_WARMUP_TOP)]
+    await warm_up(app, paths, concurrency=config.CACHE_WARMUP_CONCURRENCY,
+                  deadline=config.CACHE_WARMUP_DEADLINE)
+
+
+@app.on_event("shutdown")
+async def save_hit_log():
+    hit_log.save()
@@ -1,18 +1,30 @@
 from fastapi import Depends, HTTPException, APIRouter, Query
-from fastapi_cache.decorator import cache
-from sqlalchemy import and_
+from collections import defaultdict
+
+from sqlalchemy import and_, exists, func, insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import noload, selectinload
 from starlette.requests import Request
 from starlette.responses import Response
 from starlette.status import HTTP_204_NO_CONTENT
 
+from config import config
 from database.database import User, get_async_session
-from database.models.models import Course, Collection, CollectionHasRating
+from database.models.models import Course, Collection, CollectionHasRating, collection_has_course
+from routers.search import collection_names
 from schemas.collection import CollectionIn as SchemaCollectionIn, CollectionRead as SchemaCollectionRead, \
-    CollectionUpdate as SchemaCollectionUpdate
+    CollectionSummary as SchemaCollectionSummary, CollectionUpdate as SchemaCollectionUpdate
+from schemas.course import CourseRead as SchemaCourseRead
+from utilities.fastapi_cache.decorator import cache
+from utilities.fastapi_cache.normalized import cached_list
+from utilities.fastapi_cache.tags import COLLECTIONS_LIST, SEARCH, collection_list_tags, collection_name_tag, \
+    collection_not_found_tags, collection_tag, collection_tags, course_tags, invalidate_tags, user_tag
 from utilities.fastapi_users.users import current_active_user
+from utilities.fieldsets import FIELDS_DESCRIPTION, column_options, parse_fields, project
+from utilities.pagination import CURSOR_DESCRIPTION, next_cursor_headers, paginate
+from utilities.serialization import row_dict
 
 collection_router = APIRouter()
 
@@ -20,6 +32,60 @@ collection_router = APIRouter()
 # ToDo consider refactoring out duplicated methods within routes- introduce DAL in large refactor?
 
 
+async def load_collection(session: AsyncSession, collection_id: int) -> dict:
+    """
+    Reloads a collection along with all of its courses after they were changed without being loaded
+    """
+    result = await session.execute(select(Collection).where(Collection.id == collection_id)
+                                   .options(selectinload(Collection.courses))
+                                   .execution_options(populate_existing=True))
+    return row_dict(result.scalars().one(), SchemaCollectionRead)
+
+
+async def add_course(session: AsyncSession, collection_id: int, course_id: int):
+    """
+    Adds the course to the collection without loading its courses. Adding a course the collection already has changes
+    nothing
+    """
+    result = await session.execute(select(exists().where(collection_has_course.c.collection_id == collection_id,
+                                                         collection_has_course.c.course_id == course_id)))
+    if not result.scalar():
+        await session.execute(insert(collection_has_course).values(collection_id=collection_id, course_id=course_id))
+
+
+async def load_collection_summaries(session: AsyncSession, collection_ids: list[int], schema) -> list[dict]:
+    """
+    Loads the given collections as CollectionSummary dicts restricted to the fields of schema. The course count is
+    computed by the database and the courses are read from a single query of their ids and names
+    """
+    columns = [getattr(Collection, name) for name in schema.__fields__ if name in Collection.__table__.columns]
+    if "course_count" in schema.__fields__:
+        columns.append(func.count(collection_has_course.c.course_id).label("course_count"))
+
+    result = await session.execute(
+        select(*columns)
+        .outerjoin(collection_has_course, collection_has_course.c.collection_id == Collection.id)
+        .where(Collection.id.in_(collection_ids))
+        .group_by(Collection.id)
+    )
+    summaries = [dict(row) for row in result.mappings()]
+
+    if "courses" in schema.__fields__:
+        courses = defaultdict(list)
+        result = await session.execute(
+            select(collection_has_course.c.collection_id, Course.id, Course.name)
+            .join(Course, Course.id == collection_has_course.c.course_id)
+            .where(collection_has_course.c.collection_id.in_(collection_ids))
+            .order_by(Course.id)
+        )
+        for collection_id, course_id, course_name in result:
+            courses[collection_id].append({"id": course_id, "name": course_name})
+
+        for summary in summaries:
+            summary["courses"] = courses[summary["id"]]
+    return summaries
+
+
 @collection_router.post("/collections/", response_model=SchemaCollectionRead, status_code=201, tags=["collections"])
 async def create_collection(collection: SchemaCollectionIn,
                             session: AsyncSession = Depends(get_async_session),
@@ -34,6 +100,10 @@ async def create_collection(collection: SchemaCollectionIn,
         await session.refresh(db_collection)
     except IntegrityError as _:
         raise HTTPException(status_code=409, detail=f"Collection name already taken")
+
+    await collection_names.add(db_collection.id, {"name": db_collection.name, "popularity": 0})
+    await invalidate_tags(collection_name_tag(db_collection.name), COLLECTIONS_LIST,
+                          user_tag(user.username, "collections"))
     return db_collection.__dict__
 
 
@@ -42,11 +112,11 @@ async def rate_collection(collection_id: int,
                           rating: int,
                           session: AsyncSession = Depends(get_async_session),
                           user: User = Depends(current_active_user)):
-    # Get the course if it exists
-    result = await session.execute(select(Collection).where(Collection.id == collection_id))
-    db_collection: Collection = result.scalars().first()
+    # Check that the collection exists, without loading it
+    result = await session.execute(select(Collection.id).where(Collection.id == collection_id))
+    db_collection_id = result.scalars().first()
 
-    if db_collection is None:
+    if db_collection_id is None:
         raise HTTPException(status_code=404, detail=f"Course with id: {collection_id} not found")
 
     if rating in (0, 1):
@@ -70,6 +140,7 @@ async def rate_collection(collection_id: int,
     else:
         raise HTTPException(status_code=400, detail="Rating must be 0 (not recommended) or 1 (recommended)")
 
+    await invalidate_tags(collection_tag(collection_id))
     return Response(status_code=HTTP_204_NO_CONTENT)
 
 
@@ -82,8 +153,9 @@ async def update_collection_by_id(collection_id: int,
                                   courses_to_remove_by_name: list[str] | None = None,
                                   session: AsyncSession = Depends(get_async_session),
                                   user: User = Depends(current_active_user)):
-    # Get the collection
-    result = await session.execute(select(Collection).where(Collection.id == collection_id))
+    # Get the collection, with only the ids of its courses which are enough to add and remove some
+    result = await session.execute(select(Collection).where(Collection.id == collection_id)
+                                   .options(selectinload(Collection.courses).load_only(Course.id)))
     db_collection: Collection = result.scalars().first()
 
     if db_collection is None:
@@ -146,66 +218,130 @@ async def update_collection_by_id(collection_id: int,
             setattr(db_collection, var, value)
 
     await session.commit()
+    await collection_names.rename(collection_id, db_collection.name)
+    await invalidate_tags(collection_tag(collection_id), collection_name_tag(db_collection.name), SEARCH)
     return Response(status_code=HTTP_204_NO_CONTENT)
 
 
-@collection_router.get("/collections/", response_model=list[SchemaCollectionRead], status_code=200,
-                       tags=["collections"])
-@cache(expire=30)
+@collection_router.get("/collections/", response_model=list[SchemaCollectionRead] | list[SchemaCollectionSummary],
+                       status_code=200, tags=["collections"])
 async def get_collections(request: Request,
-                          response: Response,
                           username: str | None = None,
                           offset: int = 0,
                           limit: int = Query(default=20, lte=30),
+                          cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+                          summary: bool = False,
+                          fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
                           session: AsyncSession = Depends(get_async_session)):
-    if username is None:
-        stmt = select(Collection).offset(offset).limit(limit)
-    elif username is not None:
-        user_result = await session.execute(select(User).where(User.username == username))
-        user = user_result.scalars().first()
+    """
+    Returns the collections with their full courses, or with the id and name of their courses and their course count
+    when summary is set. The full courses of a collection can then be paged through with
+    /collections/id/{collection_id}/courses
+    """
+    schema = SchemaCollectionSummary if summary else SchemaCollectionRead
+    projection = parse_fields(fields, schema)
+    schema = project(schema, projection)
+
+    async def load_ids() -> list[int]:
+        if username is None:
+            stmt = paginate(select(Collection.id), Collection.id, offset, limit, cursor)
+        elif username is not None:
+            user_result = await session.execute(select(User).where(User.username == username))
+            user = user_result.scalars().first()
+
+            if user is None:
+                raise HTTPException(status_code=404,
+                                    detail=f"Can't search for ship by {username} because: {username} doesn't exist")
+
+            stmt = paginate(select(Collection.id).where(Collection.author_id == user.id), Collection.id, offset, limit,
+                            cursor)
+
+        result = await session.execute(stmt)
+        return result.scalars().all()
+
+    async def load_collections(collection_ids: list[int]) -> list[dict]:
+        if summary:
+            return await load_collection_summaries(session, collection_ids, schema)
+
+        result = await session.execute(select(Collection).where(Collection.id.in_(collection_ids))
+                                       .options(*column_options(Collection, schema)))
+        return [row_dict(collection, schema) for collection in result.scalars().all()]
+
+    # Summaries are cached apart from the full collections since they're different entities under the same ids
+    return await cached_list(request, "collections:summary" if summary else "collections", load_ids,
+                             load_collections, collection_list_tags(None, {"username": username}), collection_tags,
+                             expire=config.CACHE_EXPIRE, fields=projection, page_headers=next_cursor_headers(limit))
+
+
+@collection_router.get("/collections/id/{collection_id}/courses", response_model=list[SchemaCourseRead],
+                       status_code=200, tags=["collections"])
+async def get_collection_courses(request: Request,
+                                 collection_id: int,
+                                 offset: int = 0,
+                                 limit: int = Query(default=10, le=20),
+                                 cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+                                 fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
+                                 session: AsyncSession = Depends(get_async_session)):
+    projection = parse_fields(fields, SchemaCourseRead)
+    schema = project(SchemaCourseRead, projection)
 
-        if user is None:
-            raise HTTPException(status_code=404,
-                                detail=f"Can't search for ship by {username} because: {username} doesn't exist")
+    async def load_ids() -> list[int]:
+        collection_result = await session.execute(select(Collection.id).where(Collection.id == collection_id))
+        if collection_result.first() is None:
+            raise HTTPException(status_code=404, detail=f"Collection id: {collection_id} not found")
 
-        stmt = select(Collection).where(Collection.author_id == user.id).offset(offset).limit(limit)
+        stmt = select(collection_has_course.c.course_id).where(collection_has_course.c.collection_id == collection_id)
+        result = await session.execute(paginate(stmt, collection_has_course.c.course_id, offset, limit, cursor))
+        return result.scalars().all()
 
-    result = await session.execute(stmt)
-    db_collections = result.scalars().unique()
+    async def load_courses(course_ids: list[int]) -> list[dict]:
+        result = await session.execute(select(Course).where(Course.id.in_(course_ids))
+                                       .options(*column_options(Course, schema)))
+        return [row_dict(course, schema) for course in result.scalars().all()]
 
-    return [SchemaCollectionRead.from_orm(collection).dict() for collection in db_collections]
+    # Adding a course to the collection or deleting it evicts every page through the collection's tag
+    return await cached_list(request, "collections:courses", load_ids, load_courses, [collection_tag(collection_id)],
+                             course_tags, expire=config.CACHE_EXPIRE, fields=projection,
+                             page_headers=next_cursor_headers(limit))
 
 
 @collection_router.get("/collections/name/{collection_name}", response_model=SchemaCollectionRead, status_code=200,
                        tags=["collections"])
-@cache(expire=30)
+@cache(expire=config.CACHE_EXPIRE, namespace="collections:name", tags=collection_tags, asgi=True,
+       not_found_expire=config.CACHE_NOT_FOUND_EXPIRE, not_found_tags=collection_not_found_tags)
 async def get_collection_by_name(request: Request,
                                  response: Response,
                                  collection_name: str,
+                                 fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
                                  session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Collection).where(Collection.name == collection_name))
+    schema = project(SchemaCollectionRead, parse_fields(fields, SchemaCollectionRead))
+    result = await session.execute(select(Collection).where(Collection.name == collection_name)
+                                   .options(*column_options(Collection, schema)))
     collection = result.scalars().first()
 
     if collection is None:
         raise HTTPException(status_code=404, detail=f"Course: {collection_name} not found")
 
-    return SchemaCollectionRead.from_orm(collection).dict()
+    return row_dict(collection, schema)
 
 
 @collection_router.get("/collections/id/{collection_id}", response_model=SchemaCollectionRead, status_code=200,
                        tags=["collections"])
-@cache(expire=30)
+@cache(expire=config.CACHE_EXPIRE, namespace="collections:id", tags=collection_tags, asgi=True)
 async def get_collection_by_id(request: Request,
                                response: Response,
                                collection_id: int,
+                               fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
                                session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Collection).where(Collection.id == collection_id))
+    schema = project(SchemaCollectionRead, parse_fields(fields, SchemaCollectionRead))
+    result = await session.execute(select(Collection).where(Collection.id == collection_id)
+                                   .options(*column_options(Collection, schema)))
     collection = result.scalars().first()
 
     if collection is None:
         raise HTTPException(status_code=404, detail=f"Course id: {collection_id} not found")
 
-    return SchemaCollectionRead.from_orm(collection).dict()
+    return row_dict(collection, schema)
 
 
 @collection_router.patch("/collections/id/{collection_id}/id/{course_id}", response_model=SchemaCollectionRead,
@@ -214,8 +350,9 @@ async def get_collection_by_id(request: Request,
 async def add_course_to_collection_by_ids(collection_id: int, course_id: int,
                                           session: AsyncSession = Depends(get_async_session),
                                           user: User = Depends(current_active_user)):
-    # Step one, verify that the current user is the creator of the collection
-    collection_result = await session.execute(select(Collection).where(Collection.id == collection_id))
+    # Step one, verify that the current user is the creator of the collection. Its courses aren't needed to add one
+    collection_result = await session.execute(select(Collection).where(Collection.id == collection_id)
+                                              .options(noload(Collection.courses)))
     collection = collection_result.scalars().first()
 
     # Check to make sure the collection exists
@@ -235,11 +372,11 @@ async def add_course_to_collection_by_ids(collection_id: int, course_id: int,
                             detail=f"You: {User.username} are not the creator of collection: {collection.name}")
 
     # Adding the course to the collection
-    collection.courses.append(course)
+    await add_course(session, collection.id, course.id)
     await session.commit()
-    await session.refresh(collection)
+    await invalidate_tags(collection_tag(collection.id))
 
-    return collection.__dict__
+    return await load_collection(session, collection.id)
 
 
 @collection_router.patch("/collections/id/{collection_id}/name/{course_name}", response_model=SchemaCollectionRead,
@@ -248,8 +385,9 @@ async def add_course_to_collection_by_ids(collection_id: int, course_id: int,
 async def add_course_to_collection_by_course_name(collection_id: int, course_name: str,
                                                   session: AsyncSession = Depends(get_async_session),
                                                   user: User = Depends(current_active_user)):
-    # Step one, verify that the current user is the creator of the collection
-    collection_result = await session.execute(select(Collection).where(Collection.id == collection_id))
+    # Step one, verify that the current user is the creator of the collection. Its courses aren't needed to add one
+    collection_result = await session.execute(select(Collection).where(Collection.id == collection_id)
+                                              .options(noload(Collection.courses)))
     collection = collection_result.scalars().first()
 
     # Check to make sure the collection exists
@@ -269,11 +407,11 @@ async def add_course_to_collection_by_course_name(collection_id: int, course_nam
                             detail=f"You: {User.username} are not the creator of collection: {collection.name}")
 
     # Adding the course to the collection
-    collection.courses.append(course)
+    await add_course(session, collection.id, course.id)
     await session.commit()
-    await session.refresh(collection)
+    await invalidate_tags(collection_tag(collection.id))
 
-    return collection.__dict__
+    return await load_collection(session, collection.id)
 
 
 @collection_router.patch("/collections/name/{collection_name}/name/{course_name}", response_model=SchemaCollectionRead,
@@ -282,8 +420,9 @@ async def add_course_to_collection_by_course_name(collection_id: int, course_nam
 async def add_course_to_collection_by_names(collection_name: str, course_name: str,
                                             session: AsyncSession = Depends(get_async_session),
                                             user: User = Depends(current_active_user)):
-    # Step one, verify that the current user is the creator of the collection
-    collection_result = await session.execute(select(Collection).where(Collection.name == collection_name))
+    # Step one, verify that the current user is the creator of the collection. Its courses aren't needed to add one
+    collection_result = await session.execute(select(Collection).where(Collection.name == collection_name)
+                                              .options(noload(Collection.courses)))
     collection = collection_result.scalars().first()
 
     # Check to make sure the collection exists
@@ -303,18 +442,20 @@ async def add_course_to_collection_by_names(collection_name: str, course_name: s
                             detail=f"You: {User.username} are not the creator of collection: {collection.name}")
 
     # Adding the course to the collection
-    collection.courses.append(course)
+    await add_course(session, collection.id, course.id)
     await session.commit()
-    await session.refresh(collection)
+    await invalidate_tags(collection_tag(collection.id))
 
-    return collection.__dict__
+    return await load_collection(session, collection.id)
 
 
 @collection_router.delete("/collections/id/{collection_id}", status_code=204, tags=["collections"])
 async def delete_course_by_id(collection_id: int,
                               session: AsyncSession = Depends(get_async_session),
                               user: User = Depends(current_active_user)):
-    result = await session.execute(select(Collection).where(Collection.id == collection_id))
+    # The ids of its courses are enough to delete its rows of collection_has_course along with it
+    result = await session.execute(select(Collection).where(Collection.id == collection_id)
+                                   .options(selectinload(Collection.courses).load_only(Course.id)))
     collection = result.scalars().first()
 
     if collection is None:
@@ -325,5 +466,7 @@ async def delete_course_by_id(collection_id: int,
                             detail=f"You: {User.username} are not the creator of collection: {collection.name}")
     await session.delete(collection)
     await session.commit()
+    await collection_names.remove(collection_id)
+    await invalidate_tags(collection_tag(collection_id), COLLECTIONS_LIST, user_tag(user.username, "collections"))
 
     return Response(status_code=HTTP_204_NO_CONTENT)
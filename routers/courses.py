@@ -1,5 +1,4 @@
 from fastapi import Depends, HTTPException, APIRouter, Query
-from fastapi_cache.decorator import cache
 from sqlalchemy import and_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,15 +7,48 @@ from starlette.requests import Request
 from starlette.responses import Response
 from starlette.status import HTTP_204_NO_CONTENT
 
-from database.database import User, get_async_session
+from config import config
+from database.database import User, async_session_maker, get_async_session
 from database.models.models import Course, CourseHasRating
+from routers.search import course_names
 from schemas.course import CourseIn as SchemaCourseIn, CourseRead as SchemaCourseRead, \
-    CourseUpdate as SchemaCourseUpdate, CourseReadSimple as SchemaCourseReadSimple
+    CourseUpdate as SchemaCourseUpdate, CourseReadSimple as SchemaCourseReadSimple, \
+    CourseFacets as SchemaCourseFacets, DifficultyEnum, GameTypeEnum, LengthEnum, LocationEnum
+from utilities.fastapi_cache.decorator import cache
+from utilities.fastapi_cache.normalized import cached_list
+from utilities.fastapi_cache.tags import COURSES_FILTERED_LIST, COURSES_LIST, SEARCH, course_list_tags, \
+    course_name_tag, course_not_found_tags, course_tag, course_tags, invalidate_tags, user_tag
+from utilities.facets import FacetIndex
 from utilities.fastapi_users.users import current_active_user
+from utilities.fieldsets import FIELDS_DESCRIPTION, column_options, parse_fields, project
+from utilities.pagination import CURSOR_DESCRIPTION, decode_cursor, next_cursor_headers, paginate
+from utilities.serialization import row_dict
 
 course_router = APIRouter()
 
 
+def course_facet_values(course: Course) -> dict:
+    return {"game_type": course.game_type, "difficulty": course.difficulty, "length": course.length,
+            "location": course.course_json.get("location")}
+
+
+async def load_course_facets(session: AsyncSession) -> list[tuple[int, dict]]:
+    # Only reading the location out of the course JSON
+    result = await session.execute(select(Course.id, Course.game_type, Course.difficulty, Course.length,
+                                          Course.course_json["location"].as_string().label("location")))
+    return [(row.id, dict(row._mapping)) for row in result.all()]
+
+
+async def _load_course_facets() -> list[tuple[int, dict]]:
+    async with async_session_maker() as session:
+        return await load_course_facets(session)
+
+
+# Answers the metadata filters of /courses/ and the counts of /courses/facets, loaded by the application's startup hook
+course_facets = FacetIndex("courses", ("game_type", "difficulty", "length", "location"), _load_course_facets,
+                           refresh_interval=config.INDEX_REFRESH)
+
+
 # ToDo consider refactoring out duplicated methods within routes- introduce DAL in large refactor?
 
 
@@ -39,6 +71,10 @@ async def create_course(course: SchemaCourseIn,
         await session.refresh(db_course)
     except IntegrityError as _:
         raise HTTPException(status_code=409, detail=f"Course name already taken")
+
+    await course_facets.add(db_course.id, course_facet_values(db_course))
+    await course_names.add(db_course.id, {"name": db_course.name, "popularity": 0})
+    await invalidate_tags(course_name_tag(db_course.name), COURSES_LIST, user_tag(user.username, "courses"))
     return db_course.__dict__
 
 
@@ -75,6 +111,7 @@ async def rate_course(course_id: int,
     else:
         raise HTTPException(status_code=400, detail="Rating must be 0 (not recommended) or 1 (recommended)")
 
+    await invalidate_tags(course_tag(course_id))
     return Response(status_code=HTTP_204_NO_CONTENT)
 
 
@@ -101,6 +138,9 @@ async def update_course_by_id(course_id: int,
             setattr(db_course, "course_json", course.course_json.dict())
 
     await session.commit()
+    await course_facets.add(db_course.id, course_facet_values(db_course))
+    await course_names.rename(db_course.id, db_course.name)
+    await invalidate_tags(course_tag(db_course.id), course_name_tag(db_course.name), SEARCH, COURSES_FILTERED_LIST)
     return Response(status_code=HTTP_204_NO_CONTENT)
 
 
@@ -127,59 +167,130 @@ async def update_course_by_name(course_name: str,
             setattr(db_course, "course_json", course.course_json.dict())
 
     await session.commit()
+    await course_facets.add(db_course.id, course_facet_values(db_course))
+    await course_names.rename(db_course.id, db_course.name)
+    await invalidate_tags(course_tag(db_course.id), course_name_tag(db_course.name), SEARCH, COURSES_FILTERED_LIST)
     return Response(status_code=HTTP_204_NO_CONTENT)
 
 
 @course_router.get("/courses/", response_model=list[SchemaCourseReadSimple], status_code=200, tags=["courses"])
-@cache(expire=30)
 async def get_courses(request: Request,
-                      response: Response,
                       username: str | None = None,
                       offset: int = 0,
                       limit: int = Query(default=20, lte=50),
+                      cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+                      game_type: GameTypeEnum | None = None,
+                      difficulty: DifficultyEnum | None = None,
+                      length: LengthEnum | None = None,
+                      location: LocationEnum | None = None,
+                      fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
                       session: AsyncSession = Depends(get_async_session)):
-    if username is None:
-        stmt = select(Course).offset(offset).limit(limit)
-    elif username is not None:
-        user_result = await session.execute(select(User).where(User.username == username))
-        user = user_result.scalars().first()
-
-        if user is None:
-            raise HTTPException(status_code=404,
-                                detail=f"Can't search for ship by {username} because: {username} doesn't exist")
-
-        stmt = select(Course).where(Course.author_id == user.id).offset(offset).limit(limit)
-
-    result = await session.execute(stmt)
-    courses = result.scalars().all()
-
-    return [SchemaCourseReadSimple.from_orm(course).dict() for course in courses]
+    """
+    Returns the courses, restricted to the given game type, difficulty, length and location when they're set
+    """
+    facets = {"game_type": game_type, "difficulty": difficulty, "length": length, "location": location}
+    facets = {facet: value.value for facet, value in facets.items() if value is not None}
+    projection = parse_fields(fields, SchemaCourseReadSimple)
+    schema = project(SchemaCourseReadSimple, projection)
+
+    async def load_ids() -> list[int]:
+        if username is None and facets and course_facets.ready:
+            # Filtered pages are read off the facet index, in the same id order as the database pages
+            bitmap = course_facets.match(facets)
+            if cursor is not None:
+                return course_facets.page(bitmap, limit=limit, after=decode_cursor(cursor))
+            return course_facets.page(bitmap, offset=offset, limit=limit)
+
+        # The game type, difficulty and length filters are served by the metadata indexes of Course, the combinations
+        # each index serves are listed with them
+        columns = {"game_type": Course.game_type, "difficulty": Course.difficulty, "length": Course.length,
+                   "location": Course.course_json["location"].as_string()}
+        filters = [columns[facet] == value for facet, value in facets.items()]
+        if username is None:
+            stmt = paginate(select(Course.id).where(*filters), Course.id, offset, limit, cursor)
+        elif username is not None:
+            user_result = await session.execute(select(User).where(User.username == username))
+            user = user_result.scalars().first()
+
+            if user is None:
+                raise HTTPException(status_code=404,
+                                    detail=f"Can't search for ship by {username} because: {username} doesn't exist")
+
+            stmt = paginate(select(Course.id).where(Course.author_id == user.id, *filters), Course.id, offset, limit,
+                            cursor)
+
+        result = await session.execute(stmt)
+        return result.scalars().all()
+
+    async def load_courses(course_ids: list[int]) -> list[dict]:
+        # Only loading the columns of the schema, the course JSON is only returned by the detail routes
+        result = await session.execute(select(Course).where(Course.id.in_(course_ids))
+                                       .options(*column_options(Course, schema)))
+        return [row_dict(course, schema) for course in result.scalars().all()]
+
+    list_tags = course_list_tags(None, {"username": username, **facets})
+    return await cached_list(request, "courses", load_ids, load_courses, list_tags, course_tags,
+                             expire=config.CACHE_EXPIRE, fields=projection, page_headers=next_cursor_headers(limit))
+
+
+@course_router.get("/courses/facets", response_model=SchemaCourseFacets, status_code=200, tags=["courses"])
+async def get_course_facets(game_type: GameTypeEnum | None = None,
+                            difficulty: DifficultyEnum | None = None,
+                            length: LengthEnum | None = None,
+                            location: LocationEnum | None = None,
+                            session: AsyncSession = Depends(get_async_session)):
+    """
+    Returns the number of courses matching the filters, and the number of courses per game type, difficulty, length and
+    location matching the filters on the other facets
+    """
+    facets = {"game_type": game_type, "difficulty": difficulty, "length": length, "location": location}
+    facets = {facet: value.value for facet, value in facets.items() if value is not None}
+
+    index = course_facets
+    if not index.ready:
+        # Only until the startup hook has loaded the index
+        index = FacetIndex("courses", course_facets.facets, lambda: load_course_facets(session), refresh_interval=0)
+        await index.refresh()
+
+    return {"total": index.match(facets).bit_count(), "facets": index.counts(facets)}
 
 
 @course_router.get("/courses/name/{course_name}", response_model=SchemaCourseRead, status_code=200, tags=["courses"])
-@cache(expire=30)
+@cache(expire=config.CACHE_EXPIRE, namespace="courses:name", tags=course_tags, asgi=True,
+       s_maxage=config.CACHE_S_MAXAGE, not_found_expire=config.CACHE_NOT_FOUND_EXPIRE,
+       not_found_tags=course_not_found_tags)
 async def get_course_by_name(course_name: str,
+                             request: Request,
+                             response: Response,
+                             fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
                              session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Course).where(Course.name == course_name))
+    schema = project(SchemaCourseRead, parse_fields(fields, SchemaCourseRead))
+    result = await session.execute(select(Course).where(Course.name == course_name)
+                                   .options(*column_options(Course, schema)))
     course = result.scalars().first()
 
     if course is None:
         raise HTTPException(status_code=404, detail=f"Course: {course_name} not found")
 
-    return SchemaCourseRead.from_orm(course).dict()
+    return row_dict(course, schema)
 
 
 @course_router.get("/courses/id/{course_id}", response_model=SchemaCourseRead, status_code=200, tags=["courses"])
-@cache(expire=30)
+@cache(expire=config.CACHE_EXPIRE, namespace="courses:id", tags=course_tags, asgi=True, s_maxage=config.CACHE_S_MAXAGE)
 async def get_course_by_id(course_id: int,
+                           request: Request,
+                           response: Response,
+                           fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
                            session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Course).where(Course.id == course_id))
+    schema = project(SchemaCourseRead, parse_fields(fields, SchemaCourseRead))
+    result = await session.execute(select(Course).where(Course.id == course_id)
+                                   .options(*column_options(Course, schema)))
     course = result.scalars().first()
 
     if course is None:
         raise HTTPException(status_code=404, detail=f"Course id: {course_id} not found")
 
-    return SchemaCourseRead.from_orm(course).dict()
+    return row_dict(course, schema)
 
 
 @course_router.delete("/courses/id/{course_id}", status_code=204, tags=["courses"])
@@ -197,5 +308,8 @@ async def delete_course_by_id(course_id: int,
                             detail=f"You: {User.username} are not the creator of course: {course.name}")
     await session.delete(course)
     await session.commit()
+    await course_facets.remove(course_id)
+    await course_names.remove(course_id)
+    await invalidate_tags(course_tag(course_id), COURSES_LIST, user_tag(user.username, "courses"))
 
     return Response(status_code=HTTP_204_NO_CONTENT)
@@ -1,5 +1,4 @@
 from fastapi import Depends, APIRouter, Query
-from fastapi_cache.decorator import cache
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.requests import Request
@@ -7,12 +6,14 @@ from starlette.responses import Response
 
 from database.database import get_async_session
 from schemas.leaderboard import Leader as SchemaLeader, TopScore as SchemaTopScore
+from utilities.fastapi_cache.decorator import cache
+from utilities.serialization import row_dict
 
 leaderboard_router = APIRouter()
 
 
 @leaderboard_router.get("/leaderboards/", response_model=list[SchemaTopScore], status_code=200, tags=["leaderboards"])
-@cache(expire=30)
+@cache(expire=30, namespace="leaderboards:list", stale_ttl=300, asgi=True)
 async def get_leaderboards(request: Request,
                            response: Response,
                            session: AsyncSession = Depends(get_async_session)):
@@ -33,12 +34,12 @@ async def get_leaderboards(request: Request,
 
     top_scores = result.all()
 
-    return [SchemaTopScore.from_orm(ts) for ts in top_scores]
+    return [row_dict(ts, SchemaTopScore) for ts in top_scores]
 
 
 @leaderboard_router.get("/leaderboards/{course_name}", response_model=list[SchemaTopScore], status_code=200,
                         tags=["leaderboards"])
-@cache(expire=30)
+@cache(expire=30, namespace="leaderboards:course", stale_ttl=300, asgi=True)
 async def get_leaderboard_by_name(request: Request,
                                   response: Response,
                                   course_name: str,
@@ -55,11 +56,11 @@ async def get_leaderboard_by_name(request: Request,
 
     top_scores = result.all()
 
-    return [SchemaTopScore.from_orm(ts) for ts in top_scores]
+    return [row_dict(ts, SchemaTopScore) for ts in top_scores]
 
 
 @leaderboard_router.get("/leaders/", response_model=list[SchemaLeader], status_code=200, tags=["leaderboards"])
-@cache(expire=30)
+@cache(expire=30, namespace="leaderboards:leaders", stale_ttl=300, asgi=True)
 async def get_top_players(request: Request,
                           response: Response,
                           limit: int = Query(default=20, lte=50),
@@ -81,4 +82,4 @@ async def get_top_players(request: Request,
         result = await session.execute(stmt, {"s": steam_id})
 
     leaders = result.all()
-    return [SchemaLeader.from_orm(leader) for leader in leaders]
+    return [row_dict(leader, SchemaLeader) for leader in leaders]
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi_cache import FastAPICache
+
+from utilities.circuit_breaker import breakers
+from utilities.fastapi_cache.metrics import metrics
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics/cache", status_code=200, tags=["metrics"])
+async def get_cache_metrics():
+    """
+    Hits, misses, stampede waits, bytes stored and get/set latency histograms of the cache per namespace, counted by
+    the worker answering the request since it started, along with the state and transitions of the Redis circuit
+    breaker
+    """
+    backend_stats = getattr(FastAPICache.get_backend(), "stats", None)
+    return {
+        "enabled": FastAPICache.get_enable(),
+        "namespaces": metrics.as_dict(),
+        "backend": backend_stats() if backend_stats is not None else None,
+        "breakers": {name: breaker.as_dict() for name, breaker in breakers.items()},
+    }
@@ -0,0 +1,182 @@
+import heapq
+
+from fastapi import Depends, APIRouter, Query
+from sqlalchemy import func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import Select
+from starlette.requests import Request
+from starlette.responses import Response
+
+from config import config
+from database.database import async_session_maker, engine, get_async_session
+from database.models.models import Collection, CollectionHasRating, Course, CourseHasRating, Ship, ShipHasRating
+from database.search import SEARCHABLE_TABLES, fuzzy_statement, match_query, search_statement
+from schemas.search import NameMatch as SchemaNameMatch, SearchResult as SchemaSearchResult, SearchType, \
+    Suggestion as SchemaSuggestion
+from utilities.autocomplete import PrefixIndex
+from utilities.fastapi_cache.decorator import cache
+from utilities.fastapi_cache.tags import search_tags
+from utilities.serialization import row_dict
+from utilities.trigrams import SIMILARITY_THRESHOLD, TrigramIndex, fragments, similarity, trigrams
+
+search_router = APIRouter()
+
+
+def names_statement(model, rating_model, rated_id) -> Select:
+    # Ratings are 0 or 1, so their sum is the number of positive ones
+    return select(model.id, model.name, func.coalesce(func.sum(rating_model.rating), 0).label("popularity")) \
+        .outerjoin(rating_model, rated_id == model.id).group_by(model.id, model.name)
+
+
+# Select the names of each kind of entity with their popularity
+name_statements = {
+    SearchType.ship: names_statement(Ship, ShipHasRating, ShipHasRating.ship_id),
+    SearchType.course: names_statement(Course, CourseHasRating, CourseHasRating.course_id),
+    SearchType.collection: names_statement(Collection, CollectionHasRating, CollectionHasRating.collection_id),
+}
+
+
+async def load_names(session: AsyncSession, type_: SearchType) -> list[tuple[int, dict]]:
+    result = await session.execute(name_statements[type_])
+    return [(row.id, {"name": row.name, "popularity": row.popularity}) for row in result.all()]
+
+
+async def complete_names(session: AsyncSession, type_: SearchType, prefix: str,
+                         limit: int) -> list[tuple[int, str, int]]:
+    """
+    Answers PrefixIndex.complete from the database, until the name index is loaded
+    """
+    stmt = name_statements[type_]
+    columns = stmt.selected_columns
+    pattern = prefix.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    result = await session.execute(stmt.where(func.lower(columns.name).like(pattern, escape="\\"))
+                                   .order_by(columns.popularity.desc(), func.lower(columns.name), columns.id)
+                                   .limit(limit))
+    return [(row.id, row.name, row.popularity) for row in result.all()]
+
+
+async def match_names(session: AsyncSession, type_: SearchType, query: str,
+                      limit: int) -> list[tuple[int, str, float]]:
+    """
+    Answers TrigramIndex.match from the database, until the name index is loaded. The database only returns the names
+    sharing a run of characters with query (see utilities.trigrams.fragments), which are scored here
+    """
+    patterns = fragments(query)
+    if not patterns:
+        return []
+
+    stmt = name_statements[type_]
+    lowered = func.lower(stmt.selected_columns.name)
+    # Fragments are made of letters and digits only, none of them is a LIKE wildcard
+    result = await session.execute(select(stmt.selected_columns.id, stmt.selected_columns.name)
+                                   .where(or_(*(lowered.like(f"%{fragment}%") for fragment in patterns))))
+    wanted = trigrams(query)
+    scores = []
+    for row in result.all():
+        score = similarity(wanted, trigrams(row.name))
+        if score >= SIMILARITY_THRESHOLD:
+            scores.append((-score, row.id, row.name))
+    return [(entity_id, name, -score) for score, entity_id, name in heapq.nsmallest(limit, scores)]
+
+
+# Postgres matches names approximately through its trigram indexes, other databases through the name indexes
+FUZZY_INDEX_CLASS = PrefixIndex if engine.dialect.name == "postgresql" else TrigramIndex
+
+
+def name_index(type_: SearchType) -> PrefixIndex:
+    async def load() -> list[tuple[int, dict]]:
+        async with async_session_maker() as session:
+            return await load_names(session, type_)
+
+    return FUZZY_INDEX_CLASS(f"{type_.value}:names", load, refresh_interval=config.INDEX_REFRESH)
+
+
+# Answer /autocomplete/, and /fuzzy/ without Postgres, loaded by the application's startup hook. The ship, course and
+# collection routes apply their creates, renames and deletes to them
+ship_names = name_index(SearchType.ship)
+course_names = name_index(SearchType.course)
+collection_names = name_index(SearchType.collection)
+name_indexes = {SearchType.ship: ship_names, SearchType.course: course_names, SearchType.collection: collection_names}
+
+
+@search_router.get("/search/", response_model=list[SchemaSearchResult], status_code=200, tags=["search"])
+@cache(expire=config.CACHE_EXPIRE, namespace="search", tags=search_tags, asgi=True)
+async def search(request: Request,
+                 response: Response,
+                 q: str = Query(min_length=1, max_length=100, description="Words to search names and descriptions for"),
+                 types: list[SearchType] | None = Query(default=None, alias="type",
+                                                        description="Kinds of entities to search, all by default"),
+                 offset: int = 0,
+                 limit: int = Query(default=20, le=50),
+                 session: AsyncSession = Depends(get_async_session)):
+    """
+    Returns the ships, courses and collections whose name or description match q, best matches first. Matches in names
+    rank higher than matches in descriptions
+    """
+    tables = tuple(table for table in SEARCHABLE_TABLES if types is None or table in types)
+    dialect = session.bind.dialect.name
+    query = match_query(q) if dialect == "sqlite" else q
+    if not query:
+        return []
+
+    result = await session.execute(search_statement(dialect, tables),
+                                   {"query": query, "offset": offset, "limit": limit})
+    return [row_dict(row, SchemaSearchResult) for row in result.all()]
+
+
+@search_router.get("/autocomplete/", response_model=list[SchemaSuggestion], status_code=200, tags=["search"])
+async def autocomplete(q: str = Query(min_length=1, max_length=30, description="Start of the names to complete"),
+                       types: list[SearchType] | None = Query(default=None, alias="type",
+                                                              description="Kinds of entities to complete, all by "
+                                                                          "default"),
+                       limit: int = Query(default=10, le=20),
+                       session: AsyncSession = Depends(get_async_session)):
+    """
+    Returns the most popular ships, courses and collections whose name starts with q, ignoring case
+    """
+    suggestions = []
+    for type_, index in name_indexes.items():
+        if types is not None and type_ not in types:
+            continue
+
+        # The database answers only until the startup hook has loaded the index
+        completions = index.complete(q, limit) if index.ready else await complete_names(session, type_, q, limit)
+        suggestions.extend({"type": type_.value, "id": entity_id, "name": name, "popularity": popularity}
+                           for entity_id, name, popularity in completions)
+
+    return heapq.nsmallest(limit, suggestions, key=lambda suggestion: (-suggestion["popularity"],
+                                                                       suggestion["name"].casefold(),
+                                                                       suggestion["type"], suggestion["id"]))
+
+
+@search_router.get("/fuzzy/", response_model=list[SchemaNameMatch], status_code=200, tags=["search"])
+@cache(expire=config.CACHE_EXPIRE, namespace="fuzzy", tags=search_tags, asgi=True)
+async def fuzzy(request: Request,
+                response: Response,
+                q: str = Query(min_length=1, max_length=100, description="Name to look up, possibly mistyped"),
+                types: list[SearchType] | None = Query(default=None, alias="type",
+                                                       description="Kinds of entities to look up, all by default"),
+                limit: int = Query(default=5, le=20),
+                session: AsyncSession = Depends(get_async_session)):
+    """
+    Returns the ships, courses and collections whose name is most similar to q, most similar first, for looking names
+    up despite typos. Names are compared by the trigrams (runs of three characters) they share
+    """
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        tables = tuple(table for table in SEARCHABLE_TABLES if types is None or table in types)
+        result = await session.execute(fuzzy_statement(dialect, tables), {"query": q, "limit": limit})
+        return [row_dict(row, SchemaNameMatch) for row in result.all()]
+
+    matches = []
+    for type_, index in name_indexes.items():
+        if types is not None and type_ not in types:
+            continue
+
+        # The database answers only until the startup hook has loaded the index
+        found = index.match(q, limit) if index.ready else await match_names(session, type_, q, limit)
+        matches.extend({"type": type_.value, "id": entity_id, "name": name, "score": score}
+                       for entity_id, name, score in found)
+
+    return heapq.nsmallest(limit, matches, key=lambda match: (-match["score"], match["type"], match["id"]))
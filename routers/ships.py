@@ -1,5 +1,4 @@
 from fastapi import Depends, HTTPException, APIRouter, Query
-from fastapi_cache.decorator import cache
 from sqlalchemy import and_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,10 +7,20 @@ from starlette.requests import Request
 from starlette.responses import Response
 from starlette.status import HTTP_204_NO_CONTENT
 
+from config import config
 from database.database import User, get_async_session
 from database.models.models import Ship, ShipHasRating
-from schemas.ship import ShipIn as SchemaShipIn, ShipRead as SchemaShipRead, ShipUpdate as SchemaShipUpdate
+from routers.search import ship_names
+from schemas.ship import ShipIn as SchemaShipIn, ShipRead as SchemaShipRead, ShipUpdate as SchemaShipUpdate, \
+    ShipReadSimple as SchemaShipReadSimple
+from utilities.fastapi_cache.decorator import cache
+from utilities.fastapi_cache.normalized import cached_list
+from utilities.fastapi_cache.tags import SEARCH, SHIPS_LIST, invalidate_tags, ship_list_tags, ship_name_tag, \
+    ship_not_found_tags, ship_tag, ship_tags, user_tag
 from utilities.fastapi_users.users import current_active_user
+from utilities.fieldsets import FIELDS_DESCRIPTION, column_options, parse_fields, project
+from utilities.pagination import CURSOR_DESCRIPTION, next_cursor_headers, paginate
+from utilities.serialization import row_dict
 
 ship_router = APIRouter()
 
@@ -35,6 +44,8 @@ async def create_ship(ship: SchemaShipIn,
     except IntegrityError as _:
         raise HTTPException(status_code=409, detail=f"Ship name: {ship.name} already taken")
 
+    await ship_names.add(db_ship.id, {"name": db_ship.name, "popularity": 0})
+    await invalidate_tags(ship_name_tag(db_ship.name), SHIPS_LIST, user_tag(user.username, "ships"))
     return db_ship.__dict__
 
 
@@ -70,6 +81,7 @@ async def rate_ship(ship_id: int,
     else:
         raise HTTPException(status_code=400, detail="Rating must be 0 (not recommended) or 1 (recommended)")
 
+    await invalidate_tags(ship_tag(ship_id))
     return Response(status_code=HTTP_204_NO_CONTENT)
 
 
@@ -96,6 +108,8 @@ async def update_ship_by_id(ship_id: int,
             setattr(db_ship, "ship_json", ship.ship_json.dict())
 
     await session.commit()
+    await ship_names.rename(db_ship.id, db_ship.name)
+    await invalidate_tags(ship_tag(db_ship.id), ship_name_tag(db_ship.name), SEARCH)
     return Response(status_code=HTTP_204_NO_CONTENT)
 
 
@@ -122,62 +136,87 @@ async def update_ship_by_name(ship_name: str,
             setattr(db_ship, "ship_json", ship.ship_json.dict())
 
     await session.commit()
+    await ship_names.rename(db_ship.id, db_ship.name)
+    await invalidate_tags(ship_tag(db_ship.id), ship_name_tag(db_ship.name), SEARCH)
     return Response(status_code=HTTP_204_NO_CONTENT)
 
 
-@ship_router.get("/ships/", response_model=list[SchemaShipRead], status_code=200, tags=["ships"])
-@cache(expire=30)
+@ship_router.get("/ships/", response_model=list[SchemaShipRead] | list[SchemaShipReadSimple], status_code=200,
+                 tags=["ships"])
 async def get_ships(request: Request,
-                    response: Response,
                     username: str | None = None,
                     offset: int = 0,
                     limit: int = Query(default=30, lte=50),
+                    cursor: str | None = Query(default=None, description=CURSOR_DESCRIPTION),
+                    summary: bool = False,
+                    fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
                     session: AsyncSession = Depends(get_async_session)):
-    if username is None:
-        stmt = select(Ship).offset(offset).limit(limit)
-    elif username is not None:
-        user_result = await session.execute(select(User).where(User.username == username))
-        user = user_result.scalars().first()
+    """
+    Returns the ships with their ship JSON, or only their metadata when summary is set
+    """
+    schema = SchemaShipReadSimple if summary else SchemaShipRead
+    projection = parse_fields(fields, schema)
+    schema = project(schema, projection)
 
-        if user is None:
-            raise HTTPException(status_code=404,
-                                detail=f"Can't search for ship by {username} because: {username} doesn't exist")
+    async def load_ids() -> list[int]:
+        if username is None:
+            stmt = paginate(select(Ship.id), Ship.id, offset, limit, cursor)
+        elif username is not None:
+            user_result = await session.execute(select(User).where(User.username == username))
+            user = user_result.scalars().first()
 
-        stmt = select(Ship).where(Ship.author_id == user.id).offset(offset).limit(limit)
+            if user is None:
+                raise HTTPException(status_code=404,
+                                    detail=f"Can't search for ship by {username} because: {username} doesn't exist")
 
-    result = await session.execute(stmt)
-    ships_db = result.scalars().all()
+            stmt = paginate(select(Ship.id).where(Ship.author_id == user.id), Ship.id, offset, limit, cursor)
 
-    return [SchemaShipRead.from_orm(ship).dict() for ship in ships_db]
+        result = await session.execute(stmt)
+        return result.scalars().all()
+
+    async def load_ships(ship_ids: list[int]) -> list[dict]:
+        result = await session.execute(select(Ship).where(Ship.id.in_(ship_ids)).options(*column_options(Ship, schema)))
+        return [row_dict(ship, schema) for ship in result.scalars().all()]
+
+    # Summaries are cached apart from the full ships since they're different entities under the same ids
+    return await cached_list(request, "ships:summary" if summary else "ships", load_ids, load_ships,
+                             ship_list_tags(None, {"username": username}), ship_tags, expire=config.CACHE_EXPIRE,
+                             fields=projection, page_headers=next_cursor_headers(limit))
 
 
 @ship_router.get("/ships/name/{ship_name}", response_model=SchemaShipRead, status_code=200, tags=["ships"])
-@cache(expire=30)
+@cache(expire=config.CACHE_EXPIRE, namespace="ships:name", tags=ship_tags, asgi=True,
+       s_maxage=config.CACHE_S_MAXAGE, not_found_expire=config.CACHE_NOT_FOUND_EXPIRE,
+       not_found_tags=ship_not_found_tags)
 async def get_ship_by_name(ship_name: str,
                            request: Request,
                            response: Response,
+                           fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
                            session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Ship).where(Ship.name == ship_name))
+    schema = project(SchemaShipRead, parse_fields(fields, SchemaShipRead))
+    result = await session.execute(select(Ship).where(Ship.name == ship_name).options(*column_options(Ship, schema)))
     db_ship = result.scalars().first()
 
     if db_ship is None:
         raise HTTPException(status_code=404, detail=f"Ship: {ship_name} not found")
-    return SchemaShipRead.from_orm(db_ship).dict()
+    return row_dict(db_ship, schema)
 
 
 @ship_router.get("/ships/id/{ship_id}", response_model=SchemaShipRead, status_code=200, tags=["ships"])
-@cache(expire=30)
+@cache(expire=config.CACHE_EXPIRE, namespace="ships:id", tags=ship_tags, asgi=True, s_maxage=config.CACHE_S_MAXAGE)
 async def get_ship_by_id(ship_id: int,
                          request: Request,
                          response: Response,
+                         fields: str | None = Query(default=None, description=FIELDS_DESCRIPTION),
                          session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Ship).where(Ship.id == ship_id))
+    schema = project(SchemaShipRead, parse_fields(fields, SchemaShipRead))
+    result = await session.execute(select(Ship).where(Ship.id == ship_id).options(*column_options(Ship, schema)))
     db_ship = result.scalars().first()
 
     if db_ship is None:
         raise HTTPException(status_code=404, detail=f"Ship id: {ship_id} not found")
 
-    return SchemaShipRead.from_orm(db_ship).dict()
+    return row_dict(db_ship, schema)
 
 
 @ship_router.delete("/ships/id/{ship_id}", status_code=204, tags=["ships"])
@@ -195,5 +234,7 @@ async def delete_ship_by_id(ship_id: int,
                             detail=f"You: {User.username} are not the creator of ship: {db_ship.name}")
     await session.delete(db_ship)
     await session.commit()
+    await ship_names.remove(ship_id)
+    await invalidate_tags(ship_tag(ship_id), SHIPS_LIST, user_tag(user.username, "ships"))
 
     return Response(status_code=HTTP_204_NO_CONTENT)
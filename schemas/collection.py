@@ -39,6 +39,26 @@ class CollectionRead(Collection):
         orm_mode = True
 
 
+class CollectionCourse(BaseModel):
+    """
+    A course of a collection summary, the full course is returned by /collections/id/{collection_id}/courses
+    """
+    id: int
+    name: str
+
+
+class CollectionSummary(Collection):
+    """
+    Schema used when listing collections in summary mode. Courses are only listed by id and name along with their
+    count, instead of embedding every course with its course JSON
+    """
+    id: int
+    name: str
+    author_id: UUID
+    course_count: int
+    courses: list[CollectionCourse]
+
+
 class CollectionAddCourse(BaseModel):
     """
     Used for populating the associative table, collection_has_course, that requires both the collection and course to
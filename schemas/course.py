@@ -223,3 +223,13 @@ class CourseRead(Course):
 
     class Config:
         orm_mode = True
+
+
+class CourseFacets(BaseModel):
+    """
+    Schema used when returning the facet counts of the courses. total is the number of courses matching every filter,
+    facets holds the number of courses per value of each facet (game_type, difficulty, length and location) matching
+    the filters on the other facets
+    """
+    total: int
+    facets: dict[str, dict[str, int]]
@@ -0,0 +1,48 @@
+from enum import Enum
+
+from pydantic import BaseModel
+
+
+class SearchType(str, Enum):
+    """
+    Kinds of entities searched by /search/
+    """
+    ship = "ship"
+    course = "course"
+    collection = "collection"
+
+
+class SearchResult(BaseModel):
+    """
+    Schema used when returning a search match. type and id identify the matching entity, which is fetched through its
+    own routes. Higher ranks are better matches
+    """
+    type: SearchType
+    id: int
+    name: str
+    description: str
+    rank: float
+
+    class Config:
+        orm_mode = True
+
+
+class Suggestion(BaseModel):
+    """
+    Schema used when returning an autocompleted name. popularity is the number of positive ratings of the entity
+    """
+    type: SearchType
+    id: int
+    name: str
+    popularity: int
+
+
+class NameMatch(BaseModel):
+    """
+    Schema used when returning a name approximately matching a lookup. score is the similarity of the names, from 0 to
+    1 for identical names
+    """
+    type: SearchType
+    id: int
+    name: str
+    score: float
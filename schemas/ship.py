@@ -69,3 +69,17 @@ class ShipRead(Ship):
 
     class Config:
         orm_mode = True
+
+
+class ShipReadSimple(BaseModel):
+    """
+    The Ship schema used for listing ships without their ship JSON, which is only loaded when a ship is requested on
+    its own or when the full list is asked for
+    """
+    id: int
+    name: str
+    description: str
+    author_id: uuid.UUID
+
+    class Config:
+        orm_mode = True
@@ -501,6 +501,22 @@ async def test_create_collection_add_course_by_col_id_course_name(async_client:
     assert data["courses"][0]["name"] == "Slippery Snake"
 
 
+@pytest.mark.asyncio
+async def test_add_course_to_collection_twice(async_client: AsyncClient) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await async_client.post("/collections/", headers=headers, json=collection_payload)
+    await async_client.post("/courses/", headers=headers, json=course_payload)
+
+    for path in ("/collections/id/1/id/1", "/collections/id/1/name/Slippery Snake",
+                 "/collections/name/Test Collection/name/Slippery Snake", "/collections/id/1/id/1"):
+        response = await async_client.patch(path, headers=headers)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [course["name"] for course in response.json()["courses"]] == ["Slippery Snake"]
+
+
 @pytest.mark.asyncio
 async def test_create_collection_rating(async_client: AsyncClient) -> None:
     await async_client.post("/auth/register", json=user_payload)
@@ -576,3 +592,128 @@ async def test_delete_collection_rating(async_client: AsyncClient) -> None:
 #     assert data["name"] == "Test Collection"
 #     assert data["description"] == "Test description"
 #     assert len(data["courses"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_collection_writes_load_only_course_ids(async_client: AsyncClient, statements: list[str]) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await async_client.post("/collections/", headers=headers, json=collection_payload)
+    for i in range(2):
+        await async_client.post("/courses/", headers=headers, json={**course_payload, "name": f"Course {i}"})
+        await async_client.patch(f"/collections/id/1/id/{i + 1}", headers=headers)
+
+    statements.clear()
+    response = await async_client.patch("/collections/id/1", headers=headers, json={"courses_to_remove_by_id": [1]})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    response = await async_client.get("/collections/id/1/courses")
+    assert [course["name"] for course in response.json()] == ["Course 1"]
+
+    response = await async_client.delete("/collections/id/1", headers=headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    # The collection's courses are read through collection_has_course without their JSON, which is deleted with it
+    loads = [statement for statement in statements if "JOIN collection_has_course" in statement]
+    assert len(loads) == 2 and all("course_json" not in statement for statement in loads)
+    assert any(statement.startswith("DELETE FROM collection_has_course") for statement in statements)
+
+
+@pytest.mark.asyncio
+async def test_get_collection_fields_without_courses(async_client: AsyncClient, statements: list[str]) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await async_client.post("/collections/", headers=headers, json=collection_payload)
+    await async_client.post("/courses/", headers=headers, json=course_payload)
+    await async_client.patch("/collections/id/1/id/1", headers=headers)
+
+    statements.clear()
+    response = await async_client.get("/collections/", params={"fields": "name,author_id"})
+    data = response.json()
+    assert data == [{"id": 1, "name": "Test Collection", "author_id": data[0]["author_id"]}]
+    # The courses aren't joined when they aren't requested
+    assert [statement for statement in statements if "course_json" in statement] == []
+
+    response = await async_client.get("/collections/id/1", params={"fields": "courses"})
+    assert response.json()["courses"][0]["name"] == "Slippery Snake"
+
+
+@pytest.mark.asyncio
+async def test_get_collections_summary(async_client: AsyncClient, statements: list[str]) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await async_client.post("/collections/", headers=headers, json=collection_payload)
+    await async_client.post("/collections/", headers=headers,
+                            json={**collection_payload, "name": "Empty Collection"})
+    await async_client.post("/courses/", headers=headers, json=course_payload)
+    await async_client.post("/courses/", headers=headers, json={**course_payload, "name": "Second Course"})
+    await async_client.patch("/collections/id/1/id/1", headers=headers)
+    await async_client.patch("/collections/id/1/id/2", headers=headers)
+
+    statements.clear()
+    response = await async_client.get("/collections/", params={"summary": True})
+    assert response.status_code == status.HTTP_200_OK
+
+    data = {collection["name"]: collection for collection in response.json()}
+    assert data["Test Collection"]["course_count"] == 2
+    assert data["Test Collection"]["courses"] == [{"id": 1, "name": "Slippery Snake"},
+                                                  {"id": 2, "name": "Second Course"}]
+    assert data["Empty Collection"]["course_count"] == 0
+    assert data["Empty Collection"]["courses"] == []
+    assert [statement for statement in statements if "course_json" in statement] == []
+
+    response = await async_client.get("/collections/", params={"summary": True, "fields": "name,course_count"})
+    assert sorted(response.json(), key=lambda collection: collection["id"]) == [
+        {"id": 1, "name": "Test Collection", "course_count": 2},
+        {"id": 2, "name": "Empty Collection", "course_count": 0}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_collection_courses_pages(async_client: AsyncClient) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await async_client.post("/collections/", headers=headers, json=collection_payload)
+    for i in range(3):
+        await async_client.post("/courses/", headers=headers, json={**course_payload, "name": f"Course {i}"})
+        await async_client.patch(f"/collections/id/1/id/{i + 1}", headers=headers)
+
+    response = await async_client.get("/collections/id/1/courses", params={"limit": 2})
+    data = response.json()
+    assert [course["name"] for course in data] == ["Course 0", "Course 1"]
+    assert data[0]["course_json"]["checkpoints"]
+
+    response = await async_client.get("/collections/id/1/courses", params={"offset": 2, "limit": 2})
+    assert [course["name"] for course in response.json()] == ["Course 2"]
+
+    response = await async_client.get("/collections/id/2/courses")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = await async_client.get("/collections/id/1/courses", params={"limit": 21})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_get_collections_loads_courses_in_one_query(async_client: AsyncClient, statements: list[str]) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    for i in range(3):
+        await async_client.post("/collections/", headers=headers, json={**collection_payload, "name": f"Col {i}"})
+        await async_client.post("/courses/", headers=headers, json={**course_payload, "name": f"Course {i}"})
+        await async_client.patch(f"/collections/id/{i + 1}/id/{i + 1}", headers=headers)
+
+    statements.clear()
+    response = await async_client.get("/collections/")
+    assert sorted(len(collection["courses"]) for collection in response.json()) == [1, 1, 1]
+
+    # The page of ids, the collections and a single query for the courses of every collection
+    assert len(statements) == 3
+    assert "JOIN" not in statements[1]
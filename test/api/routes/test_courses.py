@@ -1,7 +1,15 @@
+import itertools
+
 import pytest
+from fastapi_cache import FastAPICache
 from httpx import AsyncClient
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+from database.database import engine
+from database.models.models import Course
+
 user_payload = {
     "email": "test@example.com",
     "password": "test",
@@ -466,3 +474,264 @@ async def test_rating_course_by_id(async_client: AsyncClient) -> None:
 
     response = await async_client.put("/courses/1/rating/0", headers=headers)
     assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.asyncio
+async def test_update_course_evicts_cached_course(async_client: AsyncClient, cache_backend) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    data = response.json()
+
+    token = data["access_token"]
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {token}"
+    }
+
+    await async_client.post("/courses/", headers=headers, json=course_payload)
+
+    # Populating the cache for the detail and list routes
+    await async_client.get("/courses/id/1")
+    await async_client.get("/courses/name/Slippery Snake")
+    await async_client.get("/courses/")
+
+    update_payload = {key: course_payload[key] for key in ("game_type", "difficulty", "length", "course_json")}
+    update_payload["description"] = "Updated description"
+
+    response = await async_client.patch("/courses/id/1", headers=headers, json=update_payload)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    response = await async_client.get("/courses/id/1")
+    assert response.json()["description"] == "Updated description"
+
+    response = await async_client.get("/courses/name/Slippery Snake")
+    assert response.json()["description"] == "Updated description"
+
+    response = await async_client.get("/courses/")
+    assert response.json()[0]["description"] == "Updated description"
+
+
+@pytest.mark.asyncio
+async def test_cached_course_response_matches_uncached(async_client: AsyncClient, cache_backend, monkeypatch) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    data = response.json()
+
+    token = data["access_token"]
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {token}"
+    }
+
+    await async_client.post("/courses/", headers=headers, json=course_payload)
+
+    # Letting FastAPI validate and encode the response itself
+    monkeypatch.setattr(FastAPICache, "_enable", False)
+    uncached = await async_client.get("/courses/id/1")
+    monkeypatch.setattr(FastAPICache, "_enable", True)
+
+    await async_client.get("/courses/id/1")
+    hit = await async_client.get("/courses/id/1")
+
+    assert hit.status_code == status.HTTP_200_OK
+    assert hit.headers["content-type"] == "application/json"
+    assert hit.content == uncached.content
+    assert hit.json()["course_json"] == course_payload["course_json"]
+
+
+@pytest.mark.asyncio
+async def test_create_course_evicts_cached_not_found(async_client: AsyncClient, cache_backend) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    data = response.json()
+
+    token = data["access_token"]
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {token}"
+    }
+
+    response = await async_client.get("/courses/name/Slippery Snake")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    hit = await async_client.get("/courses/name/Slippery Snake")
+    assert hit.status_code == status.HTTP_404_NOT_FOUND
+    assert hit.content == response.content
+    assert cache_backend.stats()["entries"] == 1
+
+    await async_client.post("/courses/", headers=headers, json=course_payload)
+
+    response = await async_client.get("/courses/name/Slippery Snake")
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_cached_course_list_matches_uncached(async_client: AsyncClient, cache_backend, monkeypatch) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    data = response.json()
+
+    token = data["access_token"]
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {token}"
+    }
+
+    await async_client.post("/courses/", headers=headers, json=course_payload)
+
+    monkeypatch.setattr(FastAPICache, "_enable", False)
+    uncached = await async_client.get("/courses/")
+    monkeypatch.setattr(FastAPICache, "_enable", True)
+
+    miss = await async_client.get("/courses/")
+    hit = await async_client.get("/courses/")
+
+    assert miss.content == uncached.content
+    assert hit.content == uncached.content
+    # Clients revalidate every use, getting a 304 until the list changes
+    assert hit.headers["cache-control"] == "no-cache"
+    revalidated = await async_client.get("/courses/", headers={"If-None-Match": hit.headers["etag"]})
+    assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.asyncio
+async def test_get_courses_does_not_load_course_json(async_client: AsyncClient, statements: list[str]) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await async_client.post("/courses/", headers=headers, json=course_payload)
+
+    statements.clear()
+    response = await async_client.get("/courses/")
+    assert "course_json" not in response.json()[0]
+    assert [statement for statement in statements if "course_json" in statement] == []
+
+
+@pytest.mark.asyncio
+async def test_get_courses_filters(async_client: AsyncClient, cache_backend) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    for name, game_type, difficulty, length in (("Hard Short", "Time Trial", "Hard", "Short"),
+                                                ("Easy Short", "Time Trial", "Easy", "Short"),
+                                                ("Hard Laps", "Laps", "Hard", "Long")):
+        await async_client.post("/courses/", headers=headers, json={**course_payload, "name": name,
+                                                                    "game_type": game_type, "difficulty": difficulty,
+                                                                    "length": length})
+
+    response = await async_client.get("/courses/", params={"game_type": "Time Trial", "difficulty": "Hard",
+                                                           "length": "Short"})
+    assert [course["name"] for course in response.json()] == ["Hard Short"]
+
+    response = await async_client.get("/courses/", params={"difficulty": "Hard"})
+    assert [course["name"] for course in response.json()] == ["Hard Short", "Hard Laps"]
+
+    response = await async_client.get("/courses/", params={"length": "Endless"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    # Updating a course's metadata evicts the cached filtered pages it moves in or out of
+    await async_client.patch("/courses/id/2", headers=headers,
+                             json={"description": "Now hard", "game_type": "Time Trial", "difficulty": "Hard",
+                                   "length": "Short", "course_json": course_payload["course_json"]})
+    response = await async_client.get("/courses/", params={"difficulty": "Hard"})
+    assert [course["name"] for course in response.json()] == ["Hard Short", "Easy Short", "Hard Laps"]
+
+
+@pytest.mark.asyncio
+async def test_get_courses_filters_use_index(async_client: AsyncClient, session: AsyncSession) -> None:
+    metadata = list(itertools.product(["Free Roam", "Time Trial", "Sprint", "Laps", "Hoon Attack", "Training"],
+                                      ["Easy", "Medium", "Hard", "Dangerous"],
+                                      ["Short", "Medium", "Long", "Endurance"]))
+    await session.execute(insert(Course), [
+        {"name": f"Course {index}", "game_type": game_type, "difficulty": difficulty, "length": length,
+         "description": "Generated course", "course_json": {}}
+        for index, (game_type, difficulty, length) in enumerate(metadata * 100)
+    ])
+    await session.execute(text("ANALYZE"))
+
+    queries = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT course.id"):
+            queries.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        for params, index in (({"game_type": "Time Trial", "difficulty": "Hard", "length": "Short"},
+                               "ix_course_game_type_difficulty_length"),
+                              ({"difficulty": "Hard", "length": "Short"}, "ix_course_difficulty_length"),
+                              ({"length": "Short"}, "ix_course_length")):
+            queries.clear()
+            response = await async_client.get("/courses/", params=params)
+            assert len(response.json()) == 20
+
+            statement, parameters = queries[0]
+            connection = await session.connection()
+            result = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plan = [row[3] for row in result.all()]
+            assert any(index in step for step in plan), plan
+            assert not any(step.startswith("SCAN course") and "INDEX" not in step for step in plan), plan
+            assert not any("TEMP B-TREE" in step for step in plan), plan
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+async def create_facet_courses(async_client: AsyncClient) -> dict:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    for name, difficulty, location in (("Hard Space", "Hard", "Space"), ("Easy Space", "Easy", "Space"),
+                                       ("Hard Canyons", "Hard", "Canyons")):
+        await async_client.post("/courses/", headers=headers,
+                                json={**course_payload, "name": name, "difficulty": difficulty,
+                                      "course_json": {**course_payload["course_json"], "location": location}})
+    return headers
+
+
+@pytest.mark.asyncio
+async def test_get_course_facets(async_client: AsyncClient, course_facets, statements: list[str]) -> None:
+    headers = await create_facet_courses(async_client)
+
+    statements.clear()
+    response = await async_client.get("/courses/facets", params={"difficulty": "Hard"})
+    assert response.json()["total"] == 2
+    assert response.json()["facets"]["difficulty"] == {"Easy": 1, "Hard": 2}
+    assert response.json()["facets"]["location"] == {"Canyons": 1, "Space": 1}
+
+    response = await async_client.get("/courses/", params={"difficulty": "Hard", "location": "Space"})
+    assert [course["name"] for course in response.json()] == ["Hard Space"]
+    # Both answered by the facet index, only the courses themselves are read from the database
+    assert [statement for statement in statements if "course.difficulty =" in statement] == []
+
+    # Updates and deletes are applied to the index
+    await async_client.patch("/courses/id/2", headers=headers,
+                             json={"description": "Now hard", "game_type": "Time Trial", "difficulty": "Hard",
+                                   "length": "Short", "course_json": course_payload["course_json"]})
+    await async_client.delete("/courses/id/3", headers=headers)
+
+    response = await async_client.get("/courses/facets")
+    assert response.json() == {"total": 2, "facets": {"game_type": {"Time Trial": 2}, "difficulty": {"Hard": 2},
+                                                      "length": {"Short": 2}, "location": {"Space": 2}}}
+
+
+@pytest.mark.asyncio
+async def test_get_course_facets_before_the_index_is_loaded(async_client: AsyncClient) -> None:
+    await create_facet_courses(async_client)
+
+    response = await async_client.get("/courses/facets", params={"location": "Space"})
+    assert response.json()["total"] == 2
+    assert response.json()["facets"]["location"] == {"Canyons": 1, "Space": 2}
+
+    response = await async_client.get("/courses/", params={"difficulty": "Hard", "location": "Canyons"})
+    assert [course["name"] for course in response.json()] == ["Hard Canyons"]
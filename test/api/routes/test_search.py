@@ -0,0 +1,145 @@
+import pytest
+from httpx import AsyncClient
+from starlette import status
+
+from test.api.routes.test_collections import collection_payload, course_payload, form_data, user_payload
+from test.api.routes.test_ships import ship_payload
+
+
+@pytest.mark.asyncio
+async def test_search(async_client: AsyncClient, cache_backend) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await async_client.post("/ships/", headers=headers,
+                            json={**ship_payload, "name": "Snake Eater", "description": "Built for tight turns"})
+    await async_client.post("/courses/", headers=headers,
+                            json={**course_payload, "description": "A snake shaped canyon run"})
+    await async_client.post("/collections/", headers=headers, json=collection_payload)
+
+    # Matches in names rank above matches in descriptions
+    response = await async_client.get("/search/", params={"q": "snake"})
+    assert response.status_code == status.HTTP_200_OK
+    assert [(result["type"], result["id"]) for result in response.json()] == [("course", 1), ("ship", 1)]
+    assert response.json()[0]["name"] == "Slippery Snake"
+
+    response = await async_client.get("/search/", params={"q": "snake", "type": "ship"})
+    assert [(result["type"], result["id"]) for result in response.json()] == [("ship", 1)]
+
+    # Every word has to match
+    response = await async_client.get("/search/", params={"q": "snake turns"})
+    assert [(result["type"], result["id"]) for result in response.json()] == [("ship", 1)]
+
+    # The index follows updates and deletes, which evict the cached searches
+    response = await async_client.patch("/collections/id/1", headers=headers,
+                                        json={"collection": {"description": "Every snake course"}})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    response = await async_client.delete("/courses/id/1", headers=headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    response = await async_client.get("/search/", params={"q": "snake"})
+    assert [(result["type"], result["id"]) for result in response.json()] == [("ship", 1), ("collection", 1)]
+
+
+@pytest.mark.asyncio
+async def test_search_operators_are_searched_for(async_client: AsyncClient) -> None:
+    response = await async_client.get("/search/", params={"q": 'snake" OR NEAR(*'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_search_limit_is_capped(async_client: AsyncClient) -> None:
+    response = await async_client.get("/search/", params={"q": "snake", "limit": 51})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    response = await async_client.get("/search/", params={"q": "!!"})
+    assert response.json() == []
+
+
+async def create_named_entities(async_client: AsyncClient) -> dict:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await async_client.post("/ships/", headers=headers, json={**ship_payload, "name": "Slipstream"})
+    await async_client.post("/courses/", headers=headers, json=course_payload)
+    await async_client.post("/collections/", headers=headers, json={**collection_payload, "name": "Slow Tours"})
+    return headers
+
+
+@pytest.mark.asyncio
+async def test_autocomplete(async_client: AsyncClient, name_indexes) -> None:
+    headers = await create_named_entities(async_client)
+    await async_client.put("/courses/1/rating/1", headers=headers)
+    # Popularity is picked up by the periodic rebuild
+    for index in name_indexes.values():
+        await index.refresh()
+
+    response = await async_client.get("/autocomplete/", params={"q": "sli"})
+    assert response.json() == [{"type": "course", "id": 1, "name": "Slippery Snake", "popularity": 1},
+                               {"type": "ship", "id": 1, "name": "Slipstream", "popularity": 0}]
+
+    response = await async_client.get("/autocomplete/", params={"q": "SL", "type": ["ship", "collection"]})
+    assert [suggestion["name"] for suggestion in response.json()] == ["Slipstream", "Slow Tours"]
+
+    # Deletes are applied to the indexes
+    await async_client.delete("/courses/id/1", headers=headers)
+
+    response = await async_client.get("/autocomplete/", params={"q": "sl"})
+    assert [suggestion["name"] for suggestion in response.json()] == ["Slipstream", "Slow Tours"]
+
+
+@pytest.mark.asyncio
+async def test_autocomplete_before_the_indexes_are_loaded(async_client: AsyncClient) -> None:
+    await create_named_entities(async_client)
+
+    response = await async_client.get("/autocomplete/", params={"q": "slo"})
+    assert response.json() == [{"type": "collection", "id": 1, "name": "Slow Tours", "popularity": 0}]
+
+    # LIKE wildcards are matched literally
+    response = await async_client.get("/autocomplete/", params={"q": "%"})
+    assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_autocomplete_limit_is_capped(async_client: AsyncClient) -> None:
+    response = await async_client.get("/autocomplete/", params={"q": "s", "limit": 21})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_fuzzy(async_client: AsyncClient, name_indexes) -> None:
+    headers = await create_named_entities(async_client)
+
+    response = await async_client.get("/fuzzy/", params={"q": "Slipery Snake"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{"type": "course", "id": 1, "name": "Slippery Snake", "score": 0.8}]
+
+    response = await async_client.get("/fuzzy/", params={"q": "slipstram", "type": ["course", "ship"]})
+    assert [match["name"] for match in response.json()] == ["Slipstream"]
+
+    # Deletes are applied to the indexes
+    await async_client.delete("/courses/id/1", headers=headers)
+
+    response = await async_client.get("/fuzzy/", params={"q": "Slipery Snake", "limit": 1})
+    assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test_fuzzy_before_the_indexes_are_loaded(async_client: AsyncClient) -> None:
+    await create_named_entities(async_client)
+
+    response = await async_client.get("/fuzzy/", params={"q": "slow tour"})
+    assert response.json() == [{"type": "collection", "id": 1, "name": "Slow Tours", "score": 0.75}]
+
+    # Scored like the index would
+    response = await async_client.get("/fuzzy/", params={"q": "Slipery Snake", "type": "course"})
+    assert response.json() == [{"type": "course", "id": 1, "name": "Slippery Snake", "score": 0.8}]
+
+
+@pytest.mark.asyncio
+async def test_fuzzy_limit_is_capped(async_client: AsyncClient) -> None:
+    response = await async_client.get("/fuzzy/", params={"q": "snake", "limit": 21})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
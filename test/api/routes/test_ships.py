@@ -1,7 +1,10 @@
 import pytest
+from fastapi_cache import FastAPICache
 from httpx import AsyncClient
 from starlette import status
 
+from utilities.fastapi_cache.backends.metered import MeteredBackend
+
 user_payload = {
     "email": "test@example.com",
     "password": "test",
@@ -212,3 +215,102 @@ async def test_rating_ship_by_id(async_client: AsyncClient) -> None:
 
     response = await async_client.put("/ships/1/rating/0", headers=headers)
     assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.asyncio
+async def test_cache_metrics_endpoint(async_client: AsyncClient, cache_backend, cache_metrics) -> None:
+    FastAPICache._backend = MeteredBackend(cache_backend)
+
+    await async_client.get("/ships/")
+    await async_client.get("/ships/")
+
+    response = await async_client.get("/metrics/cache")
+    assert response.status_code == status.HTTP_200_OK
+
+    data = response.json()
+    assert data["enabled"] is True
+    assert data["namespaces"]["ships:list"]["hits"] == 1
+    assert data["namespaces"]["ships:list"]["misses"] == 1
+    assert data["backend"]["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_ships_summary(async_client: AsyncClient) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await async_client.post("/ships/", headers=headers, json=ship_payload)
+
+    response = await async_client.get("/ships/", params={"summary": True})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{"id": 1, "name": "Test Ship", "description": "Test description",
+                                "author_id": response.json()[0]["author_id"]}]
+
+    response = await async_client.get("/ships/id/1")
+    assert response.json()["ship_json"]["angularDrag"] == 10.0
+
+
+@pytest.mark.asyncio
+async def test_get_ships_fields(async_client: AsyncClient, cache_backend, statements: list[str]) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await async_client.post("/ships/", headers=headers, json=ship_payload)
+
+    statements.clear()
+    response = await async_client.get("/ships/", params={"fields": "name"})
+    assert response.json() == [{"id": 1, "name": "Test Ship"}]
+    assert [statement for statement in statements if "ship_json" in statement] == []
+
+    response = await async_client.get("/ships/id/1", params={"fields": "name,description"})
+    assert response.json() == {"id": 1, "name": "Test Ship", "description": "Test description"}
+
+    # Projections are cached apart from the full responses
+    response = await async_client.get("/ships/")
+    assert response.json()[0]["ship_json"]["angularDrag"] == 10.0
+    response = await async_client.get("/ships/id/1")
+    assert response.json()["ship_json"]["angularDrag"] == 10.0
+
+
+@pytest.mark.asyncio
+async def test_get_ships_unknown_field(async_client: AsyncClient) -> None:
+    response = await async_client.get("/ships/", params={"fields": "name,password"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_get_ships_cursor(async_client: AsyncClient, cache_backend) -> None:
+    await async_client.post("/auth/register", json=user_payload)
+
+    response = await async_client.post("/auth/jwt/login", data=form_data)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    for index in range(3):
+        await async_client.post("/ships/", headers=headers, json={**ship_payload, "name": f"Ship {index}"})
+
+    response = await async_client.get("/ships/", params={"limit": 2, "fields": "name"})
+    assert [ship["id"] for ship in response.json()] == [1, 2]
+    cursor = response.headers["X-Next-Cursor"]
+
+    # Ships created meanwhile don't shift the following pages
+    await async_client.post("/ships/", headers=headers, json={**ship_payload, "name": "Ship 3"})
+
+    response = await async_client.get("/ships/", params={"limit": 2, "fields": "name", "cursor": cursor})
+    assert [ship["id"] for ship in response.json()] == [3, 4]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = await async_client.get("/ships/", params={"limit": 2, "fields": "name", "cursor": cursor})
+    assert response.json() == []
+    assert "X-Next-Cursor" not in response.headers
+
+    # Offset pages are ordered by id as well and return the cursor of the following page
+    response = await async_client.get("/ships/", params={"limit": 2, "offset": 2, "fields": "name"})
+    assert [ship["id"] for ship in response.json()] == [3, 4]
+    assert response.headers["X-Next-Cursor"] == cursor
+
+
+@pytest.mark.asyncio
+async def test_get_ships_invalid_cursor(async_client: AsyncClient) -> None:
+    response = await async_client.get("/ships/", params={"cursor": "not a cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
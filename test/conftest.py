@@ -1,15 +1,22 @@
 import asyncio
+from functools import partial
 from typing import AsyncGenerator, Generator, Callable
-from unittest import mock
 
 import pytest_asyncio
 from fastapi import FastAPI
+from fastapi_cache import FastAPICache
 from httpx import AsyncClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.database import Base, async_session_maker, engine
+from utilities.fastapi_cache.backends.inmemory import TaggedInMemoryBackend
+from utilities.fastapi_cache.custom_builder import custom_key_builder
+from utilities.fastapi_cache.metrics import metrics
 
-mock.patch("fastapi_cache.decorator.cache", lambda *args, **kwargs: lambda f: f).start()
+# The cache is disabled for the route tests so that responses never leak between tests. Tests covering the cache
+# itself enable it through the cache_backend fixture
+FastAPICache.init(TaggedInMemoryBackend(), prefix="fastapi-cache", key_builder=custom_key_builder, enable=False)
 
 
 @pytest_asyncio.fixture(scope="session")
@@ -51,3 +58,67 @@ def app(override_get_async_session: Callable) -> FastAPI:
 async def async_client(app: FastAPI) -> AsyncGenerator:
     async with AsyncClient(app=app, base_url="http://test") as ac:
         yield ac
+
+
+@pytest_asyncio.fixture
+def cache_backend() -> Generator:
+    backend = TaggedInMemoryBackend()
+    previous_backend, previous_enable = FastAPICache._backend, FastAPICache._enable
+    FastAPICache._backend, FastAPICache._enable = backend, True
+    yield backend
+    FastAPICache._backend, FastAPICache._enable = previous_backend, previous_enable
+
+
+@pytest_asyncio.fixture
+def cache_metrics() -> Generator:
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+
+@pytest_asyncio.fixture
+def statements() -> Generator:
+    """
+    Records the SQL statements sent to the database during a test
+    """
+    recorded = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest_asyncio.fixture
+async def course_facets(session: AsyncSession) -> AsyncGenerator:
+    """
+    Loads the course facet index from the test database, as the startup hook would
+    """
+    from routers.courses import course_facets, load_course_facets
+
+    load = course_facets.load
+    course_facets.load = lambda: load_course_facets(session)
+    await course_facets.refresh()
+    yield course_facets
+    course_facets.load = load
+    course_facets.reset()
+
+
+@pytest_asyncio.fixture
+async def name_indexes(session: AsyncSession) -> AsyncGenerator:
+    """
+    Loads the autocomplete name indexes from the test database, as the startup hook would
+    """
+    from routers.search import load_names, name_indexes
+
+    loads = {}
+    for type_, index in name_indexes.items():
+        loads[type_] = index.load
+        index.load = partial(load_names, session, type_)
+        await index.refresh()
+    yield name_indexes
+    for type_, index in name_indexes.items():
+        index.load = loads[type_]
+        index.reset()
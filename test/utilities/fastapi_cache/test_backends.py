@@ -0,0 +1,170 @@
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from utilities.fastapi_cache import entry
+from utilities.fastapi_cache.backends.inmemory import TaggedInMemoryBackend
+from utilities.fastapi_cache.backends.redis import TaggedRedisBackend
+
+
+@pytest.mark.asyncio
+async def test_inmemory_invalidate_tags_evicts_only_tagged_keys() -> None:
+    backend = TaggedInMemoryBackend()
+
+    await backend.set_with_tags("course-42", "a", 60, ["course:42", "courses:list"])
+    await backend.set_with_tags("course-43", "b", 60, ["course:43"])
+    await backend.set_with_tags("collection-1", "c", 60, ["collection:1", "course:42"])
+
+    assert await backend.invalidate_tags(["course:42"]) == 2
+
+    assert await backend.get("course-42") is None
+    assert await backend.get("collection-1") is None
+    assert await backend.get("course-43") == "b"
+
+
+@pytest.mark.asyncio
+async def test_inmemory_overwriting_key_replaces_its_tags() -> None:
+    backend = TaggedInMemoryBackend()
+
+    await backend.set_with_tags("key", "old", 60, ["old-tag"])
+    await backend.set_with_tags("key", "new", 60, ["new-tag"])
+
+    assert await backend.invalidate_tags(["old-tag"]) == 0
+    assert await backend.get("key") == "new"
+    assert await backend.invalidate_tags(["new-tag"]) == 1
+    assert await backend.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_inmemory_instances_do_not_share_a_store() -> None:
+    first = TaggedInMemoryBackend()
+    second = TaggedInMemoryBackend()
+
+    await first.set("key", "value", 60)
+
+    assert await second.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_inmemory_byte_budget_evicts_least_recently_used() -> None:
+    value = "x" * 1000
+    entry_size = TaggedInMemoryBackend._entry_size("key-0", value)
+    backend = TaggedInMemoryBackend(max_bytes=entry_size * 3)
+
+    for i in range(3):
+        await backend.set(f"key-{i}", value, 60)
+    # Touching key-0 so that key-1 becomes the least recently used entry
+    await backend.get("key-0")
+    await backend.set("key-3", value, 60)
+
+    assert await backend.get("key-1") is None
+    assert await backend.get("key-0") == value
+    assert backend.evictions == 1
+    assert backend.resident_bytes == entry_size * 3
+    assert backend.resident_bytes <= backend.max_bytes
+
+
+@pytest.mark.asyncio
+async def test_inmemory_resident_bytes_follow_deletes() -> None:
+    backend = TaggedInMemoryBackend(max_bytes=1024 * 1024)
+
+    await backend.set_with_tags("key", "value", 60, ["tag"])
+    assert backend.resident_bytes > 0
+
+    await backend.invalidate_tags(["tag"])
+    assert backend.resident_bytes == 0
+    assert backend.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_inmemory_rejects_entries_larger_than_budget() -> None:
+    backend = TaggedInMemoryBackend(max_bytes=500)
+
+    await backend.set("key", "x" * 1000, 60)
+
+    assert await backend.get("key") is None
+    assert backend.rejections == 1
+
+
+@pytest.mark.asyncio
+async def test_inmemory_tinylfu_keeps_popular_entries_during_a_scan() -> None:
+    value = "x" * 1000
+    entry_size = TaggedInMemoryBackend._entry_size("popular-0", value)
+    backend = TaggedInMemoryBackend(max_bytes=entry_size * 4, eviction_policy="tinylfu")
+
+    for i in range(4):
+        await backend.set(f"popular-{i}", value, 60)
+        for _ in range(5):
+            await backend.get(f"popular-{i}")
+
+    # A crawler requesting every page once, each request missing and then populating the cache
+    for i in range(100):
+        await backend.get(f"scan-{i}")
+        await backend.set(f"scan-{i}", value, 60)
+
+    for i in range(4):
+        assert await backend.get(f"popular-{i}") == value
+    assert backend.rejections == 100
+
+
+def test_inmemory_rejects_unknown_eviction_policy() -> None:
+    with pytest.raises(ValueError):
+        TaggedInMemoryBackend(eviction_policy="fifo")
+
+
+def make_redis_backend(**kwargs) -> TaggedRedisBackend:
+    return TaggedRedisBackend(FakeRedis(server=FakeServer(), decode_responses=False), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_redis_compresses_large_entries() -> None:
+    backend = make_redis_backend(compression="zlib", compression_min_bytes=100)
+    large = entry.pack({"etag": "abc"}, '{"checkpoints": [' + ", ".join(["1.0"] * 1000) + "]}")
+    small = entry.pack({}, "{}")
+
+    await backend.set_with_tags("large", large, 60, ["course:1"])
+    await backend.set("small", small, 60)
+
+    stored = await backend.redis.get("large")
+    assert len(stored) < len(large) / 10
+    assert b'"codec":"zlib"' in stored.partition(b"\n")[0]
+    assert await backend.redis.get("small") == small.encode()
+
+    assert await backend.get("large") == large
+    assert await backend.get_with_ttl("small") == (60, small)
+
+
+@pytest.mark.asyncio
+async def test_redis_reads_entries_written_without_compression() -> None:
+    backend = make_redis_backend(compression="zlib", compression_min_bytes=1)
+    value = entry.pack({}, "x" * 10)
+    await backend.redis.set("key", value)
+
+    assert await backend.get("key") == value
+
+
+@pytest.mark.asyncio
+async def test_redis_treats_unreadable_compressed_entries_as_misses() -> None:
+    backend = make_redis_backend()
+    await backend.redis.set("key", b'{"codec":"zlib"}\nnot zlib')
+    await backend.redis.set("other", b'{"codec":"brotli"}\n...')
+
+    assert await backend.get("key") is None
+    assert await backend.get("other") is None
+
+
+def test_redis_rejects_unknown_codec() -> None:
+    with pytest.raises(ValueError):
+        make_redis_backend(compression="brotli")
+
+
+@pytest.mark.asyncio
+async def test_redis_get_many_keeps_key_order() -> None:
+    backend = make_redis_backend(compression="zlib", compression_min_bytes=100)
+    large = entry.pack({}, "[" + ",".join(["1"] * 100) + "]")
+    await backend.set("a", large, 60)
+    await backend.set("c", entry.pack({}, "{}"), 60)
+
+    results = await backend.get_many_with_ttl(["a", "b", "c"])
+    assert [value for _, value in results] == [large, None, entry.pack({}, "{}")]
+    assert results[0][0] == 60
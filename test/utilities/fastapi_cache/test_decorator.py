@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+from starlette.responses import Response
+
+from utilities.fastapi_cache.decorator import background_refreshes, cache
+
+
+async def wait_for_background_refreshes():
+    while background_refreshes:
+        await asyncio.gather(*background_refreshes)
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_refreshing_in_background(cache_backend, monkeypatch) -> None:
+    calls = 0
+
+    @cache(expire=30, stale_ttl=300)
+    async def get_leaderboard(course_name: str, session=None):
+        nonlocal calls
+        calls += 1
+        return {"course": course_name, "version": calls}
+
+    assert await get_leaderboard(course_name="Snake", session=None) == {"course": "Snake", "version": 1}
+
+    # Moving past the freshness window but staying inside the grace window
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 60)
+
+    results = await asyncio.gather(*(get_leaderboard(course_name="Snake", session=None) for _ in range(5)))
+    assert all(result == {"course": "Snake", "version": 1} for result in results)
+
+    await wait_for_background_refreshes()
+    assert calls == 2
+    assert await get_leaderboard(course_name="Snake", session=None) == {"course": "Snake", "version": 2}
+
+
+@pytest.mark.asyncio
+async def test_entry_past_grace_window_is_recomputed_inline(cache_backend, monkeypatch) -> None:
+    calls = 0
+
+    @cache(expire=30, stale_ttl=60)
+    async def get_leaderboard(course_name: str, session=None):
+        nonlocal calls
+        calls += 1
+        return {"version": calls}
+
+    await get_leaderboard(course_name="Snake", session=None)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+
+    assert await get_leaderboard(course_name="Snake", session=None) == {"version": 2}
+    assert not background_refreshes
+
+
+@pytest.mark.asyncio
+async def test_raw_response_replays_encoded_body(cache_backend) -> None:
+    calls = 0
+
+    @cache(expire=30, raw_response=True)
+    async def get_course(course_id: int, session=None):
+        nonlocal calls
+        calls += 1
+        return {"id": course_id, "name": "Slippery Snake", "checkpoints": [{"x": 1.5}]}
+
+    miss = await get_course(course_id=1, session=None)
+    hit = await get_course(course_id=1, session=None)
+
+    assert calls == 1
+    assert isinstance(hit, Response)
+    assert hit.media_type == "application/json"
+    assert hit.body == miss.body == b'{"id":1,"name":"Slippery Snake","checkpoints":[{"x":1.5}]}'
+
+
+@pytest.mark.asyncio
+async def test_unreadable_entries_are_treated_as_misses(cache_backend) -> None:
+    @cache(expire=30)
+    async def get_course(course_id: int, session=None):
+        return {"id": course_id}
+
+    # Writing an entry in the format of the upstream fastapi-cache decorator under the same key
+    await get_course(course_id=1, session=None)
+    key = next(iter(cache_backend._store))
+    await cache_backend.set(key, '{"id": 2}', 30)
+
+    assert await get_course(course_id=1, session=None) == {"id": 1}
+
+
+@pytest.mark.asyncio
+async def test_miss_during_background_refresh_joins_it(cache_backend, monkeypatch) -> None:
+    calls = 0
+    refreshing = asyncio.Event()
+    release = asyncio.Event()
+
+    @cache(expire=30, stale_ttl=300)
+    async def get_leaderboard(course_name: str, session=None):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            refreshing.set()
+            await release.wait()
+        return {"version": calls}
+
+    await get_leaderboard(course_name="Snake", session=None)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 60)
+    assert await get_leaderboard(course_name="Snake", session=None) == {"version": 1}
+    await refreshing.wait()
+
+    # The stale entry is evicted while its refresh is running
+    await cache_backend.clear(key=next(iter(cache_backend._store)))
+    miss = asyncio.ensure_future(get_leaderboard(course_name="Snake", session=None))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await miss == {"version": 2}
+    assert calls == 2
+    await wait_for_background_refreshes()
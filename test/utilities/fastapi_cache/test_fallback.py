@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from utilities.circuit_breaker import CLOSED, OPEN, CircuitBreaker
+from utilities.fastapi_cache.backends.fallback import FallbackBackend
+from utilities.fastapi_cache.backends.inmemory import TaggedInMemoryBackend
+from utilities.fastapi_cache.backends.redis import TaggedRedisBackend
+
+
+def make_fallback_backend():
+    server = FakeServer()
+    redis = FakeRedis(server=server, decode_responses=False)
+    breaker = CircuitBreaker("test-redis", probe=redis.ping, failure_threshold=1, timeout=0.1, probe_interval=0.01)
+    backend = FallbackBackend(TaggedRedisBackend(redis), TaggedInMemoryBackend(), breaker)
+    return server, backend
+
+
+@pytest.mark.asyncio
+async def test_fallback_serves_from_memory_during_outage() -> None:
+    server, backend = make_fallback_backend()
+    await backend.set_with_tags("fastapi-cache:ships:id:1", "before", 60, ["ship:1"])
+
+    server.connected = False
+    assert await backend.get("fastapi-cache:ships:id:1") is None
+    assert backend.breaker.state == OPEN
+
+    await backend.set_with_tags("fastapi-cache:ships:id:2", "during", 60, ["ship:2"])
+    assert await backend.get("fastapi-cache:ships:id:2") == "during"
+    assert await backend.get_many_with_ttl(["fastapi-cache:ships:id:2"]) == [(60, "during")]
+    async with backend.lock("fastapi-cache:ships:id:3") as acquired:
+        assert acquired
+    await backend.breaker.stop()
+
+
+@pytest.mark.asyncio
+async def test_fallback_replays_missed_invalidations_on_recovery() -> None:
+    server, backend = make_fallback_backend()
+    await backend.set_with_tags("fastapi-cache:ships:id:1", "stale", 60, ["ship:1"])
+    await backend.set_with_tags("fastapi-cache:ships:id:2", "fresh", 60, ["ship:2"])
+
+    server.connected = False
+    await backend.invalidate_tags(["ship:1"])
+    await backend.set_with_tags("fastapi-cache:ships:id:3", "during", 60, ["ship:3"])
+    assert backend.breaker.state == OPEN
+
+    server.connected = True
+    await asyncio.sleep(0.05)
+    assert backend.breaker.state == CLOSED
+    assert await backend.get("fastapi-cache:ships:id:1") is None
+    assert await backend.get("fastapi-cache:ships:id:2") == "fresh"
+    # Entries computed during the outage don't outlive it
+    assert await backend.fallback.get("fastapi-cache:ships:id:3") is None
+
+
+@pytest.mark.asyncio
+async def test_fallback_replays_failed_invalidations_after_next_success() -> None:
+    server = FakeServer()
+    redis = FakeRedis(server=server, decode_responses=False)
+    # A single failure doesn't open this breaker
+    breaker = CircuitBreaker("test-redis", probe=redis.ping, failure_threshold=3, timeout=0.1, probe_interval=0.01)
+    backend = FallbackBackend(TaggedRedisBackend(redis), TaggedInMemoryBackend(), breaker)
+    await backend.set_with_tags("fastapi-cache:ships:id:1", "stale", 60, ["ship:1"])
+
+    server.connected = False
+    await backend.invalidate_tags(["ship:1"])
+    server.connected = True
+    assert backend.breaker.state == CLOSED
+
+    await backend.get("fastapi-cache:ships:id:2")
+    await backend._replay
+    assert await backend.get("fastapi-cache:ships:id:1") is None
+    assert not backend._missed_invalidations
+
+
+@pytest.mark.asyncio
+async def test_fallback_lock_goes_through_the_breaker() -> None:
+    server, backend = make_fallback_backend()
+    backend.primary.lock_timeout = 1
+
+    server.connected = False
+    async with backend.lock("fastapi-cache:ships:id:1") as acquired:
+        assert acquired
+    assert backend.breaker.state == OPEN
+    await backend.breaker.stop()
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from utilities.fastapi_cache.backends.layered import LayeredBackend
+
+
+def make_worker(server: FakeServer) -> LayeredBackend:
+    return LayeredBackend(FakeRedis(server=server, decode_responses=False), l1_max_entries=2, l1_expire=5)
+
+
+async def wait_for_eviction(backend: LayeredBackend, key: str):
+    for _ in range(100):
+        if await backend.l1.get(key) is None:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{key} was never evicted from L1")
+
+
+@pytest.mark.asyncio
+async def test_layered_serves_hits_from_l1() -> None:
+    backend = make_worker(FakeServer())
+
+    await backend.set_with_tags("key", "value", 60, ["course:1"])
+    # Removing the value from Redis behind the backend's back proves that the hit came from L1
+    await backend.redis.delete("key")
+
+    assert await backend.get("key") == "value"
+
+
+@pytest.mark.asyncio
+async def test_layered_fills_l1_from_l2_with_short_ttl() -> None:
+    server = FakeServer()
+    writer, reader = make_worker(server), make_worker(server)
+
+    await writer.set_with_tags("key", "value", 60, ["course:1"])
+
+    ttl, value = await reader.get_with_ttl("key")
+    assert value == "value"
+    assert ttl > 5
+    assert (await reader.l1.get_with_ttl("key"))[0] <= 5
+
+
+@pytest.mark.asyncio
+async def test_layered_l1_hits_report_the_l2_ttl() -> None:
+    backend = make_worker(FakeServer())
+
+    await backend.set_with_tags("key", "value", 60, ["course:1"])
+    await backend.redis.delete("key")
+
+    # Served from L1, whose own entry expires within 5 seconds
+    ttl, value = await backend.get_with_ttl("key")
+    assert value == "value"
+    assert 55 <= ttl <= 60
+    assert [ttl for ttl, _ in await backend.get_many_with_ttl(["key"])][0] > 5
+
+
+@pytest.mark.asyncio
+async def test_layered_l1_is_bounded() -> None:
+    backend = make_worker(FakeServer())
+
+    for i in range(3):
+        await backend.set(f"key-{i}", "value", 60)
+
+    assert await backend.l1.get("key-0") is None
+    assert (await backend.l1.get("key-2"))[1] == "value"
+
+
+@pytest.mark.asyncio
+async def test_layered_invalidation_is_broadcast_to_other_workers() -> None:
+    server = FakeServer()
+    writer, reader = make_worker(server), make_worker(server)
+    await reader.start()
+
+    try:
+        await writer.set_with_tags("key", "value", 60, ["course:1"])
+        assert await reader.get("key") == "value"
+
+        # Letting the subscription settle before publishing
+        await asyncio.sleep(0.05)
+        assert await writer.invalidate_tags(["course:1"]) == 1
+
+        await wait_for_eviction(reader, "key")
+        assert await reader.get("key") is None
+    finally:
+        await reader.stop()
+
+
+@pytest.mark.asyncio
+async def test_layered_get_many_fills_l1_from_l2() -> None:
+    server = FakeServer()
+    writer, reader = make_worker(server), make_worker(server)
+
+    await writer.set_with_tags("a", "1", 60, ["course:1"])
+    await writer.set_with_tags("b", "2", 60, ["course:2"])
+    await reader.l1.set("a", (time.time() + 60, "1"), 5)
+
+    results = await reader.get_many_with_ttl(["a", "b", "c"])
+    assert [value for _, value in results] == ["1", "2", None]
+    assert (await reader.l1.get("b"))[1] == "2"
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from fastapi_cache import FastAPICache
+
+from utilities.fastapi_cache.backends.inmemory import TaggedInMemoryBackend
+from utilities.fastapi_cache.backends.metered import MeteredBackend
+from utilities.fastapi_cache.backends.redis import TaggedRedisBackend
+from utilities.fastapi_cache.decorator import cache
+from utilities.fastapi_cache.metrics import LatencyHistogram
+
+
+def make_backends():
+    return [TaggedInMemoryBackend(), TaggedRedisBackend(FakeRedis(server=FakeServer(), decode_responses=False))]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", make_backends(), ids=["inmemory", "redis"])
+async def test_metered_backend_records_per_namespace(backend, cache_metrics) -> None:
+    metered = MeteredBackend(backend)
+
+    await metered.get_with_ttl("fastapi-cache:ships:id:abc")
+    await metered.set_with_tags("fastapi-cache:ships:id:abc", "value", 60, ["ship:1"])
+    await metered.get_with_ttl("fastapi-cache:ships:id:abc")
+    await metered.get("fastapi-cache:courses:list:def")
+
+    ships = cache_metrics.as_dict()["ships:id"]
+    assert ships["hits"] == 1
+    assert ships["misses"] == 1
+    assert ships["hit_ratio"] == 0.5
+    assert ships["bytes_stored"] == len("value")
+    assert ships["get_latency"]["count"] == 2
+    assert ships["set_latency"]["count"] == 1
+    assert cache_metrics.as_dict()["courses:list"]["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stampede_waits_are_counted(cache_backend, cache_metrics) -> None:
+    FastAPICache._backend = MeteredBackend(cache_backend)
+
+    @cache(expire=60, namespace="leaderboards:list")
+    async def get_leaderboards(session=None):
+        await asyncio.sleep(0.01)
+        return []
+
+    await asyncio.gather(*(get_leaderboards(session=None) for _ in range(5)))
+
+    leaderboards = cache_metrics.as_dict()["leaderboards:list"]
+    assert leaderboards["misses"] == 5
+    assert leaderboards["stampede_waits"] == 4
+    assert leaderboards["bytes_stored"] > 0
+
+
+def test_latency_histogram_buckets_are_cumulative() -> None:
+    histogram = LatencyHistogram()
+    for seconds in (0.0001, 0.003, 0.003, 5):
+        histogram.observe(seconds)
+
+    buckets = histogram.as_dict()["buckets"]
+    assert buckets["0.0005"] == 1
+    assert buckets["0.005"] == 3
+    assert buckets["1.0"] == 3
+    assert buckets["+Inf"] == 4
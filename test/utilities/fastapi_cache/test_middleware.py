@@ -0,0 +1,91 @@
+import pytest
+from fastapi import Depends, FastAPI, Request, Response
+from httpx import AsyncClient
+
+from utilities.fastapi_cache.decorator import cache
+from utilities.fastapi_cache.middleware import ResponseCacheMiddleware
+
+
+def build_app():
+    app = FastAPI()
+    app.state.dependency_calls = 0
+
+    async def get_dependency():
+        app.state.dependency_calls += 1
+        return app.state.dependency_calls
+
+    @app.get("/items/{item_id}")
+    @cache(expire=60, asgi=True, s_maxage=30)
+    async def get_item(item_id: int, request: Request, response: Response, page: int = 0,
+                       calls: int = Depends(get_dependency)):
+        return {"id": item_id, "page": page, "calls": calls}
+
+    app.add_middleware(ResponseCacheMiddleware, routes=app.routes)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_hit_skips_routing_and_dependencies(cache_backend) -> None:
+    app = build_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        miss = await client.get("/items/1")
+        hit = await client.get("/items/1")
+
+    assert miss.json() == {"id": 1, "page": 0, "calls": 1}
+    assert hit.content == miss.content
+    assert "max-age" in hit.headers["cache-control"]
+    assert app.state.dependency_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_query_order_shares_entry(cache_backend) -> None:
+    app = build_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.get("/items/1?page=2&extra=a")
+        hit = await client.get("/items/1?extra=a&page=2")
+        other_page = await client.get("/items/1?page=3")
+
+    assert hit.json() == {"id": 1, "page": 2, "calls": 1}
+    assert other_page.json() == {"id": 1, "page": 3, "calls": 2}
+    assert app.state.dependency_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_no_store_reaches_route(cache_backend) -> None:
+    app = build_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.get("/items/1")
+        bypass = await client.get("/items/1", headers={"Cache-Control": "no-store"})
+
+    assert bypass.json()["calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_if_none_match_returns_not_modified(cache_backend) -> None:
+    app = build_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        miss = await client.get("/items/1")
+        etag = miss.headers["etag"]
+        revalidated_miss = await client.get("/items/2", headers={"If-None-Match": etag})
+        not_modified = await client.get("/items/1", headers={"If-None-Match": f'"other", W/{etag}'})
+
+    assert not etag.startswith("W/")
+    # Browsers revalidate every use, only shared caches keep the response
+    assert miss.headers["cache-control"] == "public, max-age=0, s-maxage=30"
+    assert revalidated_miss.status_code == 200
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert app.state.dependency_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_etag_follows_content(cache_backend) -> None:
+    app = build_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        first = await client.get("/items/1")
+        await cache_backend.clear(namespace="fastapi-cache")
+        # The dependency counter is part of the body so the recomputed content differs
+        second = await client.get("/items/1")
+
+    assert first.headers["etag"] != second.headers["etag"]
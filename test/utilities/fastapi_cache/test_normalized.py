@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from fastapi_cache import FastAPICache
+from starlette.requests import Request
+
+from utilities.fastapi_cache.normalized import cached_list, entity_key
+
+
+def make_request(query_string: bytes = b"") -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/courses/", "query_string": query_string,
+                    "headers": []})
+
+
+class FakeTable:
+    def __init__(self, ids):
+        self.rows = {row_id: {"id": row_id, "name": f"Course {row_id}"} for row_id in ids}
+        self.id_queries = 0
+        self.entity_queries = []
+
+    async def load_ids(self):
+        self.id_queries += 1
+        return sorted(self.rows)
+
+    async def load_entities(self, ids):
+        self.entity_queries.append(sorted(ids))
+        return [self.rows[row_id] for row_id in reversed(ids) if row_id in self.rows]
+
+
+def entity_tags(entity, kwargs):
+    return [f"course:{entity['id']}"]
+
+
+async def get_courses(table: FakeTable, query_string: bytes = b""):
+    response = await cached_list(make_request(query_string), "courses", table.load_ids, table.load_entities,
+                                 ["courses:list"], entity_tags, expire=60)
+    return json.loads(response.body)
+
+
+@pytest.mark.asyncio
+async def test_cached_list_keeps_query_order(cache_backend) -> None:
+    table = FakeTable([3, 1, 2])
+
+    assert [course["id"] for course in await get_courses(table)] == [1, 2, 3]
+    assert await get_courses(table) == await get_courses(table)
+    assert table.id_queries == 1
+    assert table.entity_queries == [[1, 2, 3]]
+
+
+@pytest.mark.asyncio
+async def test_cached_list_shares_entities_between_pages(cache_backend) -> None:
+    table = FakeTable([1, 2, 3])
+    await get_courses(table)
+
+    # Another page of the same entities only needs its ids
+    await get_courses(table, b"limit=5")
+    assert table.id_queries == 2
+    assert table.entity_queries == [[1, 2, 3]]
+    assert await cache_backend.get(entity_key("courses", 1)) is not None
+
+
+@pytest.mark.asyncio
+async def test_cached_list_only_loads_evicted_entities(cache_backend) -> None:
+    table = FakeTable([1, 2, 3])
+    await get_courses(table)
+
+    table.rows[2]["name"] = "Renamed"
+    await cache_backend.invalidate_tags(["course:2"])
+
+    courses = await get_courses(table)
+    assert courses[1] == {"id": 2, "name": "Renamed"}
+    assert table.id_queries == 1
+    assert table.entity_queries == [[1, 2, 3], [2]]
+
+
+@pytest.mark.asyncio
+async def test_cached_list_skips_deleted_entities(cache_backend) -> None:
+    table = FakeTable([1, 2, 3])
+    await get_courses(table)
+
+    del table.rows[2]
+    await cache_backend.invalidate_tags(["course:2"])
+
+    assert [course["id"] for course in await get_courses(table)] == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_cached_list_without_cache_returns_entities(cache_backend, monkeypatch) -> None:
+    monkeypatch.setattr(FastAPICache, "_enable", False)
+    table = FakeTable([2, 1])
+
+    response = await cached_list(make_request(), "courses", table.load_ids, table.load_entities, ["courses:list"],
+                                 entity_tags)
+    assert json.loads(response.body) == [{"id": 1, "name": "Course 1"}, {"id": 2, "name": "Course 2"}]
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from utilities.fastapi_cache.backends.redis import TaggedRedisBackend
+from utilities.fastapi_cache.decorator import cache
+from utilities.fastapi_cache.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_singleflight_coalesces_concurrent_calls() -> None:
+    flights = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    results = await asyncio.gather(*(flights.do("key", compute) for _ in range(10)))
+
+    assert calls == 1
+    assert all(result == {"id": 1} for result in results)
+    assert not flights.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_singleflight_shares_exceptions() -> None:
+    flights = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("not found")
+
+    results = await asyncio.gather(*(flights.do("key", compute) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cache_runs_concurrent_misses_once(cache_backend) -> None:
+    calls = 0
+
+    @cache(expire=60)
+    async def get_thing(thing_id: int, session=None):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"id": thing_id}
+
+    results = await asyncio.gather(*(get_thing(thing_id=1, session=None) for _ in range(10)))
+
+    assert calls == 1
+    assert all(result == {"id": 1} for result in results)
+
+    # Later calls are plain cache hits
+    assert await get_thing(thing_id=1, session=None) == {"id": 1}
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_lock_makes_other_workers_wait() -> None:
+    server = FakeServer()
+    first = TaggedRedisBackend(FakeRedis(server=server, decode_responses=False), lock_timeout=1)
+    second = TaggedRedisBackend(FakeRedis(server=server, decode_responses=False), lock_timeout=1)
+    order = []
+
+    async def hold_lock():
+        async with first.lock("key") as acquired:
+            assert acquired
+            await asyncio.sleep(0.1)
+            order.append("first released")
+
+    async def wait_for_lock():
+        await asyncio.sleep(0.01)
+        async with second.lock("key") as acquired:
+            assert not acquired
+            order.append("second resumed")
+
+    await asyncio.gather(hold_lock(), wait_for_lock())
+
+    assert order == ["first released", "second resumed"]
+    assert not await first.redis.exists("key:lock")
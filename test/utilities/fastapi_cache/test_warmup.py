@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request, Response
+
+from utilities.fastapi_cache.decorator import cache
+from utilities.fastapi_cache.warmup import HitLog, warm_up
+
+
+def build_app(delay: float = 0):
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.running = 0
+    app.state.max_running = 0
+
+    @app.get("/items/{item_id}")
+    @cache(expire=60, asgi=True)
+    async def get_item(item_id: int, request: Request, response: Response):
+        if item_id == 404:
+            raise HTTPException(status_code=404, detail="Item not found")
+        app.state.calls += 1
+        app.state.running += 1
+        app.state.max_running = max(app.state.max_running, app.state.running)
+        await asyncio.sleep(delay)
+        app.state.running -= 1
+        return {"id": item_id}
+
+    return app
+
+
+def test_hit_log_merges_saved_counts(tmp_path) -> None:
+    path = str(tmp_path / "hits.json")
+
+    first_worker = HitLog(path)
+    for _ in range(3):
+        first_worker.record("/ships/id/1")
+    first_worker.record("/ships/", b"offset=10")
+    first_worker.save()
+
+    second_worker = HitLog(path)
+    for _ in range(3):
+        second_worker.record("/ships/", b"offset=10")
+    second_worker.save()
+
+    assert HitLog(path).most_requested(2) == ["/ships/?offset=10", "/ships/id/1"]
+
+
+def test_hit_log_stays_bounded() -> None:
+    hit_log = HitLog(max_paths=10)
+    for ship_id in range(100):
+        hit_log.record(f"/ships/id/{ship_id}")
+
+    assert len(hit_log.counts) <= 10
+
+
+@pytest.mark.asyncio
+async def test_warm_up_caches_paths_with_bounded_concurrency(cache_backend) -> None:
+    app = build_app(delay=0.01)
+    paths = [f"/items/{item_id}" for item_id in range(10)] + ["/items/404"]
+
+    warmed = await warm_up(app, paths, concurrency=2, deadline=5)
+
+    assert warmed == 11
+    assert app.state.calls == 10
+    assert app.state.max_running == 2
+    assert cache_backend.stats()["entries"] == 10
+
+
+@pytest.mark.asyncio
+async def test_warm_up_stops_at_deadline(cache_backend) -> None:
+    app = build_app(delay=1)
+
+    start = time.monotonic()
+    warmed = await warm_up(app, [f"/items/{item_id}" for item_id in range(4)], concurrency=1, deadline=0.1)
+
+    assert time.monotonic() - start < 0.5
+    assert warmed == 0
@@ -0,0 +1,50 @@
+import pytest
+
+from utilities.autocomplete import PrefixIndex
+
+NAMES = [
+    (1, {"name": "Slippery Snake", "popularity": 3}),
+    (2, {"name": "snake pit", "popularity": 7}),
+    (3, {"name": "Snowfall", "popularity": 7}),
+    (4, {"name": "Canyon Run", "popularity": 1}),
+]
+
+
+async def make_index() -> PrefixIndex:
+    async def load():
+        return list(NAMES)
+
+    index = PrefixIndex("test", load)
+    await index.refresh()
+    return index
+
+
+@pytest.mark.asyncio
+async def test_prefix_index_completes_ignoring_case() -> None:
+    index = await make_index()
+
+    assert index.complete("SNA", 10) == [(2, "snake pit", 7)]
+    assert index.complete("sl", 10) == [(1, "Slippery Snake", 3)]
+    assert index.complete("x", 10) == []
+
+
+@pytest.mark.asyncio
+async def test_prefix_index_orders_by_popularity_then_name() -> None:
+    index = await make_index()
+
+    assert index.complete("s", 10) == [(2, "snake pit", 7), (3, "Snowfall", 7), (1, "Slippery Snake", 3)]
+    assert index.complete("s", 1) == [(2, "snake pit", 7)]
+
+
+@pytest.mark.asyncio
+async def test_prefix_index_applies_creates_renames_and_deletes() -> None:
+    index = await make_index()
+    assert index.complete("s", 10)
+
+    await index.add(5, {"name": "Sunrise", "popularity": 0})
+    await index.rename(2, "Pit of Snakes")
+    await index.remove(3)
+
+    assert index.complete("s", 10) == [(1, "Slippery Snake", 3), (5, "Sunrise", 0)]
+    # Renames keep the popularity
+    assert index.complete("pit", 10) == [(2, "Pit of Snakes", 7)]
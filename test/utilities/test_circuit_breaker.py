@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from slowapi.errors import RateLimitExceeded
+from slowapi.util import get_remote_address
+from starlette.requests import Request
+
+from utilities.circuit_breaker import CLOSED, OPEN, CircuitBreaker
+from utilities.limiter import FallbackLimiter
+
+
+class FakeDependency:
+    def __init__(self):
+        self.up = True
+        self.delay = 0
+
+    async def ping(self):
+        if not self.up:
+            raise ConnectionError("down")
+        await asyncio.sleep(self.delay)
+        return True
+
+
+def make_breaker(dependency: FakeDependency, **kwargs) -> CircuitBreaker:
+    kwargs = {"failure_threshold": 2, "timeout": 0.05, "probe_interval": 0.01, **kwargs}
+    return CircuitBreaker("test", probe=dependency.ping, **kwargs)
+
+
+async def fallback():
+    return "fallback"
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_after_consecutive_failures() -> None:
+    dependency = FakeDependency()
+    breaker = make_breaker(dependency, probe_interval=60)
+
+    assert await breaker.call(dependency.ping, fallback) is True
+    dependency.up = False
+    assert await breaker.call(dependency.ping, fallback) == "fallback"
+    assert breaker.state == CLOSED
+    assert await breaker.call(dependency.ping, fallback) == "fallback"
+    assert breaker.state == OPEN
+
+    # Calls aren't attempted anymore once open
+    dependency.up = True
+    assert await breaker.call(dependency.ping, fallback) == "fallback"
+    assert breaker.as_dict()["fallbacks"] == 3
+    await breaker.stop()
+
+
+@pytest.mark.asyncio
+async def test_breaker_counts_slow_calls_as_failures() -> None:
+    dependency = FakeDependency()
+    dependency.delay = 0.2
+    breaker = make_breaker(dependency, probe_interval=60)
+
+    for _ in range(2):
+        assert await breaker.call(dependency.ping, fallback) == "fallback"
+    assert breaker.state == OPEN
+    assert "timed out" in breaker.transitions[-1]["reason"]
+    await breaker.stop()
+
+
+@pytest.mark.asyncio
+async def test_breaker_closes_once_probe_succeeds() -> None:
+    dependency = FakeDependency()
+    breaker = make_breaker(dependency)
+    transitions = []
+    breaker.add_listener(transitions.append)
+
+    dependency.up = False
+    for _ in range(2):
+        await breaker.call(dependency.ping, fallback)
+    await asyncio.sleep(0.05)
+    assert breaker.state == OPEN
+
+    dependency.up = True
+    await asyncio.sleep(0.05)
+    assert breaker.state == CLOSED
+    assert transitions == [OPEN, CLOSED]
+    assert [transition["to"] for transition in breaker.as_dict()["transitions"]] == [OPEN, CLOSED]
+
+
+def make_request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/ships/", "query_string": b"", "headers": [],
+                    "client": ("127.0.0.1", 1234)})
+
+
+def endpoint():
+    pass
+
+
+@pytest.mark.asyncio
+async def test_limiter_uses_in_memory_limits_while_breaker_is_open() -> None:
+    breaker = make_breaker(FakeDependency(), probe_interval=60)
+    limiter = FallbackLimiter(storage_uri="memory://", key_func=get_remote_address, default_limits=["2/minute"],
+                              breaker=breaker)
+
+    breaker.record_failure("down")
+    breaker.record_failure("down")
+    assert limiter._storage_dead
+
+    limiter._check_request_limit(make_request(), endpoint)
+    limiter._check_request_limit(make_request(), endpoint)
+    with pytest.raises(RateLimitExceeded):
+        limiter._check_request_limit(make_request(), endpoint)
+    await breaker.stop()
+
+
+@pytest.mark.asyncio
+async def test_limiter_reports_storage_errors_to_breaker() -> None:
+    breaker = make_breaker(FakeDependency(), probe_interval=60)
+    limiter = FallbackLimiter(storage_uri="memory://", key_func=get_remote_address, default_limits=["2/minute"],
+                              breaker=breaker)
+
+    def unreachable(*args, **kwargs):
+        raise ConnectionError("down")
+
+    limiter._limiter.hit = unreachable
+    limiter._check_request_limit(make_request(), endpoint)
+    assert breaker.consecutive_failures == 1
+    limiter._check_request_limit(make_request(), endpoint)
+    assert breaker.state == OPEN
+    await breaker.stop()
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from utilities.facets import FacetIndex
+
+COURSES = [
+    (1, {"game_type": "Time Trial", "difficulty": "Hard", "length": "Short"}),
+    (2, {"game_type": "Time Trial", "difficulty": "Easy", "length": "Short"}),
+    (3, {"game_type": "Laps", "difficulty": "Hard", "length": "Long"}),
+    (70, {"game_type": "Time Trial", "difficulty": "Hard", "length": "Long"}),
+]
+
+
+def make_index(entities=COURSES, **kwargs) -> FacetIndex:
+    async def load():
+        return list(entities)
+
+    return FacetIndex("test", ("game_type", "difficulty", "length"), load, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_facet_index_matches_combined_filters() -> None:
+    index = make_index()
+    await index.refresh()
+
+    assert index.page(index.match({"game_type": "Time Trial", "difficulty": "Hard"})) == [1, 70]
+    assert index.page(index.match({"length": "Short", "difficulty": None})) == [1, 2]
+    assert index.page(index.match({"game_type": "Sprint"})) == []
+    assert index.page(index.match({})) == [1, 2, 3, 70]
+
+
+@pytest.mark.asyncio
+async def test_facet_index_pages() -> None:
+    index = make_index()
+    await index.refresh()
+    bitmap = index.match({})
+
+    assert index.page(bitmap, limit=2) == [1, 2]
+    assert index.page(bitmap, offset=2, limit=2) == [3, 70]
+    assert index.page(bitmap, limit=2, after=2) == [3, 70]
+    assert index.page(bitmap, after=70) == []
+
+
+@pytest.mark.asyncio
+async def test_facet_index_counts_leave_out_their_own_filter() -> None:
+    index = make_index()
+    await index.refresh()
+
+    counts = index.counts({"game_type": "Time Trial", "length": "Short"})
+    assert counts["game_type"] == {"Time Trial": 2}
+    assert counts["difficulty"] == {"Easy": 1, "Hard": 1}
+    # Every Time Trial course, whatever its length
+    assert counts["length"] == {"Long": 1, "Short": 2}
+
+
+@pytest.mark.asyncio
+async def test_facet_index_applies_writes() -> None:
+    index = make_index()
+
+    # Writes are skipped until the index is loaded, which picks them up
+    await index.add(4, {"game_type": "Laps", "difficulty": "Hard", "length": "Long"})
+    assert not index.ready
+    await index.refresh()
+
+    await index.add(5, {"game_type": "Laps", "difficulty": "Easy", "length": "Long"})
+    await index.add(3, {"game_type": "Sprint", "difficulty": "Hard", "length": "Long"})
+    await index.remove(70)
+
+    assert index.page(index.match({"game_type": "Laps"})) == [5]
+    assert index.page(index.match({"difficulty": "Hard", "length": "Long"})) == [3]
+    assert index.counts({})["game_type"] == {"Laps": 1, "Sprint": 1, "Time Trial": 2}
+
+
+@pytest.mark.asyncio
+async def test_facet_index_replays_writes_made_during_a_rebuild() -> None:
+    loading = asyncio.Event()
+    loaded = asyncio.Event()
+
+    async def load():
+        loading.set()
+        await loaded.wait()
+        return list(COURSES)
+
+    index = FacetIndex("test", ("game_type", "difficulty", "length"), load)
+    rebuild = asyncio.create_task(index.refresh())
+    await loading.wait()
+    # Committed after the rebuild read the database
+    await index.add(5, {"game_type": "Sprint", "difficulty": "Easy", "length": "Short"})
+    await index.remove(1)
+    loaded.set()
+    await rebuild
+
+    assert index.page(index.match({})) == [2, 3, 5, 70]
+
+
+@pytest.mark.asyncio
+async def test_facet_index_shares_writes_through_redis() -> None:
+    server = FakeServer()
+    writer, reader = make_index(refresh_interval=0), make_index(refresh_interval=0)
+    await writer.start(FakeRedis(server=server))
+    await reader.start(FakeRedis(server=server))
+    try:
+        # Lets the listeners subscribe
+        await asyncio.sleep(0.05)
+        await writer.add(5, {"game_type": "Sprint", "difficulty": "Easy", "length": "Short"})
+        await writer.remove(1)
+
+        for _ in range(100):
+            if reader.page(reader.match({})) == [2, 3, 5, 70]:
+                break
+            await asyncio.sleep(0.01)
+        assert reader.page(reader.match({})) == [2, 3, 5, 70]
+        assert writer.page(writer.match({})) == [2, 3, 5, 70]
+    finally:
+        await writer.stop()
+        await reader.stop()
+
+
+@pytest.mark.asyncio
+async def test_facet_index_builds_the_same_bitmaps_as_its_writes() -> None:
+    built = make_index()
+    await built.refresh()
+    written = make_index(entities=[])
+    await written.refresh()
+    for entity_id, values in COURSES:
+        await written.add(entity_id, values)
+
+    assert built._all == written._all
+    assert built._bitmaps == written._bitmaps
+    assert built.counts({}) == written.counts({})
@@ -0,0 +1,44 @@
+import json
+import uuid
+
+from database.models.models import Collection, Course, Ship
+from schemas.collection import CollectionRead
+from schemas.course import CourseIn, CourseRead
+from schemas.leaderboard import TopScore
+from schemas.ship import ShipIn, ShipRead
+from test.api.routes.test_courses import course_payload
+from test.api.routes.test_ships import ship_payload
+from utilities.serialization import dumps, row_dict
+
+
+def make_course(course_id: int) -> Course:
+    course = CourseIn(**{**course_payload, "name": f"Course {course_id}"})
+    return Course(id=course_id, author_id=uuid.uuid4(), **{**course.dict(), "course_json": course.course_json.dict()})
+
+
+def test_row_dict_matches_from_orm() -> None:
+    ship = ShipIn(**ship_payload)
+    db_ship = Ship(id=1, author_id=uuid.uuid4(), **ship.dict())
+
+    assert json.loads(dumps(row_dict(db_ship, ShipRead))) == json.loads(ShipRead.from_orm(db_ship).json())
+
+
+def test_row_dict_reads_nested_orm_schemas() -> None:
+    collection = Collection(id=1, name="Collection", author_id=uuid.uuid4(), description="Two courses",
+                            courses=[make_course(1), make_course(2)])
+
+    result = row_dict(collection, CollectionRead)
+    assert [course["name"] for course in result["courses"]] == ["Course 1", "Course 2"]
+    assert json.loads(dumps(result)) == json.loads(CollectionRead.from_orm(collection).json())
+    assert json.loads(dumps(row_dict(collection.courses[0], CourseRead)))["course_json"]["checkpoints"]
+
+
+def test_row_dict_defaults_missing_columns() -> None:
+    class Row:
+        course = "Course 1"
+        steam_id = 1
+        time = 100
+        points = 10
+
+    assert row_dict(Row(), TopScore) == {"course": "Course 1", "steam_id": 1, "steam_username": None, "time": 100,
+                                         "points": 10}
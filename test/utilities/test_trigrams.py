@@ -0,0 +1,56 @@
+import pytest
+
+from utilities.trigrams import TrigramIndex, fragments, similarity, trigrams
+
+NAMES = [
+    (1, {"name": "Slippery Snake", "popularity": 3}),
+    (2, {"name": "Snake Pit", "popularity": 7}),
+    (3, {"name": "Canyon Run", "popularity": 1}),
+]
+
+
+async def make_index() -> TrigramIndex:
+    async def load():
+        return list(NAMES)
+
+    index = TrigramIndex("test", load)
+    await index.refresh()
+    return index
+
+
+def test_trigrams_are_extracted_like_pg_trgm() -> None:
+    assert trigrams("Cat") == {"  c", " ca", "cat", "at "}
+    # Words are split on anything other than letters and digits
+    assert trigrams("a_B!") == {"  a", " a ", "  b", " b "}
+    assert trigrams("!!") == frozenset()
+
+
+def test_fragments_cover_the_trigrams_within_words() -> None:
+    assert fragments("Slip, a run") == {"sl", "ip", "sli", "lip", "a", "ru", "un", "run"}
+    assert similarity(trigrams("Slipery Snake"), trigrams("Slippery Snake")) == 0.8
+    assert similarity(trigrams("!!"), trigrams("Snake")) == 0
+
+
+@pytest.mark.asyncio
+async def test_trigram_index_matches_mistyped_names() -> None:
+    index = await make_index()
+
+    assert index.match("Slipery Snake", 10) == [(1, "Slippery Snake", 0.8), (2, "Snake Pit", 6 / 17)]
+    assert index.match("Slipery Snake", 1) == [(1, "Slippery Snake", 0.8)]
+    assert index.match("Slipery Snake", 10, threshold=0.5) == [(1, "Slippery Snake", 0.8)]
+    assert index.match("xyz", 10) == []
+    # Prefixes are still completed
+    assert index.complete("sn", 10) == [(2, "Snake Pit", 7)]
+
+
+@pytest.mark.asyncio
+async def test_trigram_index_applies_creates_renames_and_deletes() -> None:
+    index = await make_index()
+
+    await index.add(4, {"name": "Slippery Slope", "popularity": 0})
+    await index.rename(2, "Pit of Snakes")
+    await index.remove(1)
+
+    assert [name for _, name, _ in index.match("Slipery Snake", 10)] == ["Slippery Slope"]
+    assert index.match("snakes pit", 10) == [(2, "Pit of Snakes", 11 / 14)]
+    assert index.match("Canyon", 10) == [(3, "Canyon Run", 7 / 11)]
@@ -0,0 +1,105 @@
+import heapq
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Awaitable, Callable, Iterable
+
+from utilities.synced_index import SyncedIndex
+
+LAST_CHARACTER = chr(0x10FFFF)
+
+
+class PrefixIndex(SyncedIndex):
+    """
+    Per-worker index of entity names answering case-insensitive prefix queries with the most popular matching names,
+    without querying the database. Names are casefolded and kept in a sorted array, so the names starting with a prefix
+    are a contiguous run found by binary search. A second array orders the names by popularity for prefixes matching
+    too many names to rank. Results are cached until the next write. Kept in sync with the database as described in
+    utilities.synced_index
+    """
+
+    def __init__(self, name: str, load: Callable[[], Awaitable[Iterable[tuple[int, dict]]]],
+                 refresh_interval: float = 60, max_cached_results: int = 4096):
+        """
+        :param load: returns every entity as an (id, {"name": name, "popularity": popularity}) pair
+        :param max_cached_results: number of query results kept, all of them are dropped once it's reached
+        """
+        self.max_cached_results = max_cached_results
+        self._sorted: list[tuple[str, int]] = []
+        self._ranked: list[tuple[int, str, int]] = []
+        self._entries: dict[int, tuple[str, str, int]] = {}
+        self._results: dict[tuple[str, int], list[tuple[int, str, int]]] = {}
+        super().__init__(name, load, refresh_interval)
+
+    def _clear(self):
+        self._sorted = []
+        self._ranked = []
+        self._entries = {}
+        self._results = {}
+
+    def _index(self, entity_id: int, values: dict):
+        folded = values["name"].casefold()
+        self._entries[entity_id] = (folded, values["name"], values.get("popularity") or 0)
+        insort(self._sorted, (folded, entity_id))
+        insort(self._ranked, self._rank((folded, entity_id)))
+        self._results.clear()
+
+    def _build(self, entities: list[tuple[int, dict]]) -> dict:
+        # Sorted once, inserting the names one by one would shift the arrays' tails each time
+        entries = {entity_id: (values["name"].casefold(), values["name"], values.get("popularity") or 0)
+                   for entity_id, values in entities}
+        return {
+            "_entries": entries,
+            "_sorted": sorted((folded, entity_id) for entity_id, (folded, _, _) in entries.items()),
+            "_ranked": sorted((-popularity, folded, entity_id)
+                              for entity_id, (folded, _, popularity) in entries.items()),
+            "_results": {},
+        }
+
+    def _unindex(self, entity_id: int):
+        entry = self._entries.get(entity_id)
+        if entry is None:
+            return
+
+        del self._ranked[bisect_left(self._ranked, self._rank((entry[0], entity_id)))]
+        self._entries.pop(entity_id)
+        del self._sorted[bisect_left(self._sorted, (entry[0], entity_id))]
+        self._results.clear()
+
+    async def rename(self, entity_id: int, name: str):
+        """
+        Replaces the indexed name of the entity, keeping its popularity
+        """
+        entry = self._entries.get(entity_id)
+        await self.add(entity_id, {"name": name, "popularity": entry[2] if entry else 0})
+
+    def _rank(self, item: tuple[str, int]) -> tuple[int, str, int]:
+        """
+        Sort key of the results, most popular first
+        """
+        folded, entity_id = item
+        return -self._entries[entity_id][2], folded, entity_id
+
+    def complete(self, prefix: str, limit: int) -> list[tuple[int, str, int]]:
+        """
+        Returns the id, name and popularity of the limit most popular entities whose name starts with prefix, ignoring
+        case. Ties are ordered by name
+        """
+        folded = prefix.casefold()
+        cached = self._results.get((folded, limit))
+        if cached is not None:
+            return cached
+
+        # The names starting with folded sort between folded and folded followed by the highest code point
+        start = bisect_left(self._sorted, (folded,))
+        end = bisect_left(self._sorted, (folded + LAST_CHARACTER,), start)
+        if (end - start) ** 2 > limit * len(self._sorted):
+            # Short prefixes match so many names that walking the names from the most popular down finds limit matches
+            # sooner than ranking every match, about limit * len(self._sorted) / (end - start) names in
+            best = list(islice((rank for rank in self._ranked if rank[1].startswith(folded)), limit))
+        else:
+            best = heapq.nsmallest(limit, (self._rank(item) for item in self._sorted[start:end]))
+        results = [(entity_id, self._entries[entity_id][1], -popularity) for popularity, _, entity_id in best]
+        if len(self._results) >= self.max_cached_results:
+            self._results.clear()
+        self._results[(folded, limit)] = results
+        return results
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+
+# Every breaker by name, reported by the metrics endpoint
+breakers: dict[str, "CircuitBreaker"] = {}
+
+
+class CircuitBreaker:
+    """
+    Stops sending calls to a dependency (Redis) once failure_threshold calls in a row failed or took longer than
+    timeout seconds. While open, callers use their fallback straight away and the dependency is probed in the
+    background every probe_interval seconds, the breaker closing again as soon as a probe succeeds.
+
+    Listeners added with add_listener are called with the new state on every transition
+    """
+
+    def __init__(self, name: str, probe: Callable[[], Awaitable[Any]], failure_threshold: int = 3,
+                 timeout: float = 0.25, probe_interval: float = 5, history: int = 20):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.timeout = timeout
+        self.probe_interval = probe_interval
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.fallbacks = 0
+        self.transitions: deque[dict] = deque(maxlen=history)
+        self._listeners: list[Callable[[str], None]] = []
+        self._probe_task: Optional[asyncio.Task] = None
+        breakers[name] = self
+
+    @property
+    def closed(self) -> bool:
+        return self.state == CLOSED
+
+    def add_listener(self, listener: Callable[[str], None]):
+        self._listeners.append(listener)
+
+    def record_success(self):
+        self.consecutive_failures = 0
+
+    def record_failure(self, reason: str):
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.closed and self.consecutive_failures >= self.failure_threshold:
+            self._transition(OPEN, reason)
+            self._probe_task = asyncio.ensure_future(self._probe_until_recovered())
+
+    def record_latency(self, seconds: float):
+        if seconds > self.timeout:
+            self.record_failure(f"call took {seconds:.3f}s")
+        else:
+            self.record_success()
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], fallback: Callable[[], Awaitable[Any]],
+                   timeout: Optional[float] = None) -> Any:
+        """
+        Awaits fn() unless the breaker is open, then awaits fallback() if fn failed or was cut short by the timeout.
+        timeout overrides the breaker's own for calls expected to wait, like acquiring a lock
+        """
+        if not self.closed:
+            self.fallbacks += 1
+            return await fallback()
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            result = await asyncio.wait_for(fn(), timeout)
+        except asyncio.TimeoutError:
+            self.record_failure(f"call timed out after {timeout}s")
+        except Exception as exc:
+            self.record_failure(repr(exc))
+        else:
+            self.record_success()
+            return result
+
+        self.fallbacks += 1
+        return await fallback()
+
+    async def _probe_until_recovered(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await asyncio.wait_for(self.probe(), self.timeout)
+            except Exception as exc:
+                logger.info(f"{self.name} circuit breaker probe failed: {exc!r}")
+                continue
+            self.consecutive_failures = 0
+            self._transition(CLOSED, "probe succeeded")
+            self._probe_task = None
+            return
+
+    def _transition(self, state: str, reason: str):
+        logger.warning(f"{self.name} circuit breaker {self.state} -> {state}: {reason}")
+        self.transitions.append({"at": time.time(), "from": self.state, "to": state, "reason": reason})
+        self.state = state
+        for listener in self._listeners:
+            listener(state)
+
+    async def stop(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+
+    def as_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failures": self.failures,
+            "fallbacks": self.fallbacks,
+            "transitions": list(self.transitions),
+        }
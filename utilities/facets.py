@@ -0,0 +1,122 @@
+from collections import defaultdict
+from typing import Awaitable, Callable, Iterable, Optional
+
+from utilities.synced_index import SyncedIndex
+
+
+def bitset(ids: Iterable[int]) -> int:
+    """
+    Int whose bit i is set for every i of ids
+    """
+    ids = list(ids)
+    if not ids:
+        return 0
+
+    bits = bytearray(max(ids) // 8 + 1)
+    for entity_id in ids:
+        bits[entity_id >> 3] |= 1 << (entity_id & 7)
+    return int.from_bytes(bits, "little")
+
+
+class FacetIndex(SyncedIndex):
+    """
+    Per-worker bitmap index answering filters over a few low-cardinality attributes (facets) of an entity, and counting
+    the entities per facet value, without querying the database. Each facet value has a bitset over the entity ids, an
+    int whose bit i is set when entity i has that value, so combining filters is a bitwise and. Kept in sync with the
+    database as described in utilities.synced_index
+    """
+
+    def __init__(self, name: str, facets: Iterable[str], load: Callable[[], Awaitable[Iterable[tuple[int, dict]]]],
+                 refresh_interval: float = 60):
+        """
+        :param load: returns every entity as an (id, {facet: value}) pair
+        """
+        self.facets = tuple(facets)
+        self._all = 0
+        self._bitmaps: dict[str, defaultdict[str, int]] = {}
+        self._values: dict[int, dict] = {}
+        super().__init__(name, load, refresh_interval)
+
+    def _clear(self):
+        self._all = 0
+        self._bitmaps = {facet: defaultdict(int) for facet in self.facets}
+        self._values = {}
+
+    def _index(self, entity_id: int, values: dict):
+        values = {facet: values.get(facet) for facet in self.facets}
+        bit = 1 << entity_id
+        self._values[entity_id] = values
+        self._all |= bit
+        for facet, value in values.items():
+            if value is not None:
+                self._bitmaps[facet][value] |= bit
+
+    def _build(self, entities: list[tuple[int, dict]]) -> dict:
+        # Or-ing every entity into the bitsets would copy them each time, their bits are set in bulk instead
+        values = {entity_id: {facet: entity_values.get(facet) for facet in self.facets}
+                  for entity_id, entity_values in entities}
+        ids = {facet: defaultdict(list) for facet in self.facets}
+        for entity_id, entity_values in values.items():
+            for facet, value in entity_values.items():
+                if value is not None:
+                    ids[facet][value].append(entity_id)
+
+        return {
+            "_all": bitset(values),
+            "_bitmaps": {facet: defaultdict(int, {value: bitset(value_ids) for value, value_ids in by_value.items()})
+                         for facet, by_value in ids.items()},
+            "_values": values,
+        }
+
+    def _unindex(self, entity_id: int):
+        values = self._values.pop(entity_id, None)
+        if values is None:
+            return
+
+        bit = 1 << entity_id
+        self._all &= ~bit
+        for facet, value in values.items():
+            if value is not None:
+                self._bitmaps[facet][value] &= ~bit
+
+    def match(self, filters: dict) -> int:
+        """
+        Bitset of the entities having every value of filters, facets filtered on None are ignored
+        """
+        bitmap = self._all
+        for facet, value in filters.items():
+            if value is not None:
+                bitmap &= self._bitmaps[facet].get(value, 0)
+        return bitmap
+
+    @staticmethod
+    def page(bitmap: int, offset: int = 0, limit: Optional[int] = None, after: Optional[int] = None) -> list[int]:
+        """
+        Ids of bitmap in ascending order, starting after the id after when it's set and skipping offset ids otherwise
+        """
+        start = 0
+        if after is not None:
+            start = after + 1
+            bitmap >>= start
+
+        ids = []
+        while bitmap and (limit is None or len(ids) < limit):
+            lowest = bitmap & -bitmap
+            if offset:
+                offset -= 1
+            else:
+                ids.append(start + lowest.bit_length() - 1)
+            bitmap ^= lowest
+        return ids
+
+    def counts(self, filters: dict) -> dict[str, dict[str, int]]:
+        """
+        Number of entities per value of each facet among the entities matching filters. The filter on a facet is left
+        out of its own counts, so they tell how many entities each alternative value would match
+        """
+        counts = {}
+        for facet in self.facets:
+            others = self.match({name: value for name, value in filters.items() if name != facet})
+            counts[facet] = {value: (bitmap & others).bit_count()
+                             for value, bitmap in sorted(self._bitmaps[facet].items()) if bitmap & others}
+        return counts
@@ -0,0 +1,34 @@
+import abc
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Optional, Sequence, Tuple
+
+from fastapi_cache.backends import Backend
+
+
+class TaggedBackend(Backend):
+    """
+    Extension of the fastapi-cache Backend that lets a cached entry be registered under any number of tags (for example
+    course:42 or collections:list) so that every entry under a tag can be evicted at once after a write is committed
+    """
+
+    @abc.abstractmethod
+    async def set_with_tags(self, key: str, value: str, expire: Optional[int] = None, tags: Iterable[str] = ()):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        raise NotImplementedError
+
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[Tuple[int, Optional[str]]]:
+        """
+        Looks up several keys at once, in order. Backends override it to fetch them in a single round trip
+        """
+        return [await self.get_with_ttl(key) for key in keys]
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[bool]:
+        """
+        Lock held by a worker while it recomputes a missed entry, yielding whether it was acquired. Backends local to a
+        single worker have nothing to coordinate with as concurrent misses within a worker are already coalesced
+        """
+        yield True
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import sys
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Iterable, Optional, Sequence, Set, Tuple
+
+from fastapi_cache import FastAPICache
+
+from utilities.circuit_breaker import CLOSED, CircuitBreaker
+from utilities.fastapi_cache.backends import TaggedBackend
+from utilities.fastapi_cache.backends.inmemory import TaggedInMemoryBackend
+
+logger = logging.getLogger(__name__)
+
+
+class FallbackBackend(TaggedBackend):
+    """
+    Sends every call to the primary backend (Redis) through a circuit breaker and serves it from an in-process backend
+    when the call fails, is too slow or the breaker is open.
+
+    Tags whose invalidation failed on the primary are invalidated on it again after the next successful call, or once
+    the breaker closes after an outage. The fallback is then emptied so that entries computed during the outage aren't
+    served past their invalidation
+    """
+
+    def __init__(self, primary: TaggedBackend, fallback: TaggedInMemoryBackend, breaker: CircuitBreaker,
+                 lock_timeout: float = 0):
+        """
+        :param lock_timeout: how long acquiring a lock of the primary may wait for its holder, on top of the breaker's
+            timeout
+        """
+        self.primary = primary
+        self.fallback = fallback
+        self.breaker = breaker
+        self.lock_timeout = lock_timeout
+        self._missed_invalidations: Set[str] = set()
+        self._replay: Optional[asyncio.Task] = None
+        self._recovery: Optional[asyncio.Task] = None
+        breaker.add_listener(self._on_transition)
+
+    def __getattr__(self, name: str):
+        return getattr(self.primary, name)
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[str]]:
+        return await self.breaker.call(lambda: self._call_primary(self.primary.get_with_ttl(key)),
+                                       lambda: self.fallback.get_with_ttl(key))
+
+    async def get(self, key: str) -> Optional[str]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[Tuple[int, Optional[str]]]:
+        return await self.breaker.call(lambda: self._call_primary(self.primary.get_many_with_ttl(keys)),
+                                       lambda: self.fallback.get_many_with_ttl(keys))
+
+    async def set(self, key: str, value: str, expire: int = None):
+        await self.set_with_tags(key, value, expire)
+
+    async def set_with_tags(self, key: str, value: str, expire: Optional[int] = None, tags: Iterable[str] = ()):
+        tags = list(tags)
+        await self.breaker.call(lambda: self._call_primary(self.primary.set_with_tags(key, value, expire, tags)),
+                                lambda: self.fallback.set_with_tags(key, value, expire, tags))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        tags = list(tags)
+
+        async def remember():
+            self._missed_invalidations.update(tags)
+            return 0
+
+        count = await self.breaker.call(lambda: self._call_primary(self.primary.invalidate_tags(tags)), remember)
+        return count + await self.fallback.invalidate_tags(tags)
+
+    async def clear(self, namespace: str = None, key: str = None) -> int:
+        async def skip():
+            return 0
+
+        count = await self.breaker.call(lambda: self._call_primary(self.primary.clear(namespace, key)), skip)
+        return count + await self.fallback.clear(namespace, key)
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[bool]:
+        async def enter(backend: TaggedBackend):
+            manager = backend.lock(key)
+            return manager, await manager.__aenter__()
+
+        manager, acquired = await self.breaker.call(lambda: enter(self.primary), lambda: enter(self.fallback),
+                                                    timeout=self.breaker.timeout + self.lock_timeout)
+        try:
+            yield acquired
+        except BaseException:
+            if not await manager.__aexit__(*sys.exc_info()):
+                raise
+        else:
+            await manager.__aexit__(None, None, None)
+
+    async def _call_primary(self, call: Awaitable):
+        """
+        Awaits a call to the primary, replaying the missed invalidations once it succeeded
+        """
+        result = await call
+        if self._missed_invalidations and (self._replay is None or self._replay.done()):
+            self._replay = asyncio.ensure_future(self._replay_invalidations())
+        return result
+
+    async def _replay_invalidations(self):
+        tags, self._missed_invalidations = self._missed_invalidations, set()
+        if not tags:
+            return
+
+        async def remember():
+            logger.warning("Couldn't replay missed cache invalidations, retrying after the next successful call")
+            self._missed_invalidations.update(tags)
+
+        await self.breaker.call(lambda: self.primary.invalidate_tags(tags), remember)
+
+    def _on_transition(self, state: str):
+        if state == CLOSED:
+            self._recovery = asyncio.ensure_future(self._recover())
+
+    async def _recover(self):
+        await self._replay_invalidations()
+        await self.fallback.clear(namespace=FastAPICache.get_prefix())
@@ -0,0 +1,196 @@
+import sys
+from asyncio import Lock
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from fastapi_cache.backends.inmemory import InMemoryBackend, Value
+
+from utilities.fastapi_cache.backends import TaggedBackend
+
+EVICTION_POLICIES = ("lru", "tinylfu")
+
+# Rough per-entry bookkeeping cost (store node, Value dataclass, size entry) on top of the key and value strings
+ENTRY_OVERHEAD = 200
+
+# Translation table used to halve every counter of a sketch row in one pass
+HALVED = bytes(count >> 1 for count in range(256))
+
+# Odd multipliers of the multiply-shift hashes indexing each sketch row. Hashing (seed, key) tuples instead gives
+# indexes that collide together across rows, since the tuple hash only mixes the seed in linearly
+ROW_MULTIPLIERS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+                   0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9)
+HASH_MASK = (1 << 64) - 1
+
+
+class FrequencySketch:
+    """
+    Count-min sketch estimating how often a key has been seen recently. Counters saturate at 255 and are halved once
+    sample_size increments have been recorded so that old popularity fades out
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        if not 0 < depth <= len(ROW_MULTIPLIERS):
+            raise ValueError(f"depth must be between 1 and {len(ROW_MULTIPLIERS)}, got: {depth}")
+
+        # Rounding the width up to a power of two so that indexes can be taken from the top bits of a 64 bit hash
+        bits = max(width - 1, 1).bit_length()
+        self.width = 1 << bits
+        self.shift = 64 - bits
+        self.rows = [bytearray(self.width) for _ in range(depth)]
+        self.sample_size = 10 * self.width
+        self.additions = 0
+
+    def _indexes(self, key: str):
+        key_hash = hash(key) & HASH_MASK
+        return [((key_hash * multiplier) & HASH_MASK) >> self.shift
+                for multiplier in ROW_MULTIPLIERS[:len(self.rows)]]
+
+    def increment(self, key: str):
+        for row, index in zip(self.rows, self._indexes(key)):
+            if row[index] < 255:
+                row[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+    def _age(self):
+        for row in self.rows:
+            row[:] = row.translate(HALVED)
+        self.additions //= 2
+
+
+class TaggedInMemoryBackend(InMemoryBackend, TaggedBackend):
+    """
+    In-process backend that keeps a tag -> keys index alongside the cached values.
+
+    The store can be bounded by entry count (max_entries) and by the approximate memory held by keys and values
+    (max_bytes). When full, the least recently used entry is evicted. With the tinylfu policy a new entry is only
+    admitted if it has been requested more often than the entry it would evict, which keeps one-off keys (a crawler
+    walking every offset) from flushing the popular ones
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 eviction_policy: str = "lru"):
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"eviction_policy must be one of {EVICTION_POLICIES}, got: {eviction_policy}")
+
+        # The upstream InMemoryBackend declares these at the class level which would share them between instances
+        self._store: OrderedDict[str, Value] = OrderedDict()
+        self._lock = Lock()
+        self._tags: Dict[str, Set[str]] = {}
+        self._key_tags: Dict[str, Set[str]] = {}
+        self._sizes: Dict[str, int] = {}
+        self._sketch = FrequencySketch() if eviction_policy == "tinylfu" else None
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.eviction_policy = eviction_policy
+        self.resident_bytes = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    @staticmethod
+    def _entry_size(key: str, value) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(value) + ENTRY_OVERHEAD
+
+    def _get(self, key: str):
+        if self._sketch is not None:
+            self._sketch.increment(key)
+
+        v = self._store.get(key)
+        if v:
+            if v.ttl_ts < self._now:
+                self._delete(key)
+            else:
+                self._store.move_to_end(key)
+                return v
+
+    def _delete(self, key: str) -> bool:
+        # Dropping the key from the tag index as well so that the index never outgrows the store
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        self.resident_bytes -= self._sizes.pop(key, 0)
+        return self._store.pop(key, None) is not None
+
+    def _is_full(self, extra_entries: int = 0, extra_bytes: int = 0) -> bool:
+        return ((self.max_entries is not None and len(self._store) + extra_entries > self.max_entries)
+                or (self.max_bytes is not None and self.resident_bytes + extra_bytes > self.max_bytes))
+
+    def _make_room(self, key: str, size: int) -> bool:
+        """
+        Evicts entries until one of the given size fits. Returns False if the new entry should not be admitted
+        """
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+
+        while self._store and self._is_full(1, size):
+            victim = next(iter(self._store))
+            if self._store[victim].ttl_ts < self._now:
+                self._delete(victim)
+                continue
+            if self._sketch is not None and self._sketch.estimate(key) <= self._sketch.estimate(victim):
+                return False
+            self._delete(victim)
+            self.evictions += 1
+        return True
+
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[Tuple[int, Optional[str]]]:
+        results = []
+        async with self._lock:
+            for key in keys:
+                v = self._get(key)
+                results.append((v.ttl_ts - self._now, v.data) if v else (0, None))
+        return results
+
+    async def set(self, key: str, value: str, expire: int = None):
+        await self.set_with_tags(key, value, expire)
+
+    async def set_with_tags(self, key: str, value: str, expire: Optional[int] = None, tags: Iterable[str] = ()):
+        size = self._entry_size(key, value)
+        async with self._lock:
+            self._delete(key)
+            if not self._make_room(key, size):
+                self.rejections += 1
+                return
+
+            self._store[key] = Value(value, self._now + expire if expire else float("inf"))
+            self._sizes[key] = size
+            self.resident_bytes += size
+            tags = set(tags)
+            if tags:
+                self._key_tags[key] = tags
+                for tag in tags:
+                    self._tags.setdefault(tag, set()).add(key)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        count = 0
+        async with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    count += self._delete(key)
+        return count
+
+    async def clear(self, namespace: str = None, key: str = None) -> int:
+        count = 0
+        async with self._lock:
+            if namespace:
+                for k in [k for k in self._store if k.startswith(namespace)]:
+                    count += self._delete(k)
+            elif key:
+                count += self._delete(key)
+        return count
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._store),
+            "resident_bytes": self.resident_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+        }
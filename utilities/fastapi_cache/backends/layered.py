@@ -0,0 +1,139 @@
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Iterable, Optional, Sequence, Tuple
+
+from aioredis import Redis
+from fastapi_cache import FastAPICache
+
+from utilities.fastapi_cache.backends import TaggedBackend
+from utilities.fastapi_cache.backends.inmemory import TaggedInMemoryBackend
+from utilities.fastapi_cache.backends.redis import TaggedRedisBackend
+
+logger = logging.getLogger(__name__)
+
+
+class LayeredBackend(TaggedBackend):
+    """
+    Two-tier backend with a bounded per-worker LRU (L1) in front of Redis (L2). L1 entries live for at most l1_expire
+    seconds and every key evicted from L2 is published on a Redis channel so that all workers drop it from their L1.
+    If the subscription is lost for a while, L1 staleness is still bounded by l1_expire. Compression only applies to L2,
+    L1 holds entries decompressed so that its hits don't pay for it
+    """
+
+    def __init__(self, redis: Redis, l1_max_entries: int = 1024, l1_expire: int = 5,
+                 lock_timeout: Optional[float] = None, compression: Optional[str] = None,
+                 compression_min_bytes: int = 1024):
+        self.redis = redis
+        self.l1 = TaggedInMemoryBackend(max_entries=l1_max_entries)
+        self.l2 = TaggedRedisBackend(redis, lock_timeout=lock_timeout, compression=compression,
+                                     compression_min_bytes=compression_min_bytes)
+        self.l1_expire = l1_expire
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def channel(self) -> str:
+        return f"{FastAPICache.get_prefix()}:invalidate"
+
+    def _l1_ttl(self, ttl: Optional[int]) -> int:
+        # Redis reports -1 for keys without an expiry. An L1 entry must never outlive its L2 counterpart
+        if ttl is None or ttl < 0:
+            return self.l1_expire
+        return max(1, min(ttl, self.l1_expire))
+
+    async def _set_l1(self, key: str, value: str, ttl: Optional[int]):
+        # L1 entries hold the time their L2 counterpart expires at, so that L1 hits report the TTL left in L2 (which
+        # bounds the s-maxage of responses) rather than their own few seconds
+        expires_at = time.time() + ttl if ttl is not None and ttl >= 0 else None
+        await self.l1.set(key, (expires_at, value), self._l1_ttl(ttl))
+
+    @staticmethod
+    def _from_l1(entry: Optional[tuple[Optional[float], str]]) -> Tuple[int, Optional[str]]:
+        if entry is None:
+            return 0, None
+        expires_at, value = entry
+        return (-1 if expires_at is None else max(0, int(expires_at - time.time()))), value
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[str]]:
+        _, entry = await self.l1.get_with_ttl(key)
+        if entry is not None:
+            return self._from_l1(entry)
+
+        ttl, value = await self.l2.get_with_ttl(key)
+        if value is not None:
+            await self._set_l1(key, value, ttl)
+        return ttl, value
+
+    async def get(self, key: str) -> Optional[str]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[Tuple[int, Optional[str]]]:
+        results = [self._from_l1(entry) for _, entry in await self.l1.get_many_with_ttl(keys)]
+        missing = [index for index, (_, value) in enumerate(results) if value is None]
+        if not missing:
+            return results
+
+        for index, (ttl, value) in zip(missing, await self.l2.get_many_with_ttl([keys[index] for index in missing])):
+            if value is not None:
+                results[index] = (ttl, value)
+                await self._set_l1(keys[index], value, ttl)
+        return results
+
+    async def set(self, key: str, value: str, expire: int = None):
+        await self.set_with_tags(key, value, expire)
+
+    async def set_with_tags(self, key: str, value: str, expire: Optional[int] = None, tags: Iterable[str] = ()):
+        await self.l2.set_with_tags(key, value, expire, tags)
+        await self._set_l1(key, value, expire)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        keys = await self.l2.evict_tags(tags)
+        if keys:
+            await self._evict_local({"keys": keys})
+            await self.redis.publish(self.channel, json.dumps({"keys": keys}))
+        return len(keys)
+
+    async def clear(self, namespace: str = None, key: str = None) -> int:
+        count = await self.l2.clear(namespace, key)
+        message = {"namespace": namespace} if namespace else {"keys": [key]}
+        await self._evict_local(message)
+        await self.redis.publish(self.channel, json.dumps(message))
+        return count
+
+    def lock(self, key: str) -> AsyncIterator[bool]:
+        return self.l2.lock(key)
+
+    async def _evict_local(self, message: dict):
+        if message.get("namespace"):
+            await self.l1.clear(namespace=message["namespace"])
+        for key in message.get("keys") or ():
+            await self.l1.clear(key=key)
+
+    async def start(self):
+        """
+        Subscribes to the invalidation channel. Called from the application's startup hook
+        """
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        await self._evict_local(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Dropping L1 entirely as invalidations may have been missed while disconnected
+                logger.exception("Lost the cache invalidation subscription, resubscribing")
+                await self.l1.clear(namespace=FastAPICache.get_prefix())
+                await asyncio.sleep(1)
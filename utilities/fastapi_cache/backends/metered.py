@@ -0,0 +1,64 @@
+import time
+from typing import AsyncIterator, Iterable, Optional, Sequence, Tuple
+
+from fastapi_cache import FastAPICache
+
+from utilities.fastapi_cache.backends import TaggedBackend
+from utilities.fastapi_cache.metrics import CacheMetrics, metrics as default_metrics
+
+
+class MeteredBackend(TaggedBackend):
+    """
+    Wraps another TaggedBackend and records the hits, misses, bytes stored and latency of its gets and sets in
+    CacheMetrics, under the namespace read back from the cache key. Anything else (start, stop, stats, ...) is passed
+    through to the wrapped backend
+    """
+
+    def __init__(self, backend: TaggedBackend, cache_metrics: Optional[CacheMetrics] = None):
+        self.backend = backend
+        self.metrics = cache_metrics or default_metrics
+
+    def __getattr__(self, name: str):
+        return getattr(self.backend, name)
+
+    @staticmethod
+    def namespace(key: str) -> str:
+        # Keys are built as {prefix}:{namespace}:{hash} by the key builders in utilities.fastapi_cache.custom_builder
+        prefix = f"{FastAPICache.get_prefix()}:"
+        namespace = key.rpartition(":")[0]
+        return namespace[len(prefix):] if namespace.startswith(prefix) else namespace
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[str]]:
+        start = time.perf_counter()
+        ttl, value = await self.backend.get_with_ttl(key)
+        self.metrics.record_get(self.namespace(key), value is not None, time.perf_counter() - start)
+        return ttl, value
+
+    async def get(self, key: str) -> Optional[str]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[Tuple[int, Optional[str]]]:
+        start = time.perf_counter()
+        results = await self.backend.get_many_with_ttl(keys)
+        # The round trip is shared by every key, each gets an equal part of it
+        seconds = (time.perf_counter() - start) / max(len(keys), 1)
+        for key, (_, value) in zip(keys, results):
+            self.metrics.record_get(self.namespace(key), value is not None, seconds)
+        return results
+
+    async def set(self, key: str, value: str, expire: int = None):
+        await self.set_with_tags(key, value, expire)
+
+    async def set_with_tags(self, key: str, value: str, expire: Optional[int] = None, tags: Iterable[str] = ()):
+        start = time.perf_counter()
+        await self.backend.set_with_tags(key, value, expire, tags)
+        self.metrics.record_set(self.namespace(key), len(value), time.perf_counter() - start)
+
+    async def clear(self, namespace: str = None, key: str = None) -> int:
+        return await self.backend.clear(namespace, key)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        return await self.backend.invalidate_tags(tags)
+
+    def lock(self, key: str) -> AsyncIterator[bool]:
+        return self.backend.lock(key)
@@ -0,0 +1,147 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Optional, Sequence, Tuple
+
+from aioredis import Redis
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+
+from utilities.fastapi_cache import entry
+from utilities.fastapi_cache.backends import TaggedBackend
+
+# Stores the value and adds its key to every tag set. A tag set's TTL is only ever extended so that it outlives the
+# longest-lived entry registered under it (SADD creates new sets without a TTL, which TTL reports as -1)
+SET_WITH_TAGS_LUA = """
+local expire = tonumber(ARGV[2])
+if expire > 0 then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', expire)
+else
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+for i = 2, #KEYS do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    local ttl = redis.call('TTL', KEYS[i])
+    if expire > 0 and (ttl == -1 or ttl < expire) then
+        redis.call('EXPIRE', KEYS[i], expire)
+    elseif expire <= 0 then
+        redis.call('PERSIST', KEYS[i])
+    end
+end
+"""
+
+# Deletes every key registered under the given tag sets along with the sets themselves and returns the deleted keys
+INVALIDATE_TAGS_LUA = """
+local deleted = {}
+for i = 1, #KEYS do
+    local keys = redis.call('SMEMBERS', KEYS[i])
+    for _, key in ipairs(keys) do
+        if redis.call('DEL', key) == 1 then
+            table.insert(deleted, key)
+        end
+    end
+    redis.call('DEL', KEYS[i])
+end
+return deleted
+"""
+
+# Only releasing the lock if it's still held by the caller, it may have expired and been taken by another worker
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class TaggedRedisBackend(RedisBackend, TaggedBackend):
+    """
+    Redis backend that records each tag as a set of cache keys. Both writing and invalidating are done in a single Lua
+    script so that a concurrent write can't register a key under a tag that is halfway through being evicted.
+
+    When lock_timeout is set, a worker recomputing a missed entry holds a Redis lock on it for at most that many
+    seconds and other workers missing on the same key wait for it instead of running the same query.
+
+    When compression is set to a codec of utilities.fastapi_cache.entry.CODECS, entries of at least compression_min_bytes
+    are stored compressed. The Redis client must then be created with decode_responses=False
+    """
+
+    def __init__(self, redis: Redis, lock_timeout: Optional[float] = None, compression: Optional[str] = None,
+                 compression_min_bytes: int = 1024):
+        if compression is not None and compression not in entry.CODECS:
+            raise ValueError(f"Unknown or unavailable cache compression codec: {compression}")
+
+        super().__init__(redis)
+        self.lock_timeout = lock_timeout
+        self.compression = compression
+        self.compression_min_bytes = compression_min_bytes
+        self._set_with_tags = redis.register_script(SET_WITH_TAGS_LUA)
+        self._invalidate_tags = redis.register_script(INVALIDATE_TAGS_LUA)
+        self._release_lock = redis.register_script(RELEASE_LOCK_LUA)
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"{FastAPICache.get_prefix()}:tag:{tag}"
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[str]]:
+        ttl, value = await super().get_with_ttl(key)
+        return ttl, entry.decompress(value) if value is not None else None
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.redis.get(key)
+        return entry.decompress(value) if value is not None else None
+
+    async def get_many_with_ttl(self, keys: Sequence[str]) -> list[Tuple[int, Optional[str]]]:
+        if not keys:
+            return []
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.ttl(key).get(key)
+            results = await pipe.execute()
+        return [(ttl, entry.decompress(value) if value is not None else None)
+                for ttl, value in zip(results[::2], results[1::2])]
+
+    async def set(self, key: str, value: str, expire: int = None):
+        return await self.redis.set(key, entry.compress(value, self.compression, self.compression_min_bytes),
+                                    ex=expire)
+
+    async def set_with_tags(self, key: str, value: str, expire: Optional[int] = None, tags: Iterable[str] = ()):
+        tags = list(tags)
+        if not tags:
+            return await self.set(key, value, expire)
+        value = entry.compress(value, self.compression, self.compression_min_bytes)
+        return await self._set_with_tags(keys=[key, *(self._tag_key(tag) for tag in tags)], args=[value, expire or 0])
+
+    async def evict_tags(self, tags: Iterable[str]) -> list[str]:
+        """
+        Same as invalidate_tags but returns the evicted keys so that they can be broadcast to other workers
+        """
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return []
+        keys = await self._invalidate_tags(keys=tag_keys)
+        return [key.decode() if isinstance(key, bytes) else key for key in keys]
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        return len(await self.evict_tags(tags))
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[bool]:
+        if not self.lock_timeout:
+            yield True
+            return
+
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        acquired = await self.redis.set(lock_key, token, px=int(self.lock_timeout * 1000), nx=True)
+        if not acquired:
+            # Waiting for the holder to finish (or for its lock to expire) so that the caller can re-read the cache
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.lock_timeout
+            while loop.time() < deadline and await self.redis.exists(lock_key):
+                await asyncio.sleep(0.05)
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                await self._release_lock(keys=[lock_key], args=[token])
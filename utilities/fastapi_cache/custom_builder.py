@@ -1,5 +1,6 @@
 import hashlib
 from typing import Optional
+from urllib.parse import parse_qsl, urlencode
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.requests import Request
@@ -29,3 +30,34 @@ def custom_key_builder(
     ).hexdigest()
     )
     return cache_key
+
+
+def request_key_builder(
+        func,
+        namespace: Optional[str] = "",
+        request: Optional[Request] = None,
+        response: Optional[Response] = None,
+        args: Optional[tuple] = None,
+        kwargs: Optional[dict] = None,
+):
+    # Routes using this key builder must take the request as a parameter
+    return build_request_key(namespace, request.scope["method"], request.scope["path"],
+                             request.scope["query_string"])
+
+
+def build_request_key(namespace: str, method: str, path: str, query_string: bytes) -> str:
+    """
+    Cache key built only from the request line so that it can be computed from the ASGI scope before routing. The
+    query string is normalized by sorting its parameters
+    """
+    from fastapi_cache import FastAPICache
+
+    query = urlencode(sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)))
+    prefix = f"{FastAPICache.get_prefix()}:{namespace}:"
+    cache_key = (
+            prefix
+            + hashlib.md5(  # nosec:B303
+        f"{method}:{path}?{query}".encode()
+    ).hexdigest()
+    )
+    return cache_key
@@ -0,0 +1,256 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from functools import wraps
+from typing import Any, Callable, Iterable, Optional, Type
+
+from fastapi import HTTPException
+from fastapi_cache import FastAPICache
+from fastapi_cache.coder import Coder
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
+
+from database.database import async_session_maker
+from utilities.fastapi_cache import entry
+from utilities.fastapi_cache.custom_builder import request_key_builder
+from utilities.fastapi_cache.metrics import metrics
+from utilities.fastapi_cache.singleflight import SingleFlight
+from utilities.serialization import dumps, json_response
+
+logger = logging.getLogger(__name__)
+
+# Concurrent misses on the same key within this worker share one computation
+flights = SingleFlight()
+
+# Holding references to background refreshes so that they aren't garbage collected before they finish
+background_refreshes: set[asyncio.Task] = set()
+
+# Headers that are recomputed for every response rather than replayed from the cache
+UNCACHED_HEADERS = {"content-length", "content-type", "cache-control", "etag"}
+
+
+def replayed_headers(response: Optional[Response]) -> dict:
+    return {name: value for name, value in response.headers.items()
+            if name not in UNCACHED_HEADERS} if response is not None else {}
+
+
+def content_etag(payload: str) -> str:
+    """
+    Strong ETag derived from the encoded payload, identical across workers and restarts for the same content
+    """
+    return '"' + hashlib.md5(payload.encode()).hexdigest() + '"'  # nosec:B303
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, a W/ prefix on either side is ignored
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def hit_headers(header: dict, payload: str, ttl: int, s_maxage: Optional[int] = None) -> dict:
+    """
+    Validation and freshness headers of a cached entry. The ETag is read from the entry's header when it was stored
+    with one so that answering If-None-Match never requires touching the payload.
+    Clients revalidate every use with the ETag, as invalidating an entry can't reach their copies, and get a 304 while
+    the entry is unchanged. Only shared caches may reuse the response, for s_maxage seconds at most
+    """
+    if s_maxage is None:
+        cache_control = "no-cache"
+    else:
+        cache_control = f"public, max-age=0, s-maxage={min(s_maxage, ttl)}"
+    return {"Cache-Control": cache_control, "ETag": header.get("etag") or content_etag(payload)}
+
+
+def replay_response(header: dict, payload: str, cache_headers: Optional[dict] = None,
+                    if_none_match: Optional[str] = None) -> Response:
+    """
+    Rebuilds the Response of an entry stored with raw_response, or a 304 when if_none_match matches its ETag
+    """
+    headers = {**header.get("headers", {}), **(cache_headers or {})}
+    status_code = header.get("status_code", 200)
+    if status_code == 200 and cache_headers and etag_matches(if_none_match, cache_headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def cache(
+        expire: Optional[int] = None,
+        coder: Optional[Type[Coder]] = None,
+        key_builder: Optional[Callable] = None,
+        namespace: Optional[str] = "",
+        tags: Optional[Callable[[Any, dict], Iterable[str]]] = None,
+        stale_ttl: Optional[int] = None,
+        raw_response: bool = False,
+        asgi: bool = False,
+        s_maxage: Optional[int] = None,
+        not_found_expire: Optional[int] = None,
+        not_found_tags: Optional[Callable[[dict], Iterable[str]]] = None,
+):
+    """
+    Replacement for fastapi_cache.decorator.cache that registers the cached entry under the tags returned by
+    tags(result, kwargs) so that mutating routes can evict it with utilities.fastapi_cache.tags.invalidate_tags.
+
+    Concurrent misses on the same key are coalesced into a single call of the route within a worker, and across
+    workers as well when the backend provides a lock
+
+    :param expire: seconds before the entry expires, defaults to the FastAPICache expire
+    :param coder: coder used to (de)serialize the entry, defaults to the FastAPICache coder
+    :param key_builder: defaults to the FastAPICache key builder
+    :param namespace: namespace inserted into the cache key
+    :param tags: callable receiving the route's result and keyword arguments and returning the tags of the entry
+    :param stale_ttl: seconds an expired entry keeps being served while a single background task recomputes it
+    :param raw_response: cache the encoded JSON body and headers and replay them as a Response, skipping the
+    response_model validation and JSON encoding FastAPI would otherwise do on every response. The route's result is
+    encoded once with orjson and must already match its response_model (see utilities.serialization.row_dict)
+    :param asgi: key the entry on the request's method, path and query so that ResponseCacheMiddleware can serve hits
+    before routing and dependency resolution. Implies raw_response and requires the route to take the request
+    :param s_maxage: seconds shared caches (nginx, a CDN) may serve the response for, marks it as public
+    :param not_found_expire: seconds a 404 HTTPException raised by the route is cached for, 404s aren't cached if unset
+    :param not_found_tags: callable receiving the route's keyword arguments and returning the tags of a cached 404, used
+    to evict it once the missing entity is created
+    """
+    if asgi:
+        raw_response = True
+        key_builder = request_key_builder
+
+    def wrapper(func):
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            copy_kwargs = kwargs.copy()
+            request = copy_kwargs.pop("request", None)
+            response = copy_kwargs.pop("response", None)
+            if (request and request.headers.get("Cache-Control") == "no-store") or not FastAPICache.get_enable():
+                result = await func(*args, **kwargs)
+                if raw_response and not isinstance(result, Response):
+                    return json_response(result, headers=replayed_headers(response))
+                return result
+
+            entry_coder = coder or FastAPICache.get_coder()
+            entry_expire = expire or FastAPICache.get_expire()
+            build_key = key_builder or FastAPICache.get_key_builder()
+            backend = FastAPICache.get_backend()
+
+            cache_key = build_key(func, namespace, request=request, response=response, args=args,
+                                  kwargs=copy_kwargs)
+
+            async def store(result) -> tuple[dict, str]:
+                header = {}
+                if raw_response:
+                    payload = dumps(result)
+                    if response is not None:
+                        header["headers"] = replayed_headers(response)
+                else:
+                    payload = entry_coder.encode(result)
+                header["etag"] = content_etag(payload)
+
+                entry_tags = tags(result, copy_kwargs) if tags is not None else ()
+                if stale_ttl:
+                    # The entry outlives its freshness by the grace window, the header records when it goes stale
+                    header["fresh_until"] = time.time() + entry_expire
+                    await backend.set_with_tags(cache_key, entry.pack(header, payload), entry_expire + stale_ttl,
+                                                entry_tags)
+                else:
+                    await backend.set_with_tags(cache_key, entry.pack(header, payload), entry_expire, entry_tags)
+                return header, payload
+
+            async def store_not_found(exc: HTTPException) -> tuple[dict, str]:
+                # Encoded like FastAPI's default HTTPException handler
+                header = {"status_code": exc.status_code}
+                payload = dumps({"detail": exc.detail})
+                entry_tags = not_found_tags(copy_kwargs) if not_found_tags is not None else ()
+                await backend.set_with_tags(cache_key, entry.pack(header, payload), not_found_expire, entry_tags)
+                return header, payload
+
+            async def compute() -> tuple[dict, str, Any]:
+                async with backend.lock(cache_key) as acquired:
+                    if not acquired:
+                        # Another worker held the lock while computing this entry, it should be cached by now
+                        metrics.record_stampede_wait(namespace)
+                        _, cached = await backend.get_with_ttl(cache_key)
+                        unpacked = entry.unpack(cached) if cached is not None else None
+                        if unpacked is not None:
+                            return *unpacked, None
+
+                    try:
+                        result = await func(*args, **kwargs)
+                    except HTTPException as exc:
+                        if not not_found_expire or exc.status_code != 404:
+                            raise
+                        return *await store_not_found(exc), None
+                    return *await store(result), result
+
+            async def refresh() -> tuple[dict, str, Any]:
+                # The request's session is closed once the stale response has been sent so the refresh opens its own.
+                # Returns like compute, since misses arriving while it runs (the entry having been evicted meanwhile)
+                # join its flight
+                if isinstance(kwargs.get("session"), AsyncSession):
+                    async with async_session_maker() as session:
+                        result = await func(*args, **{**kwargs, "session": session})
+                else:
+                    result = await func(*args, **kwargs)
+                return *await store(result), result
+
+            def respond(header: dict, payload: str, cache_headers: Optional[dict] = None):
+                if "status_code" in header and not raw_response:
+                    raise HTTPException(status_code=header["status_code"], detail=json.loads(payload)["detail"])
+                if raw_response:
+                    if_none_match = request.headers.get("if-none-match") if request else None
+                    return replay_response(header, payload, cache_headers, if_none_match)
+
+                if cache_headers:
+                    response.headers.update(cache_headers)
+                    if etag_matches(request.headers.get("if-none-match"), cache_headers["ETag"]):
+                        response.status_code = 304
+                        return response
+                return entry_coder.decode(payload)
+
+            def headers_for(header: dict, payload: str, ttl: int) -> Optional[dict]:
+                if request and (raw_response or response):
+                    return hit_headers(header, payload, ttl, s_maxage)
+                return None
+
+            lookup = request.scope.get("response_cache") if request else None
+            if lookup is not None and lookup[0] == cache_key:
+                # Already looked up by ResponseCacheMiddleware
+                _, ttl, cached = lookup
+            else:
+                ttl, cached = await backend.get_with_ttl(cache_key)
+            unpacked = entry.unpack(cached) if cached is not None else None
+
+            if unpacked is not None:
+                header, payload = unpacked
+                if "fresh_until" in header:
+                    ttl = max(0, int(header["fresh_until"] - time.time()))
+                    if header["fresh_until"] <= time.time() and not flights.in_flight(cache_key):
+                        task = asyncio.ensure_future(flights.do(cache_key, refresh))
+                        background_refreshes.add(task)
+                        task.add_done_callback(_finish_refresh)
+
+                return respond(header, payload, headers_for(header, payload, ttl))
+
+            if flights.in_flight(cache_key):
+                metrics.record_stampede_wait(namespace)
+            header, payload, result = await flights.do(cache_key, compute)
+            cache_headers = headers_for(header, payload, not_found_expire if "status_code" in header else entry_expire)
+            if result is not None and not raw_response and cache_headers is None:
+                return result
+            return respond(header, payload, cache_headers)
+
+        # Read by ResponseCacheMiddleware to find the routes it may answer
+        if asgi:
+            inner.asgi_cache = {"namespace": namespace, "s_maxage": s_maxage}
+        return inner
+
+    return wrapper
+
+
+def _finish_refresh(task: asyncio.Task):
+    background_refreshes.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background cache refresh failed", exc_info=task.exception())
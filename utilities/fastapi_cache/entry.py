@@ -0,0 +1,84 @@
+import json
+import zlib
+from typing import Optional, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Cache entries written by utilities.fastapi_cache.decorator are stored as a one line JSON header followed by the
+# payload. The header carries metadata about the entry (when it stops being fresh, the response headers to replay,
+# ...) so that it can be inspected without decoding the payload itself.
+#
+# Backends storing entries out of process may compress the payload of large entries, the header then records the codec
+# and the entry is stored as bytes. Backends decompress entries before returning them so that callers only ever see
+# the packed string
+
+
+class Codec:
+    def __init__(self, compress, decompress):
+        self.compress = compress
+        self.decompress = decompress
+
+
+CODECS = {"zlib": Codec(zlib.compress, zlib.decompress)}
+if zstandard is not None:
+    CODECS["zstd"] = Codec(zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress)
+
+
+def pack(header: dict, payload: str) -> str:
+    return json.dumps(header, separators=(",", ":")) + "\n" + payload
+
+
+def unpack(value: str) -> Optional[tuple[dict, str]]:
+    """
+    Splits a stored entry into its header and payload. Returns None for values that weren't written by pack (for
+    example entries left in Redis by a previous version), which callers treat as a miss
+    """
+    header, separator, payload = value.partition("\n")
+    if not separator:
+        return None
+    try:
+        header = json.loads(header)
+    except ValueError:
+        return None
+    return (header, payload) if isinstance(header, dict) else None
+
+
+def compress(value: str, codec: Optional[str], min_bytes: int) -> Union[str, bytes]:
+    """
+    Compresses the payload of a packed entry with the given codec when the entry is at least min_bytes long. Smaller
+    entries, and values that weren't written by pack, are returned unchanged
+    """
+    if codec is None or len(value) < min_bytes:
+        return value
+    unpacked = unpack(value)
+    if unpacked is None:
+        return value
+
+    header, payload = unpacked
+    return pack({**header, "codec": codec}, "").encode() + CODECS[codec].compress(payload.encode())
+
+
+def decompress(value: Union[str, bytes]) -> Optional[str]:
+    """
+    Reverses compress, also decoding uncompressed entries read as bytes. Returns None when the entry can't be
+    decompressed (for example a codec that isn't installed on this worker), which callers treat as a miss
+    """
+    if isinstance(value, str):
+        return value
+
+    header, _, payload = value.partition(b"\n")
+    try:
+        # Skipping the header's JSON parsing for the uncompressed entries
+        if b'"codec"' not in header:
+            return value.decode()
+
+        header = json.loads(header)
+        codec = CODECS.get(header.pop("codec"))
+        if codec is None:
+            return None
+        return pack(header, codec.decompress(payload).decode())
+    except Exception:
+        return None
@@ -0,0 +1,83 @@
+import bisect
+from collections import defaultdict
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        # One count per bucket plus the overflow bucket
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def as_dict(self) -> dict:
+        # Cumulative counts keyed by upper bound, like Prometheus histograms
+        buckets, total = {}, 0
+        for bound, count in zip((*map(str, LATENCY_BUCKETS), "+Inf"), self.counts):
+            total += count
+            buckets[bound] = total
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class NamespaceMetrics:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        # Requests that waited for another request (or worker) to compute the entry they missed
+        self.stampede_waits = 0
+        self.bytes_stored = 0
+        self.get_latency = LatencyHistogram()
+        self.set_latency = LatencyHistogram()
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else None,
+            "stampede_waits": self.stampede_waits,
+            "bytes_stored": self.bytes_stored,
+            "get_latency": self.get_latency.as_dict(),
+            "set_latency": self.set_latency.as_dict(),
+        }
+
+
+class CacheMetrics:
+    """
+    Counters of the cache layer per namespace (the namespace argument of the cache decorator). Kept per worker
+    """
+
+    def __init__(self):
+        self.namespaces: defaultdict[str, NamespaceMetrics] = defaultdict(NamespaceMetrics)
+
+    def record_get(self, namespace: str, hit: bool, seconds: float):
+        metrics = self.namespaces[namespace]
+        if hit:
+            metrics.hits += 1
+        else:
+            metrics.misses += 1
+        metrics.get_latency.observe(seconds)
+
+    def record_set(self, namespace: str, size: int, seconds: float):
+        metrics = self.namespaces[namespace]
+        metrics.bytes_stored += size
+        metrics.set_latency.observe(seconds)
+
+    def record_stampede_wait(self, namespace: str):
+        self.namespaces[namespace].stampede_waits += 1
+
+    def as_dict(self) -> dict:
+        return {namespace: metrics.as_dict() for namespace, metrics in sorted(self.namespaces.items())}
+
+    def reset(self):
+        self.namespaces.clear()
+
+
+metrics = CacheMetrics()
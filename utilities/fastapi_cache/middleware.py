@@ -0,0 +1,74 @@
+import re
+import time
+from typing import Optional, Sequence
+
+from fastapi.routing import APIRoute
+from fastapi_cache import FastAPICache
+from starlette.datastructures import Headers
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from utilities.fastapi_cache import entry
+from utilities.fastapi_cache.custom_builder import build_request_key
+from utilities.fastapi_cache.decorator import hit_headers, replay_response
+from utilities.fastapi_cache.warmup import HitLog
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware answering requests to routes declared with @cache(asgi=True) straight from the cache. A hit is sent
+    before routing, the middlewares further down the stack (rate limiting) and dependency resolution (the database
+    session) run. Misses and stale entries continue to the route where the cache decorator computes and stores them.
+    Requests to those routes are counted in hit_log, if given, to pick what to warm up after a restart
+    """
+
+    def __init__(self, app: ASGIApp, routes: Sequence[BaseRoute], hit_log: Optional[HitLog] = None):
+        self.app = app
+        self.hit_log = hit_log
+        # The application's route list, read lazily so that routers included after the middleware are picked up
+        self.routes = routes
+        self._cached_routes: Optional[list[tuple[re.Pattern, set[str], dict]]] = None
+
+    def _match(self, method: str, path: str) -> Optional[dict]:
+        if self._cached_routes is None:
+            self._cached_routes = [
+                (route.path_regex, route.methods, route.endpoint.asgi_cache)
+                for route in self.routes
+                if isinstance(route, APIRoute) and getattr(route.endpoint, "asgi_cache", None) is not None
+            ]
+
+        for path_regex, methods, options in self._cached_routes:
+            if method in methods and path_regex.match(path):
+                return options
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not FastAPICache.get_enable():
+            return await self.app(scope, receive, send)
+
+        options = self._match(scope["method"], scope["path"])
+        headers = Headers(scope=scope)
+        if options is None or headers.get("cache-control") == "no-store":
+            return await self.app(scope, receive, send)
+
+        if self.hit_log is not None:
+            self.hit_log.record(scope["path"], scope["query_string"])
+
+        cache_key = build_request_key(options["namespace"], scope["method"], scope["path"], scope["query_string"])
+        ttl, cached = await FastAPICache.get_backend().get_with_ttl(cache_key)
+        # Handing the lookup to the cache decorator so that a miss or stale entry isn't fetched a second time
+        scope["response_cache"] = (cache_key, ttl, cached)
+        unpacked = entry.unpack(cached) if cached is not None else None
+        if unpacked is None:
+            return await self.app(scope, receive, send)
+
+        header, payload = unpacked
+        if "fresh_until" in header:
+            # Stale entries are left to the route so that the decorator can schedule their background refresh
+            if header["fresh_until"] <= time.time():
+                return await self.app(scope, receive, send)
+            ttl = int(header["fresh_until"] - time.time())
+
+        cache_headers = hit_headers(header, payload, ttl, options["s_maxage"])
+        response = replay_response(header, payload, cache_headers, headers.get("if-none-match"))
+        await response(scope, receive, send)
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Iterable, Optional, Sequence
+
+from fastapi_cache import FastAPICache
+from starlette.requests import Request
+from starlette.responses import Response
+
+from utilities.fastapi_cache import entry
+from utilities.fastapi_cache.custom_builder import build_request_key
+from utilities.fastapi_cache.decorator import flights, hit_headers, replay_response
+from utilities.fastapi_cache.metrics import metrics
+from utilities.serialization import dumps, json_response
+
+
+def entity_key(namespace: str, entity_id: int, fields: Optional[Sequence[str]] = None) -> str:
+    # Projections are kept out of the namespace part of the key so that they're reported under the entity namespace
+    projection = f"?fields={','.join(fields)}" if fields is not None else ""
+    return f"{FastAPICache.get_prefix()}:{namespace}:entity:{entity_id}{projection}"
+
+
+async def cached_list(
+        request: Request,
+        namespace: str,
+        load_ids: Callable[[], Awaitable[list[int]]],
+        load_entities: Callable[[list[int]], Awaitable[list[dict]]],
+        list_tags: Iterable[str],
+        entity_tags: Callable[[Any, dict], Iterable[str]],
+        expire: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+        page_headers: Optional[Callable[[list[int]], dict]] = None,
+) -> Response:
+    """
+    Cache for list routes that stores each query's ordered ids (under {namespace}:list, tagged with list_tags) apart
+    from the encoded entities (under {namespace}:entity, one entry per id tagged with entity_tags(entity, {})). An
+    entity appearing in many pages is then cached once, and changing it only evicts its own entry rather than every
+    page it appears in. List entries only have to be evicted when entities are created or deleted.
+
+    Entities are fetched from the cache in a single multi-get and the missing ones are loaded with a single call of
+    load_entities. The response body is assembled from the encoded entities without decoding them
+
+    :param load_ids: returns the ids of the requested page, in order
+    :param load_entities: returns the entities with the given ids as dicts matching the route's response_model (see
+    utilities.serialization.row_dict), in any order. They are encoded once with orjson and never validated again
+    :param fields: the fields the entities are projected to (see utilities.fieldsets), cached apart from the full
+    entities
+    :param page_headers: builds headers of the response from the page's ids (see utilities.pagination), also applied to
+    cached pages
+    """
+    if request.headers.get("Cache-Control") == "no-store" or not FastAPICache.get_enable():
+        ids = await load_ids()
+        entities = {entity["id"]: entity for entity in await load_entities(ids)} if ids else {}
+        return json_response([entities[entity_id] for entity_id in ids if entity_id in entities],
+                             headers=page_headers(ids) if page_headers else None)
+
+    backend = FastAPICache.get_backend()
+    expire = expire or FastAPICache.get_expire()
+    list_key = build_request_key(f"{namespace}:list", request.scope["method"], request.scope["path"],
+                                 request.scope["query_string"])
+
+    async def compute_ids() -> list[int]:
+        computed = await load_ids()
+        await backend.set_with_tags(list_key, entry.pack({}, json.dumps(computed)), expire, list_tags)
+        return computed
+
+    ttl, cached = await backend.get_with_ttl(list_key)
+    unpacked = entry.unpack(cached) if cached is not None else None
+    if unpacked is not None:
+        ids = json.loads(unpacked[1])
+    else:
+        if flights.in_flight(list_key):
+            metrics.record_stampede_wait(f"{namespace}:list")
+        ids = await flights.do(list_key, compute_ids)
+        ttl = expire
+
+    keys = [entity_key(namespace, entity_id, fields) for entity_id in ids]
+    bodies = {}
+    for entity_id, (_, cached) in zip(ids, await backend.get_many_with_ttl(keys)):
+        unpacked = entry.unpack(cached) if cached is not None else None
+        if unpacked is not None:
+            bodies[entity_id] = unpacked[1]
+
+    missing = [entity_id for entity_id in ids if entity_id not in bodies]
+    if missing:
+        stores = []
+        for entity in await load_entities(missing):
+            body = dumps(entity)
+            bodies[entity["id"]] = body
+            stores.append(backend.set_with_tags(entity_key(namespace, entity["id"], fields), entry.pack({}, body),
+                                                expire, entity_tags(entity, {})))
+        await asyncio.gather(*stores)
+
+    # Ids of entities deleted since the list was cached are skipped until the list entry is evicted
+    payload = "[" + ",".join(bodies[entity_id] for entity_id in ids if entity_id in bodies) + "]"
+    header = {"headers": page_headers(ids)} if page_headers else {}
+    return replay_response(header, payload, hit_headers({}, payload, max(ttl, 0)), request.headers.get("if-none-match"))
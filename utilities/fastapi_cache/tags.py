@@ -0,0 +1,106 @@
+from typing import Any
+
+from fastapi_cache import FastAPICache
+
+# Tags group cache entries by the entities they were built from. Read routes register their entries under these tags
+# (through the tags argument of the cache decorator) and mutating routes evict them with invalidate_tags after commit.
+# Cached 404s of lookups by name are registered under the name's tag so that creating the entity evicts them
+# List routes only cache the ids of each page (see utilities.fastapi_cache.normalized) so their list tags only need to
+# be evicted when an entity is created or deleted
+
+SHIPS_LIST = "ships:list"
+COURSES_LIST = "courses:list"
+COLLECTIONS_LIST = "collections:list"
+# Course lists filtered by metadata, evicted by course updates as well since those can move a course between them
+COURSES_FILTERED_LIST = "courses:list:filtered"
+# Evicted by every change to a name or description, which can change the results of any search
+SEARCH = "search"
+
+
+def ship_tag(ship_id: int) -> str:
+    return f"ship:{ship_id}"
+
+
+def course_tag(course_id: int) -> str:
+    return f"course:{course_id}"
+
+
+def collection_tag(collection_id: int) -> str:
+    return f"collection:{collection_id}"
+
+
+def ship_name_tag(ship_name: str) -> str:
+    return f"ship:name:{ship_name}"
+
+
+def course_name_tag(course_name: str) -> str:
+    return f"course:name:{course_name}"
+
+
+def collection_name_tag(collection_name: str) -> str:
+    return f"collection:name:{collection_name}"
+
+
+def user_tag(username: str, entity: str) -> str:
+    return f"user:{username}:{entity}"
+
+
+def ship_list_tags(ret: Any, kwargs: dict) -> list[str]:
+    username = kwargs.get("username")
+    return [user_tag(username, "ships")] if username is not None else [SHIPS_LIST]
+
+
+def ship_tags(ret: Any, kwargs: dict) -> list[str]:
+    return [ship_tag(ret["id"])]
+
+
+def ship_not_found_tags(kwargs: dict) -> list[str]:
+    return [ship_name_tag(kwargs["ship_name"])]
+
+
+def course_list_tags(ret: Any, kwargs: dict) -> list[str]:
+    username = kwargs.get("username")
+    tags = [user_tag(username, "courses")] if username is not None else [COURSES_LIST]
+    if any(kwargs.get(name) is not None for name in ("game_type", "difficulty", "length", "location")):
+        tags.append(COURSES_FILTERED_LIST)
+    return tags
+
+
+def course_tags(ret: Any, kwargs: dict) -> list[str]:
+    return [course_tag(ret["id"])]
+
+
+def course_not_found_tags(kwargs: dict) -> list[str]:
+    return [course_name_tag(kwargs["course_name"])]
+
+
+def _embedded_course_tags(collections: list[dict]) -> list[str]:
+    # Collections embed their full courses so a change to any of those courses has to evict the collection as well
+    return [course_tag(course["id"]) for collection in collections for course in collection.get("courses") or []]
+
+
+def collection_list_tags(ret: Any, kwargs: dict) -> list[str]:
+    username = kwargs.get("username")
+    return [user_tag(username, "collections")] if username is not None else [COLLECTIONS_LIST]
+
+
+def collection_tags(ret: Any, kwargs: dict) -> list[str]:
+    return [collection_tag(ret["id"]), *_embedded_course_tags([ret])]
+
+
+def collection_not_found_tags(kwargs: dict) -> list[str]:
+    return [collection_name_tag(kwargs["collection_name"])]
+
+
+def search_tags(ret: Any, kwargs: dict) -> list[str]:
+    # Any created, deleted or edited entity may enter or leave the results of a search
+    return [SEARCH, SHIPS_LIST, COURSES_LIST, COLLECTIONS_LIST]
+
+async def invalidate_tags(*tags: str) -> int:
+    """
+    Evicts every cache entry registered under any of the given tags. Safe to call when caching is disabled
+    """
+    if not FastAPICache.get_enable():
+        return 0
+    return await FastAPICache.get_backend().invalidate_tags(tags)
+
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import logging
+import os
+from collections import Counter
+from typing import Iterable, Optional
+
+from fastapi import FastAPI
+from fastapi.middleware.asyncexitstack import AsyncExitStackMiddleware
+from httpx import ASGITransport, AsyncClient
+from starlette.exceptions import ExceptionMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+class HitLog:
+    """
+    Counts the requests made to cached routes so that the most requested ones can be warmed up after a restart. The
+    counts are merged into a JSON file on shutdown, each worker adding its own
+    """
+
+    def __init__(self, path: Optional[str] = None, max_paths: int = 10000):
+        self.path = path
+        self.max_paths = max_paths
+        self.counts: Counter[str] = Counter()
+
+    def record(self, path: str, query_string: bytes = b""):
+        if query_string:
+            path = f"{path}?{query_string.decode('latin-1')}"
+        self.counts[path] += 1
+
+        if len(self.counts) > self.max_paths:
+            # Keeping the memory bounded when scrapers walk through many distinct paths
+            self.counts = Counter(dict(self.counts.most_common(self.max_paths // 2)))
+
+    def load(self) -> Counter:
+        if not self.path or not os.path.exists(self.path):
+            return Counter()
+        try:
+            with open(self.path) as file:
+                return Counter(json.load(file))
+        except (OSError, ValueError):
+            logger.exception(f"Couldn't read the cache hit log {self.path}")
+            return Counter()
+
+    def most_requested(self, count: int) -> list[str]:
+        return [path for path, _ in (self.load() + self.counts).most_common(count)]
+
+    def save(self):
+        if not self.path or not self.counts:
+            return
+        counts = self.load() + self.counts
+        # Only keeping the paths that could ever be warmed up
+        counts = Counter(dict(counts.most_common(self.max_paths)))
+
+        # Writing to a temporary file first so that a worker reading the log never sees a partial file
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(counts, file)
+        os.replace(temporary_path, self.path)
+        self.counts.clear()
+
+
+async def warm_up(app: FastAPI, paths: Iterable[str], concurrency: int = 4, deadline: float = 10) -> int:
+    """
+    Requests every path from the application so that the cache decorator stores their responses, with at most
+    concurrency requests (and so database sessions) at a time. Gives up once deadline seconds have passed, the remaining
+    paths are then cached by regular traffic. Returns the number of paths warmed up.
+
+    The requests are sent to the application's router with only the middlewares FastAPI itself relies on, skipping the
+    rate limiter and the hit log
+    """
+    router = ExceptionMiddleware(AsyncExitStackMiddleware(app.router), handlers=app.exception_handlers)
+    semaphore = asyncio.Semaphore(concurrency)
+    warmed = 0
+
+    async with AsyncClient(transport=ASGITransport(app=router), base_url="http://warmup") as client:
+        async def fetch(path: str):
+            nonlocal warmed
+            async with semaphore:
+                try:
+                    response = await client.get(path)
+                except Exception:
+                    logger.exception(f"Cache warm-up of {path} failed")
+                    return
+            if response.status_code < 500:
+                warmed += 1
+
+        tasks = [asyncio.ensure_future(fetch(path)) for path in dict.fromkeys(paths)]
+        if not tasks:
+            return 0
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Cache warm-up deadline reached, {len(pending)} paths left to regular traffic")
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    return warmed
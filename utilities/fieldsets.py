@@ -0,0 +1,59 @@
+import typing
+from functools import lru_cache
+from typing import Optional, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, raiseload, selectinload
+
+# Read routes take a comma separated fields query parameter (?fields=id,name,author_id) restricting the response to
+# those fields of their response_model. The projected schema drives both the columns the query loads and the dict
+# built by utilities.serialization.row_dict, so unrequested columns are never read from the database
+
+FIELDS_DESCRIPTION = "Comma separated fields of the response to return, id is always returned"
+
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[tuple[str, ...]]:
+    """
+    Parses a fields query parameter into field names of schema, in schema order. id is always included since entities
+    are cached and invalidated by id. Returns None when the parameter isn't set, meaning every field
+    """
+    if fields is None:
+        return None
+
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - schema.__fields__.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}. Available fields: "
+                                                    f"{', '.join(schema.__fields__)}")
+
+    requested.add("id")
+    return tuple(name for name in schema.__fields__ if name in requested)
+
+
+@lru_cache(maxsize=None)
+def project(schema: Type[BaseModel], fields: Optional[tuple[str, ...]]) -> Type[BaseModel]:
+    """
+    Schema with only the given fields of schema, or schema itself when fields is None
+    """
+    if fields is None:
+        return schema
+
+    hints = typing.get_type_hints(schema)
+    definitions = {name: (hints[name], ... if schema.__fields__[name].required else schema.__fields__[name].default)
+                   for name in fields}
+    return create_model(f"{schema.__name__}Fields", __config__=schema.__config__, **definitions)
+
+
+def column_options(model, schema: Type[BaseModel]) -> list:
+    """
+    Loader options restricting a query of model to the columns read by schema. Relationships schema reads are loaded
+    with one extra query each (selectinload), the others are left unloaded even when the model eagerly loads them by
+    default
+    """
+    mapper = inspect(model)
+    columns = [attribute.class_attribute for attribute in mapper.column_attrs if attribute.key in schema.__fields__]
+    relationships = [selectinload(relationship.class_attribute) if relationship.key in schema.__fields__
+                     else raiseload(relationship.class_attribute) for relationship in mapper.relationships]
+    return [load_only(*columns), *relationships]
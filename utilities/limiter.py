@@ -0,0 +1,41 @@
+import time
+
+from slowapi import Limiter
+from starlette.requests import Request
+
+from utilities.circuit_breaker import CLOSED, CircuitBreaker
+
+
+class FallbackLimiter(Limiter):
+    """
+    slowapi Limiter that enforces its limits in process while the breaker guarding its Redis storage is open. Storage
+    errors and slow checks are reported to the breaker, and slowapi's own in-memory fallback is used as the local
+    limiter. Limits are then counted per worker until Redis is back
+    """
+
+    def __init__(self, *args, breaker: CircuitBreaker, **kwargs):
+        super().__init__(*args, in_memory_fallback_enabled=True, **kwargs)
+        self.breaker = breaker
+        breaker.add_listener(self._on_transition)
+
+    def _on_transition(self, state: str):
+        # slowapi reads _storage_dead to pick between the Redis and the in-memory limiter
+        self._storage_dead = state != CLOSED
+
+    def _check_request_limit(self, request: Request, endpoint_func, in_middleware: bool = True) -> None:
+        if self._storage_dead or not self.breaker.closed:
+            # Set again in case slowapi's own storage check found Redis back while the breaker is still open
+            self._storage_dead = True
+            return super()._check_request_limit(request, endpoint_func, in_middleware)
+
+        start = time.perf_counter()
+        try:
+            super()._check_request_limit(request, endpoint_func, in_middleware)
+        finally:
+            if self._storage_dead:
+                # slowapi caught a storage error and switched to its in-memory limiter for this request. The breaker
+                # decides whether the next one tries Redis again
+                self.breaker.record_failure("rate limit storage error")
+                self._storage_dead = not self.breaker.closed
+            else:
+                self.breaker.record_latency(time.perf_counter() - start)
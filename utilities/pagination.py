@@ -0,0 +1,57 @@
+import base64
+import binascii
+from typing import Callable, Optional
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy.sql import Select
+
+# List routes page either with offset and limit, or with an opaque cursor pointing after the last row of the previous
+# page. Cursor pages are read with WHERE id > :last_id ORDER BY id LIMIT :limit, an index range scan on the primary key
+# whose cost doesn't depend on how deep the page is, and rows inserted meanwhile don't shift rows between pages.
+# Both modes order by id, and every full page returns the cursor of the next one in the X-Next-Cursor header
+
+CURSOR_DESCRIPTION = "Opaque cursor returned in the X-Next-Cursor header of the previous page. Takes precedence over " \
+                     "offset"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps({"id": last_id})).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Returns the id of the last row of the page the cursor was returned with. Raises a 400 for cursors not returned by
+    encode_cursor
+    """
+    try:
+        last_id = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
+
+
+def paginate(stmt: Select, key, offset: int, limit: int, cursor: Optional[str]) -> Select:
+    """
+    Restricts stmt to a page ordered by key, the row's integer primary key (or a column mirroring it), starting after
+    cursor when it's set and at offset otherwise
+    """
+    stmt = stmt.order_by(key).limit(limit)
+    if cursor is not None:
+        return stmt.where(key > decode_cursor(cursor))
+    return stmt.offset(offset)
+
+
+def next_cursor_headers(limit: int) -> Callable[[list[int]], dict]:
+    """
+    Builds the headers of a page from its ids: the cursor of the next page when the page is full. A page shorter than
+    limit is the last one
+    """
+    def headers(ids: list[int]) -> dict:
+        return {NEXT_CURSOR_HEADER: encode_cursor(ids[-1])} if ids and len(ids) == limit else {}
+
+    return headers
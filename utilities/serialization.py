@@ -0,0 +1,47 @@
+from typing import Any, Optional, Type
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.responses import Response
+
+# Read routes return trusted dicts built straight from ORM rows with row_dict and encode them once with orjson, instead
+# of building a Pydantic model with from_orm, dumping it with .dict() and letting FastAPI validate the dict against the
+# response_model again before encoding it with the stdlib json. Everything stored in the database was validated by
+# the matching Pydantic schema on write, so the rows already match the response_model
+
+
+def row_dict(row: Any, schema: Type[BaseModel]) -> dict:
+    """
+    Reads the fields of schema off an ORM row (or a Row returned by a textual query). Fields typed with another
+    orm_mode schema are read recursively from the related rows, every other value is used as stored. Fields missing
+    from the row get their schema default, like from_orm would set them
+    """
+    result = {}
+    for name, field in schema.__fields__.items():
+        value = getattr(row, name, field.default)
+        nested = field.type_
+        if value is not None and isinstance(nested, type) and issubclass(nested, BaseModel) \
+                and nested.__config__.orm_mode:
+            if isinstance(value, (list, tuple, set)):
+                value = [row_dict(item, nested) for item in value]
+            else:
+                value = row_dict(value, nested)
+        result[name] = value
+    return result
+
+
+def dumps(content: Any) -> str:
+    """
+    Encodes content like the app's default ORJSONResponse. Values orjson can't serialize natively (Pydantic models,
+    ...) go through FastAPI's jsonable_encoder
+    """
+    return orjson.dumps(content, default=jsonable_encoder).decode()
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """
+    Returns content as an already encoded response, which FastAPI sends without validating it against the route's
+    response_model
+    """
+    return Response(content=dumps(content), status_code=status_code, media_type="application/json", headers=headers)
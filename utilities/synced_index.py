@@ -0,0 +1,190 @@
+import asyncio
+import copy
+import json
+import logging
+import uuid
+from typing import Awaitable, Callable, Iterable, Optional
+
+from aioredis import Redis
+
+from utilities.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+class SyncedIndex:
+    """
+    Base of the per-worker in-memory indexes over entities, kept in sync with the database. Subclasses hold the data
+    structure, implementing _clear, _index and _unindex for writes and _build for rebuilds.
+
+    The index is loaded from the database when started. Writes are then applied with add and remove as they're
+    committed. When started with Redis, they're also published on a channel so that every worker applies them. The whole
+    index is rebuilt off the event loop every refresh_interval seconds as well, which bounds how long a worker misses writes published
+    while it was disconnected. Until the index is first loaded it isn't ready and callers query the database instead
+    """
+
+    def __init__(self, name: str, load: Callable[[], Awaitable[Iterable[tuple[int, dict]]]],
+                 refresh_interval: float = 60):
+        """
+        :param name: names the Redis channel the index's writes are published on
+        :param load: returns every entity as an (id, values) pair
+        """
+        self.name = name
+        self.load = load
+        self.refresh_interval = refresh_interval
+        self.ready = False
+        self.redis: Optional[Redis] = None
+        self.breaker: Optional[CircuitBreaker] = None
+        # Identifies this worker's messages, which it applied before publishing them
+        self._origin = uuid.uuid4().hex
+        # Writes applied while a rebuild is loading, replayed on the rebuilt index as the load may predate them
+        self._pending: Optional[list[tuple[int, Optional[dict]]]] = None
+        self._refresher: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._clear()
+
+    @property
+    def channel(self) -> str:
+        return f"index:{self.name}"
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def _index(self, entity_id: int, values: dict):
+        raise NotImplementedError
+
+    def _unindex(self, entity_id: int):
+        """
+        Removes the entity from the index, if it's indexed
+        """
+        raise NotImplementedError
+
+    def _build(self, entities: list[tuple[int, dict]]) -> dict:
+        """
+        Builds the structures of an index holding entities, returned as the attributes to set on the index. Runs in a
+        thread while the index keeps answering from its current structures, so it mustn't touch them. By default the
+        entities are indexed one by one into the empty structures of a copy of the index, subclasses build them in bulk
+        when that's faster
+        """
+        index = copy.copy(self)
+        index._clear()
+        for entity_id, values in entities:
+            index._index(entity_id, values)
+        # Only the structures were replaced by _clear
+        return {name: value for name, value in vars(index).items() if value is not vars(self).get(name)}
+
+    async def add(self, entity_id: int, values: dict):
+        """
+        Indexes the entity or replaces its indexed values
+        """
+        self._apply(entity_id, values)
+        await self._publish(entity_id, values)
+
+    async def remove(self, entity_id: int):
+        self._apply(entity_id, None)
+        await self._publish(entity_id, None)
+
+    def _apply(self, entity_id: int, values: Optional[dict]):
+        # Writes made before the index is ready are picked up by its first load
+        if self._pending is not None:
+            self._pending.append((entity_id, values))
+        if not self.ready:
+            return
+        self._unindex(entity_id)
+        if values is not None:
+            self._index(entity_id, values)
+
+    async def _publish(self, entity_id: int, values: Optional[dict]):
+        if self.redis is None:
+            return
+
+        message = json.dumps({"origin": self._origin, "id": entity_id, "values": values})
+
+        async def skip():
+            # The other workers pick the write up on their next rebuild
+            return 0
+
+        if self.breaker is not None:
+            await self.breaker.call(lambda: self.redis.publish(self.channel, message), skip)
+            return
+        try:
+            await self.redis.publish(self.channel, message)
+        except Exception:
+            logger.exception("Couldn't publish a write to the %s index", self.name)
+
+    async def refresh(self):
+        """
+        Rebuilds the index from load
+        """
+        self._pending = []
+        try:
+            entities = list(await self.load())
+            # Built in a thread so that requests keep being answered, from the current structures, meanwhile
+            structures = await asyncio.to_thread(self._build, entities)
+        except BaseException:
+            self._pending = None
+            raise
+
+        pending, self._pending = self._pending, None
+        vars(self).update(structures)
+        for entity_id, values in pending:
+            self._unindex(entity_id)
+            if values is not None:
+                self._index(entity_id, values)
+        self.ready = True
+
+    def reset(self):
+        """
+        Empties the index, which isn't ready until it's loaded again
+        """
+        self.ready = False
+        self._clear()
+
+    async def start(self, redis: Optional[Redis] = None, breaker: Optional[CircuitBreaker] = None):
+        """
+        Loads the index and rebuilds it periodically. When redis is given, writes are published to and received from
+        the other workers, through breaker when it's given. Called from the application's startup hook
+        """
+        self.redis, self.breaker = redis, breaker
+        if redis is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("Couldn't load the %s index, the database is queried until it's rebuilt", self.name)
+        if self._refresher is None and self.refresh_interval > 0:
+            self._refresher = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self):
+        for task in (self._refresher, self._listener):
+            if task is not None:
+                task.cancel()
+        self._refresher = self._listener = None
+        self.redis = self.breaker = None
+
+    async def _refresh_periodically(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Couldn't rebuild the %s index, keeping the previous one", self.name)
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        write = json.loads(message["data"])
+                        if write["origin"] != self._origin:
+                            self._apply(write["id"], write["values"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Writes published while disconnected are picked up by the next rebuild
+                logger.exception("Lost the %s index subscription, resubscribing", self.name)
+                await asyncio.sleep(1)
@@ -0,0 +1,107 @@
+import heapq
+import re
+from collections import defaultdict
+from typing import Awaitable, Callable, Iterable
+
+from utilities.autocomplete import PrefixIndex
+
+# pg_trgm's default pg_trgm.similarity_threshold, which its % operator filters on
+SIMILARITY_THRESHOLD = 0.3
+
+
+def trigrams(text: str) -> frozenset[str]:
+    """
+    Trigrams of text as pg_trgm extracts them: the lowercased words of text, made of letters and digits, are padded with
+    two spaces before and one after, and split into every run of three characters
+    """
+    found = set()
+    for word in re.findall(r"[^\W_]+", text.casefold()):
+        padded = f"  {word} "
+        found.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(found)
+
+
+def similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    """
+    Share of their trigrams two texts have in common, as pg_trgm's similarity
+    """
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0
+
+
+def fragments(text: str) -> set[str]:
+    """
+    Runs of characters one of which a name contains when it has a trigram of text, other than the trigram of the first
+    letter of a word: the trigrams within its words, and the first and last two letters of each word or the whole word
+    when it's shorter
+    """
+    found = set()
+    for word in re.findall(r"[^\W_]+", text.casefold()):
+        if len(word) <= 2:
+            found.add(word)
+        else:
+            found.update((word[:2], word[-2:]))
+            found.update(word[i:i + 3] for i in range(len(word) - 2))
+    return found
+
+
+class TrigramIndex(PrefixIndex):
+    """
+    PrefixIndex also matching names approximately, for databases without trigram indexes. Names are split into trigrams
+    as pg_trgm does, and each trigram lists the entities whose name has it (an inverted index), so only the names
+    sharing a trigram with the query are scored. Scores are the similarity of pg_trgm, so a lookup matches the same
+    names on every database
+    """
+
+    def __init__(self, name: str, load: Callable[[], Awaitable[Iterable[tuple[int, dict]]]],
+                 refresh_interval: float = 60, max_cached_results: int = 4096):
+        self._trigrams: dict[int, frozenset[str]] = {}
+        self._postings: defaultdict[str, set[int]] = defaultdict(set)
+        super().__init__(name, load, refresh_interval, max_cached_results)
+
+    def _clear(self):
+        super()._clear()
+        self._trigrams = {}
+        self._postings = defaultdict(set)
+
+    def _index(self, entity_id: int, values: dict):
+        super()._index(entity_id, values)
+        self._trigrams[entity_id] = trigrams(values["name"])
+        for trigram in self._trigrams[entity_id]:
+            self._postings[trigram].add(entity_id)
+
+    def _build(self, entities: list[tuple[int, dict]]) -> dict:
+        structures = super()._build(entities)
+        structures["_trigrams"] = {entity_id: trigrams(values["name"]) for entity_id, values in entities}
+        structures["_postings"] = defaultdict(set)
+        for entity_id, name_trigrams in structures["_trigrams"].items():
+            for trigram in name_trigrams:
+                structures["_postings"][trigram].add(entity_id)
+        return structures
+
+    def _unindex(self, entity_id: int):
+        super()._unindex(entity_id)
+        for trigram in self._trigrams.pop(entity_id, ()):
+            self._postings[trigram].discard(entity_id)
+            if not self._postings[trigram]:
+                del self._postings[trigram]
+
+    def match(self, query: str, limit: int, threshold: float = SIMILARITY_THRESHOLD) -> list[tuple[int, str, float]]:
+        """
+        Returns the id, name and similarity to query of the limit entities whose name is most similar to it, among those
+        at least threshold similar. Ties are ordered by id. The similarity is the share of their trigrams the name and
+        query have in common
+        """
+        wanted = trigrams(query)
+        shared = defaultdict(int)
+        for trigram in wanted:
+            for entity_id in self._postings.get(trigram, ()):
+                shared[entity_id] += 1
+
+        scores = []
+        for entity_id, count in shared.items():
+            score = count / (len(wanted) + len(self._trigrams[entity_id]) - count)
+            if score >= threshold:
+                scores.append((-score, entity_id))
+
+        return [(entity_id, self._entries[entity_id][1], -score) for score, entity_id in heapq.nsmallest(limit, scores)]